@@ -219,6 +219,8 @@ class Endpoint(APIView):
             self.build_cursor_link(request, 'previous', cursor_result.prev),
             self.build_cursor_link(request, 'next', cursor_result.next),
         ])
+        if cursor_result.hits is not None:
+            headers['X-Hits'] = cursor_result.hits
 
         return Response(results, headers=headers)
 
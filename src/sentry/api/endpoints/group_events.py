@@ -9,7 +9,7 @@ from six.moves import reduce
 from sentry.api.base import DocSection
 from sentry.api.bases import GroupEndpoint
 from sentry.api.serializers import serialize
-from sentry.api.paginator import DateTimePaginator
+from sentry.api.paginator import DateTimeKeysetPaginator
 from sentry.models import Event, EventTag, Group, TagKey, TagValue
 from sentry.search.utils import parse_query
 from sentry.utils.apidocs import scenario, attach_scenarios
@@ -120,5 +120,6 @@ class GroupEventsEndpoint(GroupEndpoint):
             queryset=events,
             order_by='-datetime',
             on_results=lambda x: serialize(x, request.user),
-            paginator_cls=DateTimePaginator,
+            paginator_cls=DateTimeKeysetPaginator,
+            count_hits=True,
         )
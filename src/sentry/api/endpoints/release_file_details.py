@@ -213,6 +213,7 @@ class ReleaseFileDetailsEndpoint(ProjectEndpoint):
 
         # TODO(dcramer): this doesnt handle a failure from file.deletefile() to
         # the actual deletion of the db row
+        # (its sourcemap index is deleted by a post_delete receiver)
         releasefile.delete()
         file.delete()
 
@@ -13,6 +13,7 @@ from sentry.api.exceptions import ResourceDoesNotExist
 from sentry.api.paginator import OffsetPaginator
 from sentry.api.serializers import serialize
 from sentry.models import File, Release, ReleaseFile
+from sentry.tasks.sourcemaps import build_sourcemap_index
 from sentry.utils.apidocs import scenario, attach_scenarios
 
 ERR_FILE_EXISTS = 'A file matching this name already exists for the given release'
@@ -189,4 +190,10 @@ class ReleaseFilesEndpoint(ProjectEndpoint):
             file.delete()
             return Response({'detail': ERR_FILE_EXISTS}, status=409)
 
+        # the post_save receiver clears the cached lookup before the new file
+        # is committed, so a concurrent lookup may have cached it as missing
+        ReleaseFile.clear_ids(release.id, [releasefile.ident])
+
+        build_sourcemap_index.delay(releasefile_id=releasefile.id)
+
         return Response(serialize(releasefile, request.user), status=201)
@@ -8,12 +8,16 @@ sentry.api.paginator
 from __future__ import absolute_import
 
 import math
+import re
 
-from datetime import datetime
+from calendar import timegm
+from datetime import datetime, timedelta
 from django.db import connections
+from django.db.models import Q
 from django.utils import timezone
 
 from sentry.utils.cursors import build_cursor, Cursor, CursorResult
+from sentry.utils.db import is_postgres
 
 quote_name = connections['default'].ops.quote_name
 
@@ -171,3 +175,141 @@ class OffsetPaginator(BasePaginator):
             next=next_cursor,
             prev=prev_cursor,
         )
+
+
+def estimate_count(queryset):
+    """
+    Returns the number of rows matching ``queryset``.
+
+    On Postgres this is the planner's estimate, which is read from the
+    table statistics instead of visiting every matching row like
+    ``COUNT(*)`` does.
+    """
+    using = queryset.db
+    if not is_postgres(using):
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    cursor = connections[using].cursor()
+    cursor.execute('EXPLAIN %s' % (sql,), params)
+    match = re.search(r'rows=(\d+)', cursor.fetchone()[0])
+    if match is None:
+        return queryset.count()
+    return int(match.group(1))
+
+
+class KeysetPaginator(BasePaginator):
+    """
+    Paginates on ``(key, id)`` so that every page, no matter how deep, is a
+    range scan on an index over those columns rather than an ``OFFSET``.
+
+    The cursor's ``value`` holds the key of the boundary row of the previous
+    page and its ``offset`` holds that row's id, which breaks ties between
+    rows sharing the same key. Keys must be integers.
+
+    When ``count_hits`` is set the result carries the (estimated) total
+    number of rows in ``hits``.
+    """
+    def __init__(self, queryset, order_by, count_hits=False):
+        super(KeysetPaginator, self).__init__(queryset, order_by)
+        self.count_hits = count_hits
+
+    def get_item_key(self, item):
+        return getattr(item, self.key)
+
+    def value_from_cursor(self, cursor):
+        return cursor.value
+
+    def value_to_cursor(self, value):
+        return value
+
+    def _build_queryset(self, cursor, asc):
+        queryset = self.queryset
+        if asc:
+            queryset = queryset.order_by(self.key, 'id')
+        else:
+            queryset = queryset.order_by('-%s' % self.key, '-id')
+
+        # ids are never zero, so an empty offset means we're on the first
+        # page
+        if not cursor.offset:
+            return queryset
+
+        value = self.value_from_cursor(cursor)
+        op = 'gt' if asc else 'lt'
+
+        if is_postgres(queryset.db):
+            # a row comparison lets Postgres use a single index range scan
+            return queryset.extra(
+                where=['(%s.%s, %s.id) %s (%%s, %%s)' % (
+                    queryset.model._meta.db_table,
+                    quote_name(queryset.model._meta.get_field(self.key).column),
+                    queryset.model._meta.db_table,
+                    '>' if asc else '<',
+                )],
+                params=[value, cursor.offset],
+            )
+
+        return queryset.filter(
+            Q(**{'%s__%s' % (self.key, op): value}) |
+            Q(**{self.key: value, 'id__%s' % op: cursor.offset})
+        )
+
+    def _cursor_for(self, item, is_prev, has_results):
+        return Cursor(
+            self.value_to_cursor(self.get_item_key(item)),
+            item.id,
+            is_prev,
+            has_results,
+        )
+
+    def get_result(self, limit=100, cursor=None):
+        if cursor is None:
+            cursor = Cursor(0, 0, 0)
+
+        # for a previous page we walk backwards from the cursor, and
+        # restore the requested order afterwards
+        asc = self.desc == cursor.is_prev
+
+        results = list(self._build_queryset(cursor, asc)[:limit + 1])
+        has_more = len(results) > limit
+        results = results[:limit]
+        if cursor.is_prev:
+            results.reverse()
+            has_next, has_prev = bool(cursor.offset), has_more
+        else:
+            has_next, has_prev = has_more, bool(cursor.offset)
+
+        if results:
+            next_cursor = self._cursor_for(results[-1], False, has_next)
+            prev_cursor = self._cursor_for(results[0], True, has_prev)
+        else:
+            next_cursor = Cursor(cursor.value, cursor.offset, False, has_next)
+            prev_cursor = Cursor(cursor.value, cursor.offset, True, has_prev)
+
+        if self.count_hits:
+            hits = estimate_count(self.queryset)
+        else:
+            hits = None
+
+        return CursorResult(
+            results=results,
+            next=next_cursor,
+            prev=prev_cursor,
+            hits=hits,
+        )
+
+
+class DateTimeKeysetPaginator(KeysetPaginator):
+    """
+    A ``KeysetPaginator`` for datetime keys, which are stored in the cursor
+    as microseconds since the epoch so that the boundary row can be matched
+    exactly.
+    """
+    def value_from_cursor(self, cursor):
+        return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(
+            microseconds=cursor.value,
+        )
+
+    def value_to_cursor(self, value):
+        return timegm(value.utctimetuple()) * 1000000 + value.microsecond
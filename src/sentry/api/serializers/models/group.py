@@ -17,10 +17,16 @@ from sentry.models import (
     GroupSubscription, GroupSubscriptionReason, GroupTagKey, UserOption,
     UserOptionValue
 )
+from sentry.utils.cache import cache
+from sentry.utils.concurrent import execute
 from sentry.utils.db import attach_foreignkey
 from sentry.utils.http import absolute_uri
 from sentry.utils.safe import safe_execute
 
+# user counts only need to be roughly current in the stream, so they are
+# cached briefly rather than recomputed for every page
+USER_COUNT_CACHE_TTL = 60
+
 SUBSCRIPTION_REASON_MAP = {
     GroupSubscriptionReason.comment: 'commented',
     GroupSubscriptionReason.assigned: 'assigned',
@@ -91,6 +97,33 @@ class GroupSerializer(Serializer):
 
         return results
 
+    def _get_user_counts(self, item_list):
+        cache_keys = {
+            'group:user-count:{}'.format(item.id): item.id
+            for item in item_list
+        }
+        user_counts = {
+            cache_keys[key]: value
+            for key, value in six.iteritems(cache.get_many(cache_keys.keys()))
+        }
+
+        missing = [i for i in six.itervalues(cache_keys) if i not in user_counts]
+        if missing:
+            values = dict(
+                GroupTagKey.objects.filter(
+                    group__in=missing,
+                    key='sentry:user',
+                ).values_list('group', 'values_seen')
+            )
+            for group_id in missing:
+                user_counts[group_id] = values.get(group_id, 0)
+            cache.set_many({
+                'group:user-count:{}'.format(group_id): user_counts[group_id]
+                for group_id in missing
+            }, USER_COUNT_CACHE_TTL)
+
+        return user_counts
+
     def get_attrs(self, item_list, user):
         from sentry.plugins import plugins
 
@@ -120,12 +153,7 @@ class GroupSerializer(Serializer):
             ).select_related('user')
         )
 
-        user_counts = dict(
-            GroupTagKey.objects.filter(
-                group__in=item_list,
-                key='sentry:user',
-            ).values_list('group', 'values_seen')
-        )
+        user_counts = self._get_user_counts(item_list)
 
         ignore_durations = dict(
             GroupSnooze.objects.filter(
@@ -230,6 +258,9 @@ class GroupSerializer(Serializer):
         }
 
 
+# How long to wait for the stats of the groups in seconds.
+STATS_TIMEOUT = 10
+
 StatsPeriod = namedtuple('StatsPeriod', ('segments', 'interval'))
 
 
@@ -246,15 +277,17 @@ class StreamGroupSerializer(GroupSerializer):
         self.stats_period = stats_period
 
     def get_attrs(self, item_list, user):
-        attrs = super(StreamGroupSerializer, self).get_attrs(item_list, user)
-
         if self.stats_period:
             # we need to compute stats at 1d (1h resolution), and 14d
             group_ids = [g.id for g in item_list]
 
             segments, interval = self.STATS_PERIOD_CHOICES[self.stats_period]
             now = timezone.now()
-            stats = tsdb.get_range(
+
+            # TSDB doesn't share the database connection, so fetch stats
+            # while the attributes are being queried
+            stats = execute(
+                tsdb.get_range,
                 model=tsdb.models.group,
                 keys=group_ids,
                 end=now,
@@ -262,6 +295,10 @@ class StreamGroupSerializer(GroupSerializer):
                 rollup=int(interval.total_seconds()),
             )
 
+        attrs = super(StreamGroupSerializer, self).get_attrs(item_list, user)
+
+        if self.stats_period:
+            stats = stats.result(timeout=STATS_TIMEOUT)
             for item in item_list:
                 attrs[item].update({
                     'stats': stats[item.id],
@@ -8,6 +8,8 @@ sentry.cache.base
 
 from __future__ import absolute_import
 
+import six
+
 from django.conf import settings
 
 from threading import local
@@ -36,3 +38,22 @@ class BaseCache(local):
 
     def get(self, key, version=None):
         raise NotImplementedError
+
+    def get_many(self, keys, version=None):
+        """
+        Returns a mapping of the keys which were found to their values.
+        """
+        rv = {}
+        for key in keys:
+            value = self.get(key, version=version)
+            if value is not None:
+                rv[key] = value
+        return rv
+
+    def set_many(self, values, timeout, version=None):
+        for key, value in six.iteritems(values):
+            self.set(key, value, timeout, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
@@ -22,3 +22,12 @@ class DjangoCache(BaseCache):
 
     def get(self, key, version=None):
         return cache.get(key, version=version or self.version)
+
+    def get_many(self, keys, version=None):
+        return cache.get_many(keys, version=version or self.version)
+
+    def set_many(self, values, timeout, version=None):
+        cache.set_many(values, timeout, version=version or self.version)
+
+    def delete_many(self, keys, version=None):
+        cache.delete_many(keys, version=version or self.version)
@@ -8,11 +8,17 @@ sentry.cache.redis
 
 from __future__ import absolute_import
 
+import six
+import zlib
+
 from sentry.utils import json
 from sentry.utils.redis import get_cluster_from_options
 
 from .base import BaseCache
 
+# Marks compressed values, which can't be confused with JSON documents.
+COMPRESSED_PREFIX = b'z:'
+
 
 class ValueTooLarge(Exception):
     pass
@@ -21,6 +27,7 @@ class ValueTooLarge(Exception):
 class RedisCache(BaseCache):
     key_expire = 60 * 60  # 1 hour
     max_size = 50 * 1024 * 1024  # 50MB
+    compress_threshold = 16 * 1024  # 16KB
 
     def __init__(self, **options):
         self.cluster, options = get_cluster_from_options('SENTRY_CACHE_OPTIONS', options)
@@ -28,23 +35,66 @@ class RedisCache(BaseCache):
 
         super(RedisCache, self).__init__(**options)
 
-    def set(self, key, value, timeout, version=None):
-        key = self.make_key(key, version=version)
+    def _encode(self, key, value):
         v = json.dumps(value)
         if len(v) > self.max_size:
             raise ValueTooLarge('Cache key too large: %r %r' % (key, len(v)))
+        if len(v) > self.compress_threshold:
+            v = COMPRESSED_PREFIX + zlib.compress(v)
+        return v
+
+    def _decode(self, result):
+        if result is None:
+            return None
+        if result.startswith(COMPRESSED_PREFIX):
+            result = zlib.decompress(result[len(COMPRESSED_PREFIX):])
+        return json.loads(result)
+
+    def _set(self, client, key, v, timeout):
         if timeout:
-            self.client.setex(key, int(timeout), v)
+            client.setex(key, int(timeout), v)
         else:
-            self.client.set(key, v)
+            client.set(key, v)
+
+    def set(self, key, value, timeout, version=None):
+        key = self.make_key(key, version=version)
+        self._set(self.client, key, self._encode(key, value), timeout)
+
+    def set_many(self, values, timeout, version=None):
+        # encode everything first so nothing is written if a value is too large
+        encoded = []
+        for key, value in six.iteritems(values):
+            key = self.make_key(key, version=version)
+            encoded.append((key, self._encode(key, value)))
+
+        # the commands are pipelined to each host of the cluster
+        with self.cluster.map() as client:
+            for key, v in encoded:
+                self._set(client, key, v, timeout)
 
     def delete(self, key, version=None):
         key = self.make_key(key, version=version)
         self.client.delete(key)
 
+    def delete_many(self, keys, version=None):
+        with self.cluster.map() as client:
+            for key in keys:
+                client.delete(self.make_key(key, version=version))
+
     def get(self, key, version=None):
         key = self.make_key(key, version=version)
-        result = self.client.get(key)
-        if result is not None:
-            result = json.loads(result)
-        return result
+        return self._decode(self.client.get(key))
+
+    def get_many(self, keys, version=None):
+        with self.cluster.map() as client:
+            results = [
+                (key, client.get(self.make_key(key, version=version)))
+                for key in keys
+            ]
+
+        rv = {}
+        for key, result in results:
+            value = self._decode(result.value)
+            if value is not None:
+                rv[key] = value
+        return rv
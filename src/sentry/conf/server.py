@@ -435,6 +435,7 @@ CELERY_IMPORTS = (
     'sentry.tasks.post_process',
     'sentry.tasks.process_buffer',
     'sentry.tasks.reports',
+    'sentry.tasks.sourcemaps',
     'sentry.tasks.store',
 )
 CELERY_QUEUES = [
@@ -859,6 +860,10 @@ CACHES = {
 # CACHES backend.
 CACHE_VERSION = 1
 
+# Maximum size (in bytes, per process) of the local cache in front of
+# ``get_from_cache`` for models whose manager sets a ``local_cache_ttl``
+SENTRY_MODEL_CACHE_LOCAL_SIZE = 16 * 1024 * 1024
+
 # Digests backend
 SENTRY_DIGESTS = 'sentry.digests.backends.dummy.DummyBackend'
 SENTRY_DIGESTS_OPTIONS = {}
@@ -880,6 +885,8 @@ SENTRY_NODESTORE_OPTIONS = {}
 
 # Search backend
 SENTRY_SEARCH = 'sentry.search.django.DjangoSearchBackend'
+# Uses pg_trgm indexes for free-text queries when running on Postgres
+# SENTRY_SEARCH = 'sentry.search.django.PostgresSearchBackend'
 SENTRY_SEARCH_OPTIONS = {}
 # SENTRY_SEARCH_OPTIONS = {
 #     'urls': ['http://localhost:9200/'],
@@ -944,6 +951,10 @@ SENTRY_SOURCE_FETCH_SOCKET_TIMEOUT = 2
 # Maximum content length for source files before we abort fetching
 SENTRY_SOURCE_FETCH_MAX_SIZE = 40 * 1024 * 1024
 
+# Maximum size (in bytes, per process) of the cache of decompressed release
+# artifacts and parsed sourcemaps used when processing JavaScript events
+SENTRY_RELEASE_ARTIFACT_CACHE_SIZE = 128 * 1024 * 1024
+
 # List of IP subnets which should not be accessible
 SENTRY_DISALLOWED_IPS = ()
 
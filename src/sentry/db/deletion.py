@@ -2,6 +2,7 @@ from __future__ import absolute_import
 
 from datetime import timedelta
 from django.db import connections, router
+from django.db.models import Max, Min
 from django.utils import timezone
 
 from sentry.utils import db
@@ -55,7 +56,7 @@ class BulkDeleteQuery(object):
             cursor.execute(query)
             results = cursor.rowcount > 0
 
-    def execute_generic(self, chunk_size=100):
+    def get_queryset(self):
         qs = self.model.objects.all()
 
         if self.days:
@@ -68,6 +69,10 @@ class BulkDeleteQuery(object):
                 qs = qs.filter(project=self.project_id)
             else:
                 qs = qs.filter(project_id=self.project_id)
+        return qs
+
+    def execute_generic(self, chunk_size=100):
+        qs = self.get_queryset()
 
         # XXX: we step through because the deletion collector will pull all
         # relations into memory
@@ -78,6 +83,81 @@ class BulkDeleteQuery(object):
                 item.delete()
                 exists = True
 
+    def iter_id_ranges(self, step):
+        """
+        Splits the id space of the rows to delete into ``(start, stop)``
+        ranges of ``step`` ids each, which can be deleted independently.
+        """
+        bounds = self.get_queryset().aggregate(Min('id'), Max('id'))
+        if bounds['id__min'] is None:
+            return
+        for start in range(bounds['id__min'], bounds['id__max'] + 1, step):
+            yield start, start + step
+
+    def execute_range(self, start, stop, generic=False, chunk_size=100):
+        """
+        Deletes the rows with ids in ``[start, stop)`` and returns how many
+        were deleted.
+
+        If ``generic`` is set rows are deleted one by one so that their
+        relations are deleted too, otherwise they are deleted with a single
+        query.
+        """
+        if not generic:
+            return self._delete_range(start, stop)
+
+        qs = self.get_queryset().filter(id__gte=start, id__lt=stop)
+        count = 0
+        while True:
+            items = list(qs[:chunk_size])
+            if not items:
+                break
+            self._delete_nodes(items)
+            for item in items:
+                item.delete()
+            count += len(items)
+        return count
+
+    def _delete_range(self, start, stop):
+        quote_name = connections[self.using].ops.quote_name
+
+        where = ['id >= %s', 'id < %s']
+        params = [start, stop]
+        if self.days:
+            where.append('{} <= %s'.format(quote_name(self.dtfield)))
+            params.append(timezone.now() - timedelta(days=self.days))
+        if self.project_id:
+            where.append('project_id = %s')
+            params.append(self.project_id)
+
+        cursor = connections[self.using].cursor()
+        cursor.execute("""
+            delete from {table}
+            where {where}
+        """.format(
+            table=self.model._meta.db_table,
+            where=' and '.join(where),
+        ), params)
+        return cursor.rowcount
+
+    def _delete_nodes(self, items):
+        # deletes the node data of a whole chunk at once rather than letting
+        # each row delete its own on the way out
+        from sentry.app import nodestore
+        from sentry.db.models.fields.node import NodeField
+
+        node_ids = []
+        for field in self.model._meta.fields:
+            if not isinstance(field, NodeField):
+                continue
+            for item in items:
+                node = getattr(item, field.name)
+                if node.id:
+                    node_ids.append(node.id)
+                    node.id = None
+        if node_ids:
+            nodestore.delete_multi(node_ids)
+
     def execute(self, chunk_size=10000):
         if db.is_postgres():
             self.execute_postgres(chunk_size)
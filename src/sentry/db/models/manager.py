@@ -11,6 +11,7 @@ from __future__ import absolute_import, print_function
 import logging
 import six
 import threading
+import time
 import weakref
 
 from django.conf import settings
@@ -19,9 +20,11 @@ from django.db.models import Manager, Model
 from django.db.models.signals import (
     post_save, post_delete, post_init, class_prepared)
 from django.utils.encoding import smart_text
+from six.moves import cPickle as pickle
 
 from sentry.utils.cache import cache
 from sentry.utils.hashlib import md5_text
+from sentry.utils.lru import LRUCache
 
 from .query import create_or_update
 
@@ -39,6 +42,14 @@ class ImmutableDict(dict):
 
 UNSAVED = ImmutableDict()
 
+# Recently used instances (and lookup pointers) of managers with a
+# ``local_cache_ttl``, shared by all threads of the process. Other processes
+# don't invalidate it, so entries are only kept for a few seconds.
+local_cache = LRUCache(
+    settings.SENTRY_MODEL_CACHE_LOCAL_SIZE,
+    name='modelcache.local',
+)
+
 
 def __prep_value(model, key, value):
     if isinstance(value, Model):
@@ -79,6 +90,7 @@ class BaseManager(Manager):
         self.cache_fields = kwargs.pop('cache_fields', [])
         self.cache_ttl = kwargs.pop('cache_ttl', 60 * 5)
         self.cache_version = kwargs.pop('cache_version', None)
+        self.local_cache_ttl = kwargs.pop('local_cache_ttl', 0)
         self.__local_cache = threading.local()
         super(BaseManager, self).__init__(*args, **kwargs)
 
@@ -156,26 +168,30 @@ class BaseManager(Manager):
                 continue
             # store pointers
             value = self.__value_for_field(instance, key)
+            lookup_key = self.__get_lookup_cache_key(**{key: value})
             cache.set(
-                key=self.__get_lookup_cache_key(**{key: value}),
+                key=lookup_key,
                 value=pk_val,
                 timeout=self.cache_ttl,
                 version=self.cache_version,
             )
+            self.__set_local(lookup_key, pk_val)
 
         # Ensure we don't serialize the database into the cache
         db = instance._state.db
         instance._state.db = None
         # store actual object
+        lookup_key = self.__get_lookup_cache_key(**{pk_name: pk_val})
         try:
             cache.set(
-                key=self.__get_lookup_cache_key(**{pk_name: pk_val}),
+                key=lookup_key,
                 value=instance,
                 timeout=self.cache_ttl,
                 version=self.cache_version,
             )
         except Exception as e:
             logger.error(e, exc_info=True)
+        self.__set_local(lookup_key, instance)
         instance._state.db = db
 
         # Kill off any keys which are no longer valid
@@ -186,10 +202,12 @@ class BaseManager(Manager):
                 value = self.__cache[instance][key]
                 current_value = self.__value_for_field(instance, key)
                 if value != current_value:
+                    lookup_key = self.__get_lookup_cache_key(**{key: value})
                     cache.delete(
-                        key=self.__get_lookup_cache_key(**{key: value}),
+                        key=lookup_key,
                         version=self.cache_version,
                     )
+                    self.__delete_local(lookup_key)
 
         self.__cache_state(instance)
 
@@ -203,19 +221,82 @@ class BaseManager(Manager):
                 continue
             # remove pointers
             value = self.__value_for_field(instance, key)
+            lookup_key = self.__get_lookup_cache_key(**{key: value})
             cache.delete(
-                key=self.__get_lookup_cache_key(**{key: value}),
+                key=lookup_key,
                 version=self.cache_version,
             )
+            self.__delete_local(lookup_key)
         # remove actual object
+        lookup_key = self.__get_lookup_cache_key(**{pk_name: instance.pk})
         cache.delete(
-            key=self.__get_lookup_cache_key(**{pk_name: instance.pk}),
+            key=lookup_key,
             version=self.cache_version,
         )
+        self.__delete_local(lookup_key)
 
     def __get_lookup_cache_key(self, **kwargs):
         return make_key(self.model, 'modelcache', kwargs)
 
+    def __get_local(self, key):
+        """
+        Returns a copy of the value of ``key`` in the process-local cache,
+        or ``None`` if it's missing or expired.
+        """
+        if not self.local_cache_ttl:
+            return None
+        # changing the cache version invalidates all local entries as well
+        local_key = (self.cache_version, key)
+        result = local_cache.get(local_key)
+        if result is None:
+            return None
+        expires, value = result
+        if expires < time.time():
+            local_cache.delete(local_key)
+            return None
+        return pickle.loads(value)
+
+    def __set_local(self, key, value):
+        if not self.local_cache_ttl:
+            return
+        # values are kept pickled so that callers can't modify the cached copy
+        try:
+            value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.error(e, exc_info=True)
+            return
+        local_cache.set(
+            (self.cache_version, key),
+            (time.time() + self.local_cache_ttl, value),
+            len(key) + len(value),
+        )
+
+    def __delete_local(self, key):
+        if self.local_cache_ttl:
+            local_cache.delete((self.cache_version, key))
+
+    def __get_many(self, keys):
+        """
+        Looks up ``keys`` in the local cache and then the rest in one call to
+        the shared cache, returning a mapping of the keys which were found to
+        their values.
+        """
+        rv = {}
+        for key in keys:
+            value = self.__get_local(key)
+            if value is not None:
+                rv[key] = value
+
+        missing = [key for key in keys if key not in rv]
+        if missing:
+            for key, value in six.iteritems(
+                    cache.get_many(missing, version=self.cache_version)):
+                if value is None:
+                    continue
+                self.__set_local(key, value)
+                rv[key] = value
+        return rv
+
     def __value_for_field(self, instance, key):
         """
         Return the cacheable value for a field.
@@ -258,7 +339,7 @@ class BaseManager(Manager):
         if key in self.cache_fields or key == pk_name:
             cache_key = self.__get_lookup_cache_key(**{key: value})
 
-            retval = cache.get(cache_key, version=self.cache_version)
+            retval = self.__get_many([cache_key]).get(cache_key)
             if retval is None:
                 result = self.get(**kwargs)
                 # Ensure we're pushing it into the cache
@@ -288,6 +369,57 @@ class BaseManager(Manager):
         else:
             return self.get(**kwargs)
 
+    def get_many_from_cache(self, values, key='pk'):
+        """
+        Wrapper around ``QuerySet.filter(<key>__in=values)`` which looks up
+        the instances in the caches in bulk, and only queries the database
+        for those which aren't cached. Instances which don't exist are left
+        out, and the order of the result is undefined.
+        """
+        pk_name = self.model._meta.pk.name
+        if key == 'pk':
+            key = pk_name
+
+        # We store everything by key references (vs instances)
+        values = set(v.pk if isinstance(v, Model) else v for v in values)
+
+        if not self.cache_fields or (key not in self.cache_fields and
+                                     key != pk_name):
+            return list(self.filter(**{'%s__in' % key: values}))
+
+        cache_keys = dict(
+            (self.__get_lookup_cache_key(**{key: value}), value)
+            for value in values
+        )
+        cached = self.__get_many(list(cache_keys))
+        missing = [
+            value for cache_key, value in six.iteritems(cache_keys)
+            if cache_key not in cached
+        ]
+
+        # If we didn't look up by pk we need to hit the reffed keys
+        if key != pk_name:
+            result = self.get_many_from_cache(cached.values())
+        else:
+            result = []
+            for cache_key, retval in six.iteritems(cached):
+                value = cache_keys[cache_key]
+                if type(retval) != self.model or int(value) != retval.pk:
+                    if settings.DEBUG:
+                        raise ValueError('Unexpected value returned from cache')
+                    logger.error('Cache response returned invalid value %r', retval)
+                    missing.append(value)
+                    continue
+                retval._state.db = router.db_for_read(self.model)
+                result.append(retval)
+
+        if missing:
+            for instance in self.filter(**{'%s__in' % key: missing}):
+                # Ensure we're pushing it into the cache
+                self.__post_save(instance=instance)
+                result.append(instance)
+        return result
+
     def create_or_update(self, **kwargs):
         return create_or_update(self.model, **kwargs)
 
@@ -316,6 +448,7 @@ class BaseManager(Manager):
         pk_name = self.model._meta.pk.name
         cache_key = self.__get_lookup_cache_key(**{pk_name: instance_id})
         cache.delete(cache_key, version=self.cache_version)
+        self.__delete_local(cache_key)
 
     def post_save(self, instance, **kwargs):
         """
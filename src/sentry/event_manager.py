@@ -28,9 +28,10 @@ from sentry.constants import (
 )
 from sentry.interfaces.base import get_interface
 from sentry.models import (
-    Activity, Environment, Event, EventMapping, EventUser, Group, GroupHash,
-    GroupRelease, GroupResolution, GroupStatus, Project, Release,
-    ReleaseEnvironment, ReleaseProject, TagKey, UserReport
+    Activity, Environment, Event, EventMapping, EventUser, Group,
+    GroupEventHour, GroupHash, GroupRelease, GroupResolution, GroupStatus,
+    Project, ProjectOption, Release, ReleaseEnvironment, ReleaseProject, TagKey,
+    UserReport
 )
 from sentry.plugins import plugins
 from sentry.signals import first_event_received, regression_signal
@@ -398,6 +399,8 @@ class EventManager(object):
         from sentry.tasks.post_process import index_event_tags
 
         project = Project.objects.get_from_cache(id=project)
+        # serves ``project.get_option`` (e.g. for enabled plugins) below
+        ProjectOption.objects.get_snapshot(project)
 
         data = self.data.copy()
 
@@ -619,6 +622,8 @@ class EventManager(object):
                 datetime=date,
             )
 
+        GroupEventHour.record(group=group, datetime=event.datetime)
+
         counters = [
             (tsdb.models.group, group.id),
             (tsdb.models.project, project.id),
@@ -17,7 +17,7 @@ from os.path import splitext
 from requests.exceptions import RequestException, Timeout
 from requests.utils import get_encoding_from_headers
 from six.moves.urllib.parse import urlparse, urljoin, urlsplit
-from libsourcemap import from_json as view_from_json
+from libsourcemap import from_json as view_from_json, View
 
 # In case SSL is unavailable (light builds) we can't import this here.
 try:
@@ -29,11 +29,13 @@ except ImportError:
 from sentry import http
 from sentry.exceptions import RestrictedIPAddress
 from sentry.interfaces.stacktrace import Stacktrace
-from sentry.models import EventError, Release, ReleaseFile
+from sentry.models import EventError, File, Release, ReleaseFile
 from sentry.utils.cache import cache
 from sentry.utils.files import compress_file
 from sentry.utils.hashlib import md5_text
-from sentry.utils.http import is_valid_origin
+from sentry.utils.concurrent import get_thread_pool
+from sentry.utils.http import get_origins, is_valid_origin
+from sentry.utils.lru import LRUCache
 from sentry.utils.strings import truncatechars
 from sentry.utils import metrics
 from sentry.stacktraces import StacktraceProcessor
@@ -61,16 +63,38 @@ VERSION_RE = re.compile(r'^[a-f0-9]{32}|[a-f0-9]{40}$', re.I)
 # the maximum number of remote resources (i.e. sourc eifles) that should be
 # fetched
 MAX_RESOURCE_FETCHES = 100
+# the maximum number of remote resources that are fetched at the same time
+MAX_CONCURRENT_FETCHES = 10
 MAX_URL_LENGTH = 150
 
 # TODO(dcramer): we want to change these to be constants so they are easier
 # to translate/link again
 
+
+# the origins a project allows and the headers sent when scraping them
+FetchAuth = namedtuple('FetchAuth', ['origins', 'headers'])
+
+
 # UrlResult.body **must** be bytes
-UrlResult = namedtuple('UrlResult', ['url', 'headers', 'body', 'encoding'])
+class UrlResult(namedtuple('UrlResult', ['url', 'headers', 'body', 'encoding', 'checksum'])):
+    __slots__ = ()
+
+    def __new__(cls, url, headers, body, encoding, checksum=None):
+        # only release artifacts have a checksum
+        return super(UrlResult, cls).__new__(
+            cls, url, headers, body, encoding, checksum)
+
 
 logger = logging.getLogger(__name__)
 
+# Decompressed release artifacts and their parsed sourcemap views, keyed by
+# (release_id, file checksum, kind). The same few artifacts tend to back a
+# large number of events, so this saves re-parsing them for every event.
+release_artifact_cache = LRUCache(
+    settings.SENTRY_RELEASE_ARTIFACT_CACHE_SIZE,
+    name='sourcemaps.artifact_cache',
+)
+
 
 def expose_url(url):
     if url is None:
@@ -217,13 +241,12 @@ def discover_sourcemap(result):
     return sourcemap
 
 
-def fetch_release_file(filename, release):
-    cache_key = 'releasefile:v1:%s:%s' % (
-        release.id,
-        md5_text(filename).hexdigest(),
-    )
-
-    filename_path = None
+def get_release_file_idents(filename):
+    """
+    Returns the idents a release artifact for ``filename`` may be stored
+    under: its full url, followed by a hostless ``~/path`` name.
+    """
+    filename_idents = [ReleaseFile.get_ident(filename)]
     if filename is not None:
         # Reconstruct url without protocol + host
         # e.g. http://example.com/foo?bar => ~/foo?bar
@@ -231,36 +254,113 @@ def fetch_release_file(filename, release):
         filename_path = '~' + parsed_url.path
         if parsed_url.query:
             filename_path += '?' + parsed_url.query
+        if filename_path != filename:
+            filename_idents.append(ReleaseFile.get_ident(filename_path))
+    return filename_idents
 
-    logger.debug('Checking cache for release artifact %r (release_id=%s)',
-                 filename, release.id)
-    result = cache.get(cache_key)
 
-    if result is None:
-        logger.debug('Checking database for release artifact %r (release_id=%s)',
-                     filename, release.id)
+def get_release_files(filenames, release, select_related=('file',)):
+    """
+    Finds the ReleaseFile for each of ``filenames`` with a single query,
+    returning a mapping of filename to ReleaseFile for those that exist.
+    """
+    filename_idents = dict(
+        (filename, get_release_file_idents(filename))
+        for filename in filenames
+    )
+    if not filename_idents:
+        return {}
+
+    # the ids are cached per ident, so looking up files that were never
+    # uploaded doesn't hit the database
+    releasefile_ids = set(six.itervalues(ReleaseFile.get_ids(release, set(
+        i for idents in six.itervalues(filename_idents) for i in idents
+    ))))
+    if not releasefile_ids:
+        return {}
+
+    files_by_ident = dict((f.ident, f) for f in ReleaseFile.objects.filter(
+        id__in=releasefile_ids,
+    ).select_related(*select_related))
+
+    result = {}
+    for filename, idents in six.iteritems(filename_idents):
+        # Prioritize releasefile that matches full url (w/ host)
+        # over hostless releasefile
+        releasefile = next(
+            (files_by_ident[i] for i in idents if i in files_by_ident), None)
+        if releasefile is not None:
+            result[filename] = releasefile
+    return result
 
-        filename_idents = [ReleaseFile.get_ident(filename)]
-        if filename_path is not None and filename_path != filename:
-            filename_idents.append(ReleaseFile.get_ident(filename_path))
 
-        possible_files = list(ReleaseFile.objects.filter(
-            release=release,
-            ident__in=filename_idents,
-        ).select_related('file'))
+def get_release_file(filename, release, select_related=('file',)):
+    return get_release_files([filename], release, select_related).get(filename)
+
 
-        if len(possible_files) == 0:
+def fetch_release_files(filenames, release):
+    """
+    Fetches the release artifacts for ``filenames``, returning a mapping of
+    filename to a ``(headers, body, status, encoding, checksum)`` tuple, or
+    ``None`` if there is no such artifact.
+
+    Cached results are fetched with a single cache call, and the remaining
+    files are looked up with a single query.
+    """
+    cache_keys = dict(
+        ('releasefile:v1:%s:%s' % (release.id, md5_text(filename).hexdigest()), filename)
+        for filename in filenames
+    )
+
+    logger.debug('Checking cache for %d release artifacts (release_id=%s)',
+                 len(cache_keys), release.id)
+    cached = cache.get_many(list(cache_keys))
+
+    results = {}
+    for cache_key, filename in six.iteritems(cache_keys):
+        result = cached.get(cache_key)
+        if result is None:
+            continue
+        elif result == -1:
+            # We cached an error, so normalize
+            # it down to None
+            results[filename] = None
+            continue
+
+        # Previous caches would be a 3-tuple (or a 4-tuple without the
+        # checksum), so this is being maintained for backwards compatibility
+        encoding = result[3] if len(result) > 3 else None
+        checksum = result[4] if len(result) > 4 else None
+
+        body = None
+        if checksum is not None:
+            body = release_artifact_cache.get((release.id, checksum, 'body'))
+        if body is None:
+            body = zlib.decompress(result[1])
+            if checksum is not None:
+                release_artifact_cache.set(
+                    (release.id, checksum, 'body'), body, len(body))
+        results[filename] = (result[0], body, result[2], encoding, checksum)
+
+    missing = dict(
+        (filename, cache_key) for cache_key, filename in six.iteritems(cache_keys)
+        if filename not in results
+    )
+    if not missing:
+        return results
+
+    logger.debug('Checking database for %d release artifacts (release_id=%s)',
+                 len(missing), release.id)
+    releasefiles = get_release_files(list(missing), release)
+
+    for filename, cache_key in six.iteritems(missing):
+        releasefile = releasefiles.get(filename)
+        if releasefile is None:
             logger.debug('Release artifact %r not found in database (release_id=%s)',
                          filename, release.id)
             cache.set(cache_key, -1, 60)
-            return None
-        elif len(possible_files) == 1:
-            releasefile = possible_files[0]
-        else:
-            # Prioritize releasefile that matches full url (w/ host)
-            # over hostless releasefile
-            target_ident = filename_idents[0]
-            releasefile = next((f for f in possible_files if f.ident == target_ident))
+            results[filename] = None
+            continue
 
         logger.debug('Found release artifact %r (id=%s, release_id=%s)',
                      filename, releasefile.id, release.id)
@@ -271,27 +371,73 @@ def fetch_release_file(filename, release):
         except Exception as e:
             logger.exception(six.text_type(e))
             cache.set(cache_key, -1, 3600)
-            result = None
+            results[filename] = None
         else:
             headers = {k.lower(): v for k, v in releasefile.file.headers.items()}
             encoding = get_encoding_from_headers(headers)
-            result = (headers, body, 200, encoding)
-            cache.set(cache_key, (headers, z_body, 200, encoding), 3600)
+            checksum = releasefile.file.checksum
+            results[filename] = (headers, body, 200, encoding, checksum)
+            cache.set(cache_key, (headers, z_body, 200, encoding, checksum), 3600)
+            if checksum is not None:
+                release_artifact_cache.set(
+                    (release.id, checksum, 'body'), body, len(body))
 
-    elif result == -1:
-        # We cached an error, so normalize
-        # it down to None
-        result = None
+    return results
+
+
+def fetch_release_file(filename, release):
+    return fetch_release_files([filename], release)[filename]
+
+
+def get_fetch_auth(project):
+    """
+    Resolves the project options used when scraping sources, so that fetches
+    don't need to look them up.
+    """
+    if project is None:
+        return None
+
+    headers = {}
+    token = project.get_option('sentry:token')
+    if token:
+        token_header = project.get_option(
+            'sentry:token_header',
+            'X-Sentry-Token',
+        )
+        headers[token_header] = token
+    return FetchAuth(get_origins(project), headers)
+
+
+def fetch_files(urls, project=None, release=None, allow_scraping=True):
+    """
+    Fetches all of ``urls``, returning a mapping of url to either a
+    UrlResult or the ``BadSource`` error raised while fetching it.
+
+    Release artifacts are looked up in bulk, and everything else is
+    fetched concurrently (at most ``MAX_CONCURRENT_FETCHES`` at a time).
+    """
+    urls = [url for url in urls if url[-3:] != '...']
+    if release:
+        with metrics.timer('sourcemaps.release_file'):
+            release_results = fetch_release_files(urls, release)
     else:
-        # Previous caches would be a 3-tuple instead of a 4-tuple,
-        # so this is being maintained for backwards compatibility
+        release_results = {}
+    auth = get_fetch_auth(project)
+
+    def fetch(url):
+        # this runs in a separate thread, so it must not touch the database
+        # (release artifacts and project options have been looked up above)
         try:
-            encoding = result[3]
-        except IndexError:
-            encoding = None
-        result = (result[0], zlib.decompress(result[1]), result[2], encoding)
+            return url, _fetch_file(url, release_results.get(url), auth=auth,
+                                    allow_scraping=allow_scraping)
+        except BadSource as exc:
+            return url, exc
 
-    return result
+    if len(urls) < 2:
+        return dict(fetch(url) for url in urls)
+
+    pool = get_thread_pool('sourcemaps.fetch', MAX_CONCURRENT_FETCHES)
+    return dict(pool.map(fetch, urls))
 
 
 def fetch_file(url, project=None, release=None, allow_scraping=True):
@@ -313,6 +459,15 @@ def fetch_file(url, project=None, release=None, allow_scraping=True):
     else:
         result = None
 
+    auth = get_fetch_auth(project) if result is None else None
+    return _fetch_file(url, result, auth=auth, allow_scraping=allow_scraping)
+
+
+def _fetch_file(url, result, auth=None, allow_scraping=True):
+    """
+    Builds the UrlResult for ``url`` from its release artifact ``result``,
+    scraping the url instead if there is none.
+    """
     cache_key = 'source:cache:v3:%s' % (
         md5_text(url).hexdigest(),
     )
@@ -350,14 +505,8 @@ def fetch_file(url, project=None, release=None, allow_scraping=True):
             raise CannotFetchSource(domain_result)
 
         headers = {}
-        if project and is_valid_origin(url, project=project):
-            token = project.get_option('sentry:token')
-            if token:
-                token_header = project.get_option(
-                    'sentry:token_header',
-                    'X-Sentry-Token',
-                )
-                headers[token_header] = token
+        if auth and is_valid_origin(url, allowed=auth.origins):
+            headers.update(auth.headers)
 
         logger.debug('Fetching %r from the internet', url)
 
@@ -491,7 +640,8 @@ def fetch_file(url, project=None, release=None, allow_scraping=True):
             }
             raise CannotFetchSource(error)
 
-    return UrlResult(url, result[0], result[1], result[3])
+    checksum = result[4] if len(result) > 4 else None
+    return UrlResult(url, result[0], result[1], result[3], checksum)
 
 
 def is_utf8(encoding):
@@ -504,7 +654,92 @@ def is_utf8(encoding):
         return False
 
 
-def fetch_sourcemap(url, project=None, release=None, allow_scraping=True):
+def build_sourcemap_index(releasefile):
+    """
+    Compiles a sourcemap release artifact into libsourcemap's binary memdb
+    format and stores it as a sibling file, which lets processing look up
+    tokens without parsing the JSON. Returns the new ``File``, or ``None`` if
+    the artifact is not a sourcemap.
+    """
+    # ``read`` without a size only returns the first 4096 bytes
+    with releasefile.file.getfile() as fp:
+        body = b''.join(fp.chunks())
+
+    # avoid attempting to parse minified sources and other artifacts
+    if body.lstrip()[:1] not in (b'{', b')'):
+        return None
+
+    try:
+        sourcemap_view = view_from_json(body)
+    except Exception:
+        logger.warning('Unable to parse sourcemap (releasefile_id=%s)',
+                       releasefile.id, exc_info=True)
+        return None
+
+    index = File.objects.create(
+        name=releasefile.file.name,
+        type='release.sourcemap-index',
+        headers={},
+    )
+    index.putfile(six.BytesIO(sourcemap_view.dump_memdb()))
+    releasefile.update(sourcemap_index=index)
+    return index
+
+
+def fetch_release_sourcemap_index(filename, release):
+    """
+    Returns the sourcemap view for the release artifact ``filename`` from its
+    precompiled index, or ``None`` if the artifact has no index.
+    """
+    cache_key = 'releasefile:smindex:v1:%s:%s' % (
+        release.id,
+        md5_text(filename).hexdigest(),
+    )
+
+    result = cache.get(cache_key)
+    if result is None:
+        releasefile = get_release_file(filename, release, select_related=('sourcemap_index',))
+        if releasefile is None or releasefile.sourcemap_index is None:
+            cache.set(cache_key, -1, 60)
+            return None
+        result = (releasefile.sourcemap_index.id, releasefile.sourcemap_index.checksum)
+        cache.set(cache_key, result, 3600)
+    elif result == -1:
+        return None
+
+    file_id, checksum = result
+    local_cache_key = (release.id, checksum, 'memdb')
+    sourcemap_view = release_artifact_cache.get(local_cache_key)
+    if sourcemap_view is not None:
+        return sourcemap_view
+
+    try:
+        index = File.objects.get(id=file_id)
+    except File.DoesNotExist:
+        cache.delete(cache_key)
+        return None
+
+    try:
+        with metrics.timer('sourcemaps.index_read'):
+            with index.getfile() as fp:
+                memdb = b''.join(fp.chunks())
+        sourcemap_view = View.from_memdb(memdb)
+    except Exception as e:
+        logger.exception(six.text_type(e))
+        return None
+
+    release_artifact_cache.set(local_cache_key, sourcemap_view, len(memdb))
+    return sourcemap_view
+
+
+def fetch_sourcemap(url, project=None, release=None, allow_scraping=True,
+                    result=None):
+    """
+    Returns the sourcemap view for ``url``. If the sourcemap has already been
+    fetched (e.g. by ``fetch_files``), its UrlResult can be passed as
+    ``result``.
+    """
+    cache_key = None
     if is_data_uri(url):
         try:
             body = base64.b64decode(
@@ -516,8 +751,14 @@ def fetch_sourcemap(url, project=None, release=None, allow_scraping=True):
                 'reason': e.message,
             })
     else:
-        result = fetch_file(url, project=project, release=release,
-                            allow_scraping=allow_scraping)
+        if result is None and release is not None:
+            sourcemap_view = fetch_release_sourcemap_index(url, release)
+            if sourcemap_view is not None:
+                return sourcemap_view
+
+        if result is None:
+            result = fetch_file(url, project=project, release=release,
+                                allow_scraping=allow_scraping)
         body = result.body
 
         # This is just a quick sanity check, but doesn't guarantee
@@ -529,8 +770,14 @@ def fetch_sourcemap(url, project=None, release=None, allow_scraping=True):
             }
             raise CannotFetchSource(error)
 
+        if release is not None and result.checksum is not None:
+            cache_key = (release.id, result.checksum, 'sourcemap')
+            sourcemap_view = release_artifact_cache.get(cache_key)
+            if sourcemap_view is not None:
+                return sourcemap_view
+
     try:
-        return view_from_json(body)
+        sourcemap_view = view_from_json(body)
     except Exception as exc:
         # This is in debug because the product shows an error already.
         logger.debug(six.text_type(exc), exc_info=True)
@@ -538,6 +785,11 @@ def fetch_sourcemap(url, project=None, release=None, allow_scraping=True):
             'url': expose_url(url),
         })
 
+    if cache_key is not None:
+        # The parsed view is roughly proportional in size to the raw map
+        release_artifact_cache.set(cache_key, sourcemap_view, len(body))
+    return sourcemap_view
+
 
 def is_data_uri(url):
     return url[:BASE64_PREAMBLE_LENGTH] == BASE64_SOURCEMAP_PREAMBLE
@@ -596,6 +848,8 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         self.cache = SourceCache()
         self.sourcemaps = SourceMapCache()
         self.release = None
+        # url -> UrlResult (or BadSource) fetched by populate_source_cache
+        self.prefetched = {}
 
     def get_stacktraces(self, data):
         try:
@@ -826,9 +1080,9 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         # TODO: respect cache-control/max-age headers to some extent
         logger.debug('Fetching remote source %r', filename)
         try:
-            result = fetch_file(filename, project=self.project,
-                                release=self.release,
-                                allow_scraping=self.allow_scraping)
+            result = self.get_prefetched(filename) or fetch_file(
+                filename, project=self.project, release=self.release,
+                allow_scraping=self.allow_scraping)
         except BadSource as exc:
             cache.add_error(filename, exc.data)
             return
@@ -853,6 +1107,7 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 project=self.project,
                 release=self.release,
                 allow_scraping=self.allow_scraping,
+                result=self.get_prefetched(sourcemap_url),
             )
         except BadSource as exc:
             cache.add_error(filename, exc.data)
@@ -887,7 +1142,47 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 continue
             pending_file_list.add(f['abs_path'])
 
+        # Fetch the sources, and then the sourcemaps they reference, up front
+        # so that each round happens concurrently rather than one file at a
+        # time in cache_source.
+        self.prefetch(list(pending_file_list)[:max(self.max_fetches - self.fetch_count, 0)])
+
+        sourcemap_urls = set()
+        for result in six.itervalues(self.prefetched):
+            if isinstance(result, BadSource):
+                continue
+            sourcemap_url = discover_sourcemap(result)
+            if not sourcemap_url or is_data_uri(sourcemap_url):
+                continue
+            # sourcemaps with a precompiled index aren't fetched at all
+            if self.release is not None and \
+                    fetch_release_sourcemap_index(sourcemap_url, self.release) is not None:
+                continue
+            sourcemap_urls.add(sourcemap_url)
+        self.prefetch(sourcemap_urls)
+
         for idx, filename in enumerate(pending_file_list):
             self.cache_source(
                 filename=filename,
             )
+
+    def prefetch(self, urls):
+        urls = [url for url in urls if url not in self.prefetched]
+        if not urls:
+            return
+        self.prefetched.update(fetch_files(
+            urls,
+            project=self.project,
+            release=self.release,
+            allow_scraping=self.allow_scraping,
+        ))
+
+    def get_prefetched(self, url):
+        """
+        Returns the UrlResult fetched for ``url`` by ``prefetch`` (raising the
+        error instead if the fetch failed), or ``None`` if it wasn't fetched.
+        """
+        result = self.prefetched.get(url)
+        if isinstance(result, BadSource):
+            raise result
+        return result
@@ -4,16 +4,28 @@ import os
 import uuid
 import time
 import errno
+import fcntl
 import six
 import shutil
 
+from contextlib import contextmanager
+
 from sentry import options
 from sentry.models import find_dsym_file
+from sentry.utils import metrics
 
 
 ONE_DAY = 60 * 60 * 24
 ONE_DAY_AND_A_HALF = int(ONE_DAY * 1.5)
 
+# How often the timestamp of a cached dsym is bumped when it's used, which
+# is the granularity of the least recently used eviction.
+TIMESTAMP_BUMP_INTERVAL = 60 * 10
+
+# Folders in the cache path which do not hold cached dsyms.
+LOCKS_FOLDER = 'locks'
+EXCLUDED_FOLDERS = frozenset([LOCKS_FOLDER, 'system'])
+
 
 class DSymCache(object):
 
@@ -21,12 +33,19 @@ class DSymCache(object):
     def dsym_cache_path(self):
         return options.get('dsym.cache-path')
 
+    @property
+    def max_size(self):
+        return options.get('dsym.cache-max-size')
+
     def get_project_path(self, project):
         return os.path.join(self.dsym_cache_path, six.text_type(project.id))
 
     def get_global_path(self):
         return os.path.join(self.dsym_cache_path, 'global')
 
+    def get_lock_path(self, image_uuid):
+        return os.path.join(self.dsym_cache_path, LOCKS_FOLDER, image_uuid)
+
     def fetch_dsyms(self, project, uuids):
         bases = set()
         loaded = set()
@@ -39,23 +58,76 @@ class DSymCache(object):
 
     def try_bump_timestamp(self, path, old_stat):
         now = int(time.time())
-        if old_stat.st_ctime < now - ONE_DAY:
-            os.utime(path, (now, now))
+        if old_stat.st_mtime < now - TIMESTAMP_BUMP_INTERVAL:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
         return path
 
-    def fetch_dsym(self, project, image_uuid):
-        image_uuid = image_uuid.lower()
-        for path in self.get_project_path(project), self.get_global_path():
-            base = self.get_project_path(project)
+    def find_cached_dsym(self, project, image_uuid):
+        for base in self.get_project_path(project), self.get_global_path():
             dsym = os.path.join(base, image_uuid)
             try:
-                os.stat(dsym)
+                st = os.stat(dsym)
             except OSError as e:
                 if e.errno != errno.ENOENT:
                     raise
             else:
+                self.try_bump_timestamp(dsym, st)
                 return base
 
+    @contextmanager
+    def lock(self, image_uuid):
+        """Holds an exclusive lock on the given uuid for as long as the
+        context is active.  Processes (and threads) that want to download the
+        same dsym wait here for the first one to finish.
+        """
+        path = self.get_lock_path(image_uuid)
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError:
+            pass
+        while True:
+            with open(path, 'a') as f:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    # the lock file might have been cleared while we waited,
+                    # in which case the lock we hold excludes no one
+                    if os.fstat(f.fileno()).st_ino != os.stat(path).st_ino:
+                        continue
+                except OSError:
+                    continue
+                try:
+                    # keep the lock file from being cleared as stale
+                    os.utime(path, None)
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                return
+
+    def fetch_dsym(self, project, image_uuid):
+        image_uuid = image_uuid.lower()
+        base = self.find_cached_dsym(project, image_uuid)
+        if base is not None:
+            metrics.incr('dsym.cache.hit')
+            return base
+
+        with self.lock(image_uuid):
+            # someone else might have fetched it while we were waiting
+            base = self.find_cached_dsym(project, image_uuid)
+            if base is not None:
+                metrics.incr('dsym.cache.coalesced')
+                return base
+
+            metrics.incr('dsym.cache.miss')
+            base = self.download_dsym(project, image_uuid)
+
+        if base is not None:
+            self.evict_to_size()
+        return base
+
+    def download_dsym(self, project, image_uuid):
         dsf = find_dsym_file(project, image_uuid)
         if dsf is None:
             return None
@@ -71,12 +143,13 @@ class DSymCache(object):
         except OSError:
             pass
 
-        with dsf.file.getfile() as sf:
+        with metrics.timer('dsym.cache.fetch'), dsf.file.getfile() as sf:
             suffix = '_%s' % uuid.uuid4()
             done = False
             try:
                 with open(dsym + suffix, 'w') as df:
                     shutil.copyfileobj(sf, df)
+                    size = df.tell()
                 os.rename(dsym + suffix, dsym)
                 done = True
             finally:
@@ -88,17 +161,19 @@ class DSymCache(object):
                     except Exception:
                         pass
 
+        metrics.incr('dsym.cache.bytes_fetched', size)
         return base
 
-    def clear_old_entries(self):
+    def iter_cached_files(self):
+        """Yields the path and stat result of every file in the cache."""
         try:
             cache_folders = os.listdir(self.dsym_cache_path)
         except OSError:
             return
 
-        cutoff = int(time.time()) - ONE_DAY_AND_A_HALF
-
         for cache_folder in cache_folders:
+            if cache_folder in EXCLUDED_FOLDERS:
+                continue
             cache_folder = os.path.join(self.dsym_cache_path, cache_folder)
             try:
                 items = os.listdir(cache_folder)
@@ -107,14 +182,76 @@ class DSymCache(object):
             for cached_file in items:
                 cached_file = os.path.join(cache_folder, cached_file)
                 try:
-                    mtime = os.path.getmtime(cached_file)
+                    st = os.stat(cached_file)
                 except OSError:
                     continue
-                if mtime < cutoff:
-                    try:
-                        os.remove(cached_file)
-                    except OSError:
-                        pass
+                yield cached_file, st
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
+
+    def remove_lock(self, path):
+        """Removes the given lock file unless it's currently held."""
+        try:
+            f = open(path)
+        except IOError:
+            return False
+        with f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError:
+                return False
+            return self.remove(path)
+
+    def evict_to_size(self, max_size=None):
+        """Removes the least recently used dsyms until the cache fits into
+        its size budget.
+        """
+        if max_size is None:
+            max_size = self.max_size
+
+        items = sorted(self.iter_cached_files(), key=lambda x: x[1].st_mtime)
+        total_size = sum(st.st_size for _, st in items)
+        evicted = 0
+        for path, st in items:
+            if total_size <= max_size:
+                break
+            if self.remove(path):
+                evicted += 1
+            total_size -= st.st_size
+
+        if evicted:
+            metrics.incr('dsym.cache.evict', evicted)
+
+    def clear_old_entries(self):
+        cutoff = int(time.time()) - ONE_DAY_AND_A_HALF
+        evicted = 0
+        for path, st in self.iter_cached_files():
+            if st.st_mtime < cutoff and self.remove(path):
+                evicted += 1
+
+        # locks are touched when taken, so old ones are stale unless held
+        lock_folder = os.path.join(self.dsym_cache_path, LOCKS_FOLDER)
+        try:
+            locks = os.listdir(lock_folder)
+        except OSError:
+            locks = []
+        for lock in locks:
+            lock = os.path.join(lock_folder, lock)
+            try:
+                mtime = os.path.getmtime(lock)
+            except OSError:
+                continue
+            if mtime < cutoff:
+                self.remove_lock(lock)
+
+        if evicted:
+            metrics.incr('dsym.cache.evict', evicted)
+        self.evict_to_size()
 
 
 dsymcache = DSymCache()
@@ -379,31 +379,46 @@ class NativeStacktraceProcessor(StacktraceProcessor):
         # The symbolizer gets a reference to the debug meta's images so
         # when it resolves the missing vmaddrs it changes them in the data
         # dict.
-        return self.sym.resolve_missing_vmaddrs()
+        changed = self.sym.resolve_missing_vmaddrs()
 
-    def process_frame(self, frame):
-        # XXX: warn on missing availability?
+        # Look up the system symbols of all frames at once rather than
+        # once per frame in process_frame.
+        self.sym.preload_system_symbols([
+            self.get_sym_frame(frame)
+            for info in self.stacktrace_infos
+            for frame in info.stacktrace['frames']
+            if self.is_native_frame(frame)
+        ], self.sdk_info)
 
+        return changed
+
+    def is_native_frame(self, frame):
         # Only process frames here that are of supported platforms and
         # have the mandatory requirements for
-        if not self.available or \
-           self.get_effective_platform(frame) != 'cocoa' or \
-           'image_addr' not in frame or \
-           'instruction_addr' not in frame or \
-           'symbol_addr' not in frame:
-            return None
-
-        errors = []
+        return self.get_effective_platform(frame) == 'cocoa' and \
+            'image_addr' in frame and \
+            'instruction_addr' in frame and \
+            'symbol_addr' in frame
 
+    def get_sym_frame(self, frame):
         # Construct a raw frame that is used by the symbolizer
         # backend.
-        sym_frame = {
+        return {
             'object_name': frame.get('package'),
             'object_addr': frame['image_addr'],
             'instruction_addr': frame['instruction_addr'],
             'symbol_name': frame.get('function'),
             'symbol_addr': frame['symbol_addr'],
         }
+
+    def process_frame(self, frame):
+        # XXX: warn on missing availability?
+        if not self.available or not self.is_native_frame(frame):
+            return None
+
+        errors = []
+
+        sym_frame = self.get_sym_frame(frame)
         new_frame = dict(frame)
         raw_frame = dict(frame)
 
@@ -103,6 +103,21 @@ def find_system_symbol(img, instruction_addr, sdk_info=None):
     )
 
 
+def find_system_symbols(lookups, sdk_info=None):
+    """Finds the system symbols for a list of (image, instruction address)
+    tuples at once.
+    """
+    return DSymSymbol.objects.lookup_symbols([{
+        'instruction_addr': instruction_addr,
+        'image_addr': img['image_addr'],
+        'image_vmaddr': img['image_vmaddr'],
+        'uuid': img['uuid'],
+        'cpu_name': get_cpu_name(img['cpu_type'],
+                                 img['cpu_subtype']),
+        'object_path': img['name'],
+    } for img, instruction_addr in lookups], sdk_info=sdk_info)
+
+
 def make_symbolizer(project, binary_images, referenced_images=None):
     """Creates a symbolizer for the given project and binary images.  If a
     list of referenced images is referenced (UUIDs) then only images
@@ -135,6 +150,8 @@ class Symbolizer(object):
             project, binary_images, referenced_images=referenced_images)
         self.images = dict((img['image_addr'], img) for img in binary_images)
         self.is_debug_build = is_debug_build
+        # (object_addr, instruction_addr) -> system symbol
+        self.system_symbols = {}
 
     def resolve_missing_vmaddrs(self):
         """When called this changes the vmaddr on all contained images from
@@ -240,9 +257,35 @@ class Symbolizer(object):
 
         return self._process_frame(new_frame, img)
 
+    def preload_system_symbols(self, frames, sdk_info=None):
+        """Looks up the system symbols for all of the given frames at once,
+        so that symbolizing them doesn't need a lookup per frame.
+        """
+        to_load = {}
+        for frame in frames:
+            img = self.images.get(frame['object_addr'])
+            if img is None or self._is_app_bundled_frame(frame, img):
+                continue
+            key = (frame['object_addr'], frame['instruction_addr'])
+            if key not in self.system_symbols:
+                to_load[key] = img
+
+        to_load = list(six.iteritems(to_load))
+        symbols = find_system_symbols([
+            (image, instruction_addr)
+            for (_, instruction_addr), image in to_load
+        ], sdk_info)
+        for (key, _), symbol in zip(to_load, symbols):
+            self.system_symbols[key] = symbol
+
     def symbolize_system_frame(self, frame, img, sdk_info):
         """Symbolizes a frame with system symbols only."""
-        symbol = find_system_symbol(img, frame['instruction_addr'], sdk_info)
+        key = (frame['object_addr'], frame['instruction_addr'])
+        if key in self.system_symbols:
+            symbol = self.system_symbols[key]
+        else:
+            symbol = find_system_symbol(img, frame['instruction_addr'],
+                                        sdk_info)
         if symbol is None:
             # Simulator frames cannot be symbolicated
             if self._is_simulator_frame(frame, img):
@@ -279,6 +322,8 @@ class Symbolizer(object):
         errors = []
         idx = -1
 
+        self.preload_system_symbols(backtrace, sdk_info)
+
         for idx, frm in enumerate(backtrace):
             try:
                 rv.append(self.symbolize_frame(frm, sdk_info))
@@ -0,0 +1,205 @@
+"""
+sentry.lang.native.systemsymbols
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Exports the system symbols of each `DSymObject` into a local, memory
+mapped symbol table so that they can be looked up without the database.
+
+A symbol table file consists of a header (magic, version and the number
+of symbols), the records sorted by address (address, offset and length of
+the symbol name) and finally the symbol names themselves.
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import os
+import mmap
+import uuid
+import errno
+import struct
+import bisect
+import threading
+
+from sentry import options
+
+
+MAGIC = b'SSYM'
+VERSION = 1
+HEADER = struct.Struct('<4sII')
+RECORD = struct.Struct('<QII')
+
+
+class BadSymbolTable(Exception):
+    pass
+
+
+def get_system_symbols_path():
+    return os.path.join(options.get('dsym.cache-path'), 'system')
+
+
+def get_symbol_table_path(object_id):
+    return os.path.join(get_system_symbols_path(), '%s.symbols' % object_id)
+
+
+def write_symbol_table(f, symbols):
+    """Writes a symbol table for the given list of (address, symbol) tuples
+    into the file object `f`.
+    """
+    symbols = sorted(symbols)
+    f.write(HEADER.pack(MAGIC, VERSION, len(symbols)))
+    offset = 0
+    names = []
+    for address, symbol in symbols:
+        name = symbol.encode('utf-8')
+        f.write(RECORD.pack(address, offset, len(name)))
+        names.append(name)
+        offset += len(name)
+    for name in names:
+        f.write(name)
+
+
+def export_symbol_table(object_id):
+    """Exports the symbols of the given `DSymObject` (by id) from the
+    database into its symbol table file and returns the path.
+    """
+    from sentry.models import DSymSymbol
+
+    path = get_symbol_table_path(object_id)
+    try:
+        os.makedirs(os.path.dirname(path))
+    except OSError:
+        pass
+
+    symbols = DSymSymbol.objects.filter(
+        object=object_id,
+    ).values_list('address', 'symbol')
+
+    suffix = '_%s' % uuid.uuid4()
+    done = False
+    try:
+        with open(path + suffix, 'wb') as f:
+            write_symbol_table(f, symbols)
+        os.rename(path + suffix, path)
+        done = True
+    finally:
+        if not done:
+            try:
+                os.remove(path + suffix)
+            except Exception:
+                pass
+
+    return path
+
+
+class SymbolTable(object):
+    """A read only, memory mapped symbol table."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            if self.stat.st_size < HEADER.size:
+                raise BadSymbolTable('Symbol table is truncated')
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self._count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise BadSymbolTable('Unsupported symbol table')
+        self._names_offset = HEADER.size + self._count * RECORD.size
+        if self.stat.st_size < self._names_offset:
+            raise BadSymbolTable('Symbol table is truncated')
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, idx):
+        """Returns the address of the `idx`-th symbol, which makes the table
+        usable with `bisect`.
+        """
+        if not 0 <= idx < self._count:
+            raise IndexError(idx)
+        return RECORD.unpack_from(self._map, HEADER.size + idx * RECORD.size)[0]
+
+    def get_symbol(self, idx):
+        address, offset, length = RECORD.unpack_from(
+            self._map, HEADER.size + idx * RECORD.size)
+        offset += self._names_offset
+        return address, self._map[offset:offset + length].decode('utf-8')
+
+    def lookup(self, upper, lower):
+        """Returns the (address, symbol) with the highest address in the
+        inclusive range from `lower` to `upper`, or `None`.
+        """
+        idx = bisect.bisect_right(self, upper) - 1
+        if idx < 0:
+            return None
+        address, symbol = self.get_symbol(idx)
+        if address < lower:
+            return None
+        return address, symbol
+
+    def close(self):
+        self._map.close()
+
+
+class SymbolTables(object):
+    """The symbol tables opened by this process, keyed by object id.  A
+    table is reopened if its file has been exported again.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def get(self, object_id):
+        path = get_symbol_table_path(object_id)
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+
+        with self._lock:
+            table = self._tables.get(object_id)
+            if table is not None and (table.stat.st_ino, table.stat.st_mtime) == \
+                    (st.st_ino, st.st_mtime):
+                return table
+            try:
+                self._tables[object_id] = new_table = SymbolTable(path)
+            except (BadSymbolTable, IOError, OSError, ValueError):
+                return None
+            # the old mapping stays valid for anyone still using it, so it's
+            # left for the garbage collector rather than closed here
+            return new_table
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+
+symbol_tables = SymbolTables()
+
+
+def find_symbols(ranges):
+    """Looks up the given (object_id, upper, lower) ranges in the local
+    symbol tables.  Returns a dictionary mapping the ranges found to their
+    (address, symbol), and the list of ranges whose object has no symbol
+    table (and thus need to be looked up in the database).
+    """
+    rv = {}
+    missing = []
+    tables = {}
+    for r in ranges:
+        object_id, upper, lower = r
+        if object_id not in tables:
+            tables[object_id] = symbol_tables.get(object_id)
+        table = tables[object_id]
+        if table is None:
+            missing.append(r)
+            continue
+        result = table.lookup(upper, lower)
+        if result is not None:
+            rv[r] = result
+    return rv, missing
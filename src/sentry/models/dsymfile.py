@@ -27,6 +27,10 @@ from sentry.utils.db import is_sqlite
 from sentry.utils.native import parse_addr
 from sentry.constants import KNOWN_DSYM_TYPES
 
+# The maximum number of symbol lookups per query (each takes four
+# parameters, which keeps us below SQLite's limit of 999).
+SYMBOL_LOOKUP_BATCH_SIZE = 200
+
 
 class DSymSDKManager(BaseManager):
 
@@ -169,120 +173,166 @@ class DSymSymbolManager(BaseManager):
                       cpu_name=None, object_path=None, sdk_info=None,
                       image_vmaddr=None):
         """Finds a system symbol."""
+        return self.lookup_symbols([{
+            'instruction_addr': instruction_addr,
+            'image_addr': image_addr,
+            'image_vmaddr': image_vmaddr,
+            'uuid': uuid,
+            'cpu_name': cpu_name,
+            'object_path': object_path,
+        }], sdk_info=sdk_info)[0]
+
+    def lookup_symbols(self, lookups, sdk_info=None):
+        """Finds the system symbols for many instruction addresses at once.
+        Each lookup is a dictionary with the arguments of `lookup_symbol`
+        (other than `sdk_info`), and a list of the symbols found (or `None`)
+        is returned in the same order.
+
+        Independently of the number of lookups this resolves the objects
+        with at most two queries and the symbols with a single batched query
+        (per `SYMBOL_LOOKUP_BATCH_SIZE` lookups).
+        """
+        rv = [None] * len(lookups)
+
         # If we use the "none" dsym type we never return a symbol here.
-        if sdk_info is not None and sdk_info['dsym_type'] == 'none':
-            return
+        if not lookups or \
+           (sdk_info is not None and sdk_info['dsym_type'] == 'none'):
+            return rv
+
+        # Every lookup is tried against a list of (object_id, upper, lower)
+        # address ranges, in the following order of preference:
+        #
+        # 1. exact match on uuid (addr_rel)
+        # 2. exact match on uuid (addr_abs)
+        # 3. exact match on path and arch (addr_rel)
+        # 4. exact match on path and arch (addr_abs)
+        #
+        # Within each tier the symbol with the highest address wins.
+        objects_by_uuid = self._get_objects_by_uuid(set(
+            six.text_type(x['uuid']).lower() for x in lookups))
+        objects_by_path = {}
+        if sdk_info is not None:
+            objects_by_path = self._get_objects_by_path(sdk_info, set(
+                x['object_path'] for x in lookups
+                if x.get('cpu_name') is not None and
+                x.get('object_path') is not None))
+
+        all_tiers = []
+        for lookup in lookups:
+            instruction_addr = parse_addr(lookup['instruction_addr'])
+            image_addr = parse_addr(lookup['image_addr'])
+            image_vmaddr = lookup.get('image_vmaddr')
+
+            addr_abs = None
+            if image_vmaddr is not None:
+                image_vmaddr = parse_addr(image_vmaddr)
+                addr_abs = image_vmaddr + instruction_addr - image_addr
+            addr_rel = instruction_addr - image_addr
+
+            by_uuid = objects_by_uuid.get(
+                six.text_type(lookup['uuid']).lower(), ())
+            by_path = objects_by_path.get(
+                (lookup.get('cpu_name'), lookup.get('object_path')), ())
+
+            tiers = []
+            for objects in by_uuid, by_path:
+                tiers.append([
+                    (object_id, vmaddr + addr_rel, vmaddr)
+                    for object_id, vmaddr in objects
+                    if vmaddr is not None
+                ])
+                if addr_abs is not None:
+                    tiers.append([
+                        (object_id, addr_abs, image_vmaddr)
+                        for object_id, _ in objects
+                    ])
+            all_tiers.append(tiers)
+
+        found = self._find_symbols(set(
+            r for tiers in all_tiers for tier in tiers for r in tier))
+
+        for idx, tiers in enumerate(all_tiers):
+            for tier in tiers:
+                matches = [found[r] for r in tier if r in found]
+                if matches:
+                    rv[idx] = max(matches)[1]
+                    break
+        return rv
 
-        instruction_addr = parse_addr(instruction_addr)
-        image_addr = parse_addr(image_addr)
+    def _get_objects_by_uuid(self, uuids):
+        rv = {}
+        for object_id, uuid, vmaddr in DSymObject.objects.filter(
+            uuid__in=uuids,
+        ).values_list('id', 'uuid', 'vmaddr'):
+            rv.setdefault(uuid, []).append((object_id, vmaddr))
+        return rv
 
-        addr_abs = None
-        if image_vmaddr is not None:
-            image_vmaddr = parse_addr(image_vmaddr)
-            addr_abs = image_vmaddr + instruction_addr - image_addr
-        addr_rel = instruction_addr - image_addr
+    def _get_objects_by_path(self, sdk_info, object_paths):
+        if not object_paths:
+            return {}
 
-        uuid = six.text_type(uuid).lower()
+        rv = {}
         cur = connection.cursor()
         try:
-            # First try: exact match on uuid (addr_rel)
-            cur.execute('''
-                select s.symbol
-                  from sentry_dsymsymbol s,
-                       sentry_dsymobject o
-                 where o.uuid = %s and
-                       s.object_id = o.id and
-                       s.address <= o.vmaddr + %s and
-                       s.address >= o.vmaddr
-              order by address desc
-                 limit 1;
-            ''', [uuid, addr_rel])
-            rv = cur.fetchone()
-            if rv:
-                return rv[0]
-
-            # Second try: exact match on uuid (addr_abs)
-            if addr_abs is not None:
-                cur.execute('''
-                    select s.symbol
-                      from sentry_dsymsymbol s,
-                           sentry_dsymobject o
-                     where o.uuid = %s and
-                           s.object_id = o.id and
-                           s.address <= %s and
-                           s.address >= %s
-                  order by address desc
-                     limit 1;
-                ''', [uuid, addr_abs, image_vmaddr])
-                rv = cur.fetchone()
-                if rv:
-                    return rv[0]
-
-            # Third try: exact match on path and arch (addr_rel)
-            if sdk_info is None or \
-               cpu_name is None or \
-               object_path is None:
-                return
-
             cur.execute('''
-                select s.symbol
-                  from sentry_dsymsymbol s,
-                       sentry_dsymobject o,
+                select o.id, o.cpu_name, o.object_path, o.vmaddr
+                  from sentry_dsymobject o,
                        sentry_dsymsdk k,
                        sentry_dsymbundle b
                  where b.sdk_id = k.id and
                        b.object_id = o.id and
-                       s.object_id = o.id and
-                       k.sdk_name = %s and
-                       k.dsym_type = %s and
-                       k.version_major = %s and
-                       k.version_minor = %s and
-                       k.version_patchlevel = %s and
-                       o.cpu_name = %s and
-                       o.object_path = %s and
-                       s.address <= o.vmaddr + %s and
-                       s.address >= o.vmaddr
-              order by address desc
-                 limit 1;
-            ''', [sdk_info['sdk_name'], sdk_info['dsym_type'],
-                  sdk_info['version_major'], sdk_info['version_minor'],
-                  sdk_info['version_patchlevel'], cpu_name, object_path,
-                  addr_rel])
-            rv = cur.fetchone()
-            if rv:
-                return rv[0]
-
-            # Fourth try: exact match on path and arch (addr_abs)
-            if addr_abs is not None:
-                cur.execute('''
-                    select s.symbol
-                      from sentry_dsymsymbol s,
-                           sentry_dsymobject o,
-                           sentry_dsymsdk k,
-                           sentry_dsymbundle b
-                     where b.sdk_id = k.id and
-                           b.object_id = o.id and
-                           s.object_id = o.id and
-                           k.sdk_name = %s and
-                           k.dsym_type = %s and
-                           k.version_major = %s and
-                           k.version_minor = %s and
-                           k.version_patchlevel = %s and
-                           o.cpu_name = %s and
-                           o.object_path = %s and
-                           s.address <= %s and
-                           s.address >= %s
-                  order by address desc
-                     limit 1;
-                ''', [sdk_info['sdk_name'], sdk_info['dsym_type'],
-                      sdk_info['version_major'], sdk_info['version_minor'],
-                      sdk_info['version_patchlevel'], cpu_name, object_path,
-                      addr_abs, image_vmaddr])
-                rv = cur.fetchone()
-                if rv:
-                    return rv[0]
+                       k.sdk_name = %%s and
+                       k.dsym_type = %%s and
+                       k.version_major = %%s and
+                       k.version_minor = %%s and
+                       k.version_patchlevel = %%s and
+                       o.object_path in (%s);
+            ''' % ', '.join(['%s'] * len(object_paths)),
+                [sdk_info['sdk_name'], sdk_info['dsym_type'],
+                 sdk_info['version_major'], sdk_info['version_minor'],
+                 sdk_info['version_patchlevel']] + list(object_paths))
+            for object_id, cpu_name, object_path, vmaddr in cur.fetchall():
+                rv.setdefault((cpu_name, object_path), []).append(
+                    (object_id, vmaddr))
         finally:
             cur.close()
+        return rv
+
+    def _find_symbols(self, ranges):
+        """Returns a dictionary mapping each of the given (object_id, upper,
+        lower) ranges to the (address, symbol) with the highest address in
+        it, for those ranges that contain any symbol.
+
+        Objects which have been exported into a local symbol table are
+        looked up there, only the others hit the database.
+        """
+        from sentry.lang.native.systemsymbols import find_symbols
+        rv, ranges = find_symbols(ranges)
+        if not ranges:
+            return rv
+
+        cur = connection.cursor()
+        try:
+            for idx in range(0, len(ranges), SYMBOL_LOOKUP_BATCH_SIZE):
+                batch = ranges[idx:idx + SYMBOL_LOOKUP_BATCH_SIZE]
+                cur.execute(' union all '.join(['''
+                    select %s, s.address, s.symbol
+                      from sentry_dsymsymbol s
+                     where s.id = (
+                        select id
+                          from sentry_dsymsymbol
+                         where object_id = %s and
+                               address <= %s and
+                               address >= %s
+                      order by address desc
+                         limit 1)
+                '''] * len(batch)), list(chain(*(
+                    (i,) + r for i, r in enumerate(batch)))))
+                for i, address, symbol in cur.fetchall():
+                    rv[batch[i]] = (address, symbol)
+        finally:
+            cur.close()
+        return rv
 
 
 class DSymSymbol(Model):
@@ -8,30 +8,41 @@ sentry.models.file
 
 from __future__ import absolute_import
 
+import bisect
 import six
 
 from hashlib import sha1
+from multiprocessing.pool import ThreadPool
 from uuid import uuid4
 
 from django.conf import settings
 from django.core.files.base import File as FileObj
 from django.core.files.base import ContentFile
 from django.core.files.storage import get_storage_class
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
 from django.utils import timezone
 from jsonfield import JSONField
 
-from sentry.app import locks
 from sentry.db.models import (
     BoundedPositiveIntegerField, FlexibleForeignKey, Model
 )
 from sentry.utils import metrics
-from sentry.utils.retries import TimedRetryPolicy
+from sentry.utils.concurrent import execute
 
 ONE_DAY = 60 * 60 * 24
 
 DEFAULT_BLOB_SIZE = 1024 * 1024  # one mb
 
+# The number of blobs `File.putfile` holds in memory (and checks for in one
+# query), and the number of them which are uploaded at the same time.
+UPLOAD_BATCH_SIZE = 32
+UPLOAD_CONCURRENCY = 8
+
+# The number of blobs read ahead while reading a file, and the number of
+# blobs fetched at the same time by `read_range`.
+READ_AHEAD = 1
+READ_CONCURRENCY = 8
+
 
 def get_storage():
     from sentry import options
@@ -68,39 +79,73 @@ class FileBlob(Model):
 
         >>> blobs = FileBlob.from_file(fileobj)
         """
-        size = 0
+        contents = b''.join(fileobj)
+        checksum = sha1(contents).hexdigest()
+        return cls.from_chunks([(checksum, contents)])[checksum]
 
-        checksum = sha1(b'')
-        for chunk in fileobj:
-            size += len(chunk)
-            checksum.update(chunk)
-        checksum = checksum.hexdigest()
-
-        # TODO(dcramer): the database here is safe, but if this lock expires
-        # and duplicate files are uploaded then we need to prune one
-        lock = locks.get('fileblob:upload:{}'.format(checksum), duration=60 * 10)
-        with TimedRetryPolicy(60)(lock.acquire):
-            # test for presence
-            try:
-                existing = FileBlob.objects.get(checksum=checksum)
-            except FileBlob.DoesNotExist:
-                pass
-            else:
-                return existing
-
-            blob = cls(
-                size=size,
-                checksum=checksum,
-            )
+    @classmethod
+    def from_chunks(cls, chunks):
+        """
+        Retrieve the blobs for a list of ``(checksum, contents)`` chunks as a
+        dictionary keyed by checksum.
 
-            blob.path = cls.generate_unique_path(blob.timestamp)
+        Blobs which are not already present are uploaded to the storage
+        concurrently.
 
-            storage = get_storage()
-            storage.save(blob.path, fileobj)
-            blob.save()
+        >>> blobs = FileBlob.from_chunks(chunks)
+        """
+        rv = dict(
+            (blob.checksum, blob) for blob in cls.objects.filter(
+                checksum__in=set(c for c, _ in chunks),
+            )
+        )
+
+        missing = []
+        for checksum, contents in chunks:
+            if checksum not in rv:
+                blob = cls(size=len(contents), checksum=checksum)
+                blob.path = cls.generate_unique_path(blob.timestamp)
+                rv[checksum] = blob
+                missing.append((blob, contents))
+        if not missing:
+            return rv
+
+        def upload(item):
+            blob, contents = item
+            get_storage().save(blob.path, ContentFile(contents))
+
+        if len(missing) == 1:
+            upload(missing[0])
+        else:
+            pool = ThreadPool(min(len(missing), UPLOAD_CONCURRENCY))
+            try:
+                pool.map(upload, missing)
+            finally:
+                pool.close()
 
-        metrics.timing('filestore.blob-size', size)
-        return blob
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create([b for b, _ in missing])
+        except IntegrityError:
+            # someone else uploaded some of these blobs in the meantime, so
+            # save them one by one and drop our copies of those
+            for blob, _ in missing:
+                try:
+                    with transaction.atomic():
+                        blob.save()
+                except IntegrityError:
+                    get_storage().delete(blob.path)
+
+        # bulk_create does not set primary keys
+        for blob in cls.objects.filter(
+            checksum__in=[b.checksum for b, _ in missing],
+        ):
+            rv[blob.checksum] = blob
+
+        for blob, _ in missing:
+            metrics.timing('filestore.blob-size', blob.size)
+
+        return rv
 
     @classmethod
     def generate_unique_path(cls, timestamp):
@@ -111,12 +156,29 @@ class FileBlob(Model):
         pieces.append(uuid4().hex)
         return u'/'.join(pieces)
 
+    @classmethod
+    def touch(cls, blobs):
+        """
+        Bumps the timestamp of the given blobs, which keeps them from being
+        garbage collected and, within a transaction, locks them against
+        deletion until it ends. Returns whether all of the blobs still exist.
+        """
+        ids = set(b.id for b in blobs)
+        return cls.objects.filter(id__in=ids).update(
+            timestamp=timezone.now(),
+        ) == len(ids)
+
     def delete(self, *args, **kwargs):
-        lock = locks.get('fileblob:upload:{}'.format(self.checksum), duration=60 * 10)
-        with TimedRetryPolicy(60)(lock.acquire):
-            if self.path:
-                self.deletefile(commit=False)
+        path = self.path
+        with transaction.atomic(using=router.db_for_write(FileBlob)):
+            # wait for uploads which are about to reference this blob, so
+            # that their indexes are collected along with it
+            list(FileBlob.objects.select_for_update().filter(
+                id=self.id,
+            ).values_list('id', flat=True))
             super(FileBlob, self).delete(*args, **kwargs)
+        if path:
+            get_storage().delete(path)
 
     def deletefile(self, commit=False):
         assert self.path
@@ -176,37 +238,53 @@ class File(Model):
         """
         Save a fileobj into a number of chunks.
 
+        Chunks are processed in batches: the blobs that already exist are
+        looked up in one query, the missing ones are uploaded concurrently
+        and the index rows are created in bulk.
+
         Returns a list of `FileBlobIndex` items.
 
         >>> indexes = file.putfile(fileobj)
         """
-        results = []
         offset = 0
         checksum = sha1(b'')
 
         while True:
-            contents = fileobj.read(blob_size)
-            if not contents:
+            chunks = []
+            while len(chunks) < UPLOAD_BATCH_SIZE:
+                contents = fileobj.read(blob_size)
+                if not contents:
+                    break
+                checksum.update(contents)
+                chunks.append((sha1(contents).hexdigest(), contents))
+            if not chunks:
                 break
-            checksum.update(contents)
 
-            blob_fileobj = ContentFile(contents)
-            blob = FileBlob.from_file(blob_fileobj)
+            while True:
+                blobs = FileBlob.from_chunks(chunks)
+                with transaction.atomic(using=router.db_for_write(FileBlobIndex)):
+                    # a blob which existed already might have been deleted
+                    # since, in which case it has to be uploaded again
+                    if FileBlob.touch(blobs.values()):
+                        indexes = []
+                        for chunk_checksum, contents in chunks:
+                            indexes.append(FileBlobIndex(
+                                file=self,
+                                blob=blobs[chunk_checksum],
+                                offset=offset,
+                            ))
+                            offset += len(contents)
+                        FileBlobIndex.objects.bulk_create(indexes)
+                        break
 
-            results.append(
-                FileBlobIndex.objects.create(
-                    file=self,
-                    blob=blob,
-                    offset=offset,
-                )
-            )
-            offset += blob.size
         self.size = offset
         self.checksum = checksum.hexdigest()
         metrics.timing('filestore.file-size', offset)
         if commit:
             self.save()
-        return results
+        return list(FileBlobIndex.objects.filter(
+            file=self,
+        ).select_related('blob').order_by('offset'))
 
 
 class FileBlobIndex(Model):
@@ -223,11 +301,22 @@ class FileBlobIndex(Model):
 
 
 class ChunkedFileBlobIndexWrapper(object):
-    def __init__(self, indexes, mode=None):
+    """
+    A file-like object reading the blobs of a file in order.
+
+    While a blob is being read the next ``read_ahead`` blobs are fetched in
+    the background, so sequential reads from a remote storage do not wait
+    for a round-trip per blob.
+    """
+    def __init__(self, indexes, mode=None, read_ahead=READ_AHEAD):
         # eager load from database incase its a queryset
         self._indexes = list(indexes)
+        self._offsets = [i.offset for i in self._indexes]
         self._curfile = None
         self._curidx = None
+        self._curpos = None
+        self._prefetched = {}
+        self.read_ahead = read_ahead
         self.mode = mode
         self.open()
 
@@ -237,13 +326,38 @@ class ChunkedFileBlobIndexWrapper(object):
     def __exit__(self, exc_type, exc_value, tb):
         self.close()
 
-    def _nextidx(self):
-        try:
-            self._curidx = six.next(self._idxiter)
-            self._curfile = self._curidx.blob.getfile()
-        except StopIteration:
+    def _fetch(self, pos):
+        if pos not in self._prefetched:
+            self._prefetched[pos] = execute(_read_blob, self._indexes[pos].blob)
+        return self._prefetched[pos]
+
+    def _openidx(self, pos):
+        if self._curfile is not None:
+            self._curfile.close()
+        if pos >= len(self._indexes):
             self._curidx = None
             self._curfile = None
+            self._curpos = None
+            return
+
+        self._curpos = pos
+        self._curidx = self._indexes[pos]
+        future = self._prefetched.pop(pos, None)
+        if future is not None:
+            self._curfile = six.BytesIO(future.result())
+        else:
+            self._curfile = self._curidx.blob.getfile()
+
+        # drop read-ahead we skipped over and start the next one
+        for prefetched in list(self._prefetched):
+            if prefetched < pos:
+                del self._prefetched[prefetched]
+        for next_pos in range(pos + 1, min(pos + 1 + self.read_ahead,
+                                           len(self._indexes))):
+            self._fetch(next_pos)
+
+    def _nextidx(self):
+        self._openidx(self._curpos + 1)
 
     @property
     def size(self):
@@ -258,6 +372,8 @@ class ChunkedFileBlobIndexWrapper(object):
             self._curfile.close()
         self._curfile = None
         self._curidx = None
+        self._curpos = None
+        self._prefetched.clear()
         self.closed = True
 
     def seek(self, pos):
@@ -265,14 +381,11 @@ class ChunkedFileBlobIndexWrapper(object):
             raise ValueError('I/O operation on closed file')
         if pos < 0:
             raise IOError('Invalid argument')
-        for n, idx in enumerate(self._indexes[::-1]):
-            if idx.offset <= pos:
-                if idx != self._curidx:
-                    self._idxiter = iter(self._indexes[-(n + 1):])
-                    self._nextidx()
-                break
-        else:
+        n = bisect.bisect_right(self._offsets, pos) - 1
+        if n < 0:
             raise ValueError('Cannot seek to pos')
+        if n != self._curpos:
+            self._openidx(n)
         self._curfile.seek(pos - self._curidx.offset)
 
     def tell(self):
@@ -292,3 +405,39 @@ class ChunkedFileBlobIndexWrapper(object):
             bytes -= len(blob_result)
             result += blob_result
         return result
+
+    def read_range(self, offset, length):
+        """
+        Reads ``length`` bytes starting at ``offset`` without moving the
+        position of the file.  The blobs overlapping the range are fetched
+        in parallel.
+        """
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+        if offset < 0 or length < 0:
+            raise IOError('Invalid argument')
+        end = offset + length
+        first = max(bisect.bisect_right(self._offsets, offset) - 1, 0)
+        last = bisect.bisect_left(self._offsets, end)
+
+        reads = []
+        for idx in self._indexes[first:last]:
+            start = max(offset - idx.offset, 0)
+            reads.append((idx.blob, start, end - idx.offset - start))
+        if len(reads) <= 1:
+            return b''.join(_read_blob(*r) for r in reads)
+
+        pool = ThreadPool(min(len(reads), READ_CONCURRENCY))
+        try:
+            return b''.join(pool.map(lambda r: _read_blob(*r), reads))
+        finally:
+            pool.close()
+
+
+def _read_blob(blob, offset=0, length=None):
+    with blob.getfile() as f:
+        if offset:
+            f.seek(offset)
+        if length is None:
+            return f.read()
+        return f.read(length)
@@ -0,0 +1,59 @@
+from __future__ import absolute_import
+
+from django.db import IntegrityError, models, router, transaction
+
+from sentry.utils.cache import cache
+from sentry.db.models import (
+    BoundedPositiveIntegerField, Model, sane_repr
+)
+
+
+def floor_hour(datetime):
+    return datetime.replace(minute=0, second=0, microsecond=0)
+
+
+class GroupEventHour(Model):
+    """
+    Records each hour in which a group received at least one event, which
+    lets the search backend find the groups active within a date range
+    without scanning the event table.
+    """
+    __core__ = False
+
+    project_id = BoundedPositiveIntegerField()
+    group_id = BoundedPositiveIntegerField()
+    hour = models.DateTimeField()
+
+    class Meta:
+        app_label = 'sentry'
+        db_table = 'sentry_groupeventhour'
+        unique_together = (('group_id', 'hour'),)
+        index_together = (('project_id', 'hour'),)
+
+    __repr__ = sane_repr('group_id', 'hour')
+
+    @classmethod
+    def get_cache_key(cls, group_id, hour):
+        return 'groupeventhour:1:{}:{}'.format(
+            group_id,
+            hour.strftime('%Y%m%d%H'),
+        )
+
+    @classmethod
+    def record(cls, group, datetime):
+        hour = floor_hour(datetime)
+        cache_key = cls.get_cache_key(group.id, hour)
+
+        if cache.get(cache_key) is not None:
+            return
+
+        try:
+            with transaction.atomic(using=router.db_for_write(cls)):
+                cls.objects.create(
+                    project_id=group.project_id,
+                    group_id=group.id,
+                    hour=hour,
+                )
+        except IntegrityError:
+            pass
+        cache.set(cache_key, 1, 3600)
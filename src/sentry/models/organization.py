@@ -99,7 +99,7 @@ class Organization(Model):
     objects = OrganizationManager(cache_fields=(
         'pk',
         'slug',
-    ))
+    ), local_cache_ttl=5)
 
     class Meta:
         app_label = 'sentry'
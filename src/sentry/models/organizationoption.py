@@ -7,6 +7,8 @@ sentry.models.organizationoption
 """
 from __future__ import absolute_import, print_function
 
+from uuid import uuid4
+
 from celery.signals import task_postrun
 from django.core.signals import request_finished
 from django.db import models
@@ -36,6 +38,10 @@ class OrganizationOptionManager(BaseManager):
         assert instance_id
         return '%s:%s' % (self.model._meta.db_table, instance_id)
 
+    def _make_version_key(self, instance_id):
+        assert instance_id
+        return '%s:version:%s' % (self.model._meta.db_table, instance_id)
+
     def get_value_bulk(self, instances, key):
         instance_map = dict((i.id, i) for i in instances)
         queryset = self.filter(
@@ -90,6 +96,8 @@ class OrganizationOptionManager(BaseManager):
             for i in self.filter(organization=organization_id)
         )
         cache.set(cache_key, result)
+        # a new version invalidates the option snapshots of all processes
+        cache.set(self._make_version_key(organization_id), uuid4().hex)
         self.__cache[organization_id] = result
         return result
 
@@ -93,7 +93,7 @@ class Project(Model):
     objects = ProjectManager(cache_fields=[
         'pk',
         'slug',
-    ])
+    ], local_cache_ttl=5)
 
     class Meta:
         app_label = 'sentry'
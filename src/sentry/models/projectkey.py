@@ -59,7 +59,7 @@ class ProjectKey(Model):
     objects = BaseManager(cache_fields=(
         'public_key',
         'secret_key',
-    ))
+    ), local_cache_ttl=5)
 
     # support legacy project keys in API
     scopes = (
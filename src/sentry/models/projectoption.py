@@ -7,6 +7,8 @@ sentry.models.projectoption
 """
 from __future__ import absolute_import, print_function
 
+from uuid import uuid4
+
 from celery.signals import task_postrun
 from django.core.signals import request_finished
 from django.db import models
@@ -15,6 +17,40 @@ from sentry.db.models import Model, FlexibleForeignKey, sane_repr
 from sentry.db.models.fields import UnicodePickledObjectField
 from sentry.db.models.manager import BaseManager
 from sentry.utils.cache import cache
+from sentry.utils.lru import LRUCache
+
+# The number of projects whose option snapshots are kept per process.
+SNAPSHOT_CACHE_SIZE = 10000
+
+snapshot_cache = LRUCache(SNAPSHOT_CACHE_SIZE, name='projectoption.snapshot')
+
+
+class OptionSnapshot(object):
+    """
+    The options of a project and of its organization at the given versions,
+    see ``ProjectOptionManager.get_snapshot``. Snapshots are shared and must
+    not be modified.
+    """
+    __slots__ = ('_project_options', '_organization_options', 'version')
+
+    def __init__(self, project_options, organization_options, version):
+        self._project_options = project_options
+        self._organization_options = organization_options
+        self.version = version
+
+    def get_project_option(self, key, default=None):
+        return self._project_options.get(key, default)
+
+    def get_organization_option(self, key, default=None):
+        return self._organization_options.get(key, default)
+
+
+def _load_values(manager, instance_id, version):
+    # without a version the values are reloaded, which creates one
+    values = cache.get(manager._make_key(instance_id)) if version else None
+    if values is None:
+        values = manager.reload_cache(instance_id)
+    return values
 
 
 class ProjectOptionManager(BaseManager):
@@ -36,6 +72,10 @@ class ProjectOptionManager(BaseManager):
         assert instance_id
         return '%s:%s' % (self.model._meta.db_table, instance_id)
 
+    def _make_version_key(self, instance_id):
+        assert instance_id
+        return '%s:version:%s' % (self.model._meta.db_table, instance_id)
+
     def get_value_bulk(self, instances, key):
         instance_map = dict((i.id, i) for i in instances)
         queryset = self.filter(
@@ -80,6 +120,42 @@ class ProjectOptionManager(BaseManager):
                 self.__cache[project_id] = result
         return self.__cache.get(project_id, {})
 
+    def get_snapshot(self, project):
+        """
+        Returns an ``OptionSnapshot`` of the options of ``project`` and of
+        its organization.
+
+        Snapshots are kept in process for as long as the versions of both
+        sets of options are unchanged, so checking them costs a single cache
+        lookup. The project's options of the snapshot also serve
+        ``get_value`` for the rest of the request or task.
+        """
+        from sentry.models import OrganizationOption
+
+        organization_manager = OrganizationOption.objects
+        version_keys = [
+            self._make_version_key(project.id),
+            organization_manager._make_version_key(project.organization_id),
+        ]
+        versions = cache.get_many(version_keys)
+        version = tuple(versions.get(key) for key in version_keys)
+
+        snapshot = snapshot_cache.get(project.id)
+        if snapshot is None or snapshot.version != version or None in version:
+            # the options are read after their versions, so a concurrent
+            # change at worst makes the next call load them again
+            snapshot = OptionSnapshot(
+                project_options=_load_values(self, project.id, version[0]),
+                organization_options=_load_values(
+                    organization_manager, project.organization_id, version[1]),
+                version=version,
+            )
+            if None not in version:
+                snapshot_cache.set(project.id, snapshot, 1)
+
+        self.__cache[project.id] = dict(snapshot._project_options)
+        return snapshot
+
     def clear_local_cache(self, **kwargs):
         self.__cache = {}
 
@@ -90,6 +166,8 @@ class ProjectOptionManager(BaseManager):
             for i in self.filter(project=project_id)
         )
         cache.set(cache_key, result)
+        # a new version invalidates the option snapshots of all processes
+        cache.set(self._make_version_key(project_id), uuid4().hex)
         self.__cache[project_id] = result
         return result
 
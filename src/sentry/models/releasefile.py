@@ -8,11 +8,19 @@ sentry.models.releasefile
 
 from __future__ import absolute_import
 
+import six
+
 from django.db import models
 
 from sentry.db.models import BoundedPositiveIntegerField, FlexibleForeignKey, Model, sane_repr
+from sentry.utils.cache import cache
 from sentry.utils.hashlib import sha1_text
 
+# How long the lookup of an ident, including a miss, is cached for. Saving or
+# deleting a file clears its entry, the timeout bounds how long entries stay
+# stale after bulk deletes which send no signals.
+IDENT_CACHE_TIMEOUT = 300
+
 
 class ReleaseFile(Model):
     """
@@ -28,6 +36,9 @@ class ReleaseFile(Model):
     file = FlexibleForeignKey('sentry.File')
     ident = models.CharField(max_length=40)
     name = models.TextField()
+    # a precompiled (libsourcemap memdb) copy of the file, if it's a sourcemap
+    sourcemap_index = FlexibleForeignKey(
+        'sentry.File', null=True, on_delete=models.SET_NULL, related_name='+')
 
     __repr__ = sane_repr('release', 'ident')
 
@@ -42,11 +53,61 @@ class ReleaseFile(Model):
         return super(ReleaseFile, self).save(*args, **kwargs)
 
     def update(self, *args, **kwargs):
+        old_ident = self.ident
         # If our name is changing, we must also change the ident
         if 'name' in kwargs and 'ident' not in kwargs:
             kwargs['ident'] = self.ident = type(self).get_ident(kwargs['name'])
-        return super(ReleaseFile, self).update(*args, **kwargs)
+        rv = super(ReleaseFile, self).update(*args, **kwargs)
+        if old_ident != self.ident:
+            type(self).clear_ids(self.release_id, [old_ident])
+        return rv
 
     @classmethod
     def get_ident(cls, name):
         return sha1_text(name).hexdigest()
+
+    @classmethod
+    def get_ident_cache_key(cls, release_id, ident):
+        return 'releasefile:ident:1:%s:%s' % (release_id, ident)
+
+    @classmethod
+    def get_ids(cls, release, idents):
+        """
+        Returns a mapping of ident to ReleaseFile id for those of ``idents``
+        which exist in the release.
+
+        Every ident is cached on its own, so that looking up files which
+        were never uploaded doesn't hit the database either.
+        """
+        keys = dict(
+            (cls.get_ident_cache_key(release.id, ident), ident)
+            for ident in idents
+        )
+        cached = cache.get_many(list(keys))
+
+        rv = {}
+        missing = []
+        for key, ident in six.iteritems(keys):
+            if key not in cached:
+                missing.append(ident)
+            elif cached[key]:
+                rv[ident] = cached[key]
+
+        if missing:
+            found = dict(cls.objects.filter(
+                release=release,
+                ident__in=missing,
+            ).values_list('ident', 'id'))
+            rv.update(found)
+            # misses are cached as 0
+            cache.set_many(dict(
+                (cls.get_ident_cache_key(release.id, ident), found.get(ident, 0))
+                for ident in missing
+            ), IDENT_CACHE_TIMEOUT)
+        return rv
+
+    @classmethod
+    def clear_ids(cls, release_id, idents):
+        cache.delete_many([
+            cls.get_ident_cache_key(release_id, ident) for ident in idents
+        ])
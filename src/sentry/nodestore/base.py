@@ -16,6 +16,10 @@ from uuid import uuid4
 
 
 class NodeStorage(local):
+    # Whether node data may contain byte strings rather than only what json
+    # can represent.
+    supports_bytes = False
+
     def validate(self):
         """
         Validates the settings for this backend (i.e. such as proper connection
@@ -0,0 +1,185 @@
+"""
+sentry.nodestore.cached.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import logging
+import six
+import threading
+import time
+
+from weakref import WeakKeyDictionary
+
+from sentry.nodestore.base import NodeStorage
+from sentry.utils import json, metrics
+from sentry.utils.imports import import_string
+from sentry.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Nodestores are thread local, but the local cache of a nodestore is shared
+# by all threads of the process.
+_local_caches = WeakKeyDictionary()
+_local_caches_lock = threading.Lock()
+
+
+class CachedNodeStorage(NodeStorage):
+    """
+    A wrapper which serves recently read and written nodes from a cache in
+    front of another backend.
+
+    Nodes are kept in a process-local LRU of ``cache_size`` bytes for
+    ``local_cache_ttl`` seconds and, if ``cache_timeout`` is given, in the
+    shared ``sentry.cache`` (i.e. Redis) for that many seconds. Writes go
+    through to both caches and deletes invalidate them, but only the local
+    cache of the current process, so other processes may serve changed or
+    deleted nodes until their local entries expire. A ``local_cache_ttl`` of
+    ``0`` disables the local cache.
+
+    >>> CachedNodeStorage(
+    >>>     backend='sentry.nodestore.riak.backend.RiakNodeStorage',
+    >>>     backend_options={'nodes': [{'host': '127.0.0.1', 'http_port': 8098}]},
+    >>>     cache_size=64 * 1024 * 1024,
+    >>>     local_cache_ttl=5,
+    >>>     cache_timeout=3600,
+    >>> )
+    """
+    def __init__(self, backend, backend_options=None,
+                 cache_size=64 * 1024 * 1024, local_cache_ttl=5,
+                 cache_timeout=None, **kwargs):
+        if isinstance(backend, six.string_types):
+            backend = import_string(backend)
+        self.backend = backend(**(backend_options or {}))
+        self.cache_size = cache_size
+        self.local_cache_ttl = local_cache_ttl
+        self.cache_timeout = cache_timeout
+        super(CachedNodeStorage, self).__init__(**kwargs)
+
+    @property
+    def local_cache(self):
+        with _local_caches_lock:
+            try:
+                return _local_caches[self]
+            except KeyError:
+                rv = _local_caches[self] = LRUCache(
+                    self.cache_size, name='nodestore.cache.local')
+                return rv
+
+    def _get_cache_key(self, id):
+        return 'nodestore:{}'.format(id)
+
+    def _cache_get_multi(self, id_list):
+        # values are kept serialized in the local cache so that callers
+        # can't modify the cached copy
+        rv = {}
+        for id in id_list:
+            value = self._cache_get_local(id)
+            if value is not None:
+                rv[id] = json.loads(value)
+
+        missing = [id for id in id_list if id not in rv]
+        if missing and self.cache_timeout:
+            from sentry.cache import default_cache
+
+            values = default_cache.get_many(
+                [self._get_cache_key(id) for id in missing])
+            for id in missing:
+                value = values.get(self._get_cache_key(id))
+                if value is None:
+                    metrics.incr('nodestore.cache.shared.miss')
+                    continue
+                metrics.incr('nodestore.cache.shared.hit')
+                rv[id] = value
+                self._cache_set_local(id, value)
+        return rv
+
+    def _cache_get_local(self, id):
+        if not self.local_cache_ttl:
+            return None
+        result = self.local_cache.get(id)
+        if result is None:
+            return None
+        expires, value = result
+        if expires < time.time():
+            self.local_cache.delete(id)
+            return None
+        return value
+
+    def _cache_set_local(self, id, data):
+        if not self.local_cache_ttl:
+            return
+        value = json.dumps(data)
+        self.local_cache.set(
+            id, (time.time() + self.local_cache_ttl, value), len(value))
+
+    def _cache_set_many(self, values):
+        for id, data in six.iteritems(values):
+            self._cache_set_local(id, data)
+
+        if values and self.cache_timeout:
+            from sentry.cache import default_cache
+
+            try:
+                default_cache.set_many(dict(
+                    (self._get_cache_key(id), data)
+                    for id, data in six.iteritems(values)
+                ), self.cache_timeout)
+            except Exception:
+                logger.warning('Unable to cache nodes %s', ', '.join(values),
+                               exc_info=True)
+
+    def _cache_delete_many(self, id_list):
+        for id in id_list:
+            self.local_cache.delete(id)
+
+        if self.cache_timeout:
+            from sentry.cache import default_cache
+
+            default_cache.delete_many(
+                [self._get_cache_key(id) for id in id_list])
+
+    def validate(self):
+        self.backend.validate()
+
+    def generate_id(self):
+        return self.backend.generate_id()
+
+    def get(self, id):
+        return self.get_multi([id]).get(id)
+
+    def get_multi(self, id_list):
+        rv = self._cache_get_multi(id_list)
+
+        missing = [id for id in id_list if id not in rv]
+        if missing:
+            result = self.backend.get_multi(missing)
+            self._cache_set_many(dict(
+                (id, data) for id, data in six.iteritems(result)
+                if data is not None
+            ))
+            rv.update(result)
+        return rv
+
+    def set(self, id, data):
+        self.backend.set(id, data)
+        self._cache_set_many({id: data})
+
+    def set_multi(self, values):
+        self.backend.set_multi(values)
+        self._cache_set_many(values)
+
+    def delete(self, id):
+        self._cache_delete_many([id])
+        self.backend.delete(id)
+
+    def delete_multi(self, id_list):
+        self._cache_delete_many(id_list)
+        self.backend.delete_multi(id_list)
+
+    def cleanup(self, cutoff_timestamp):
+        self.backend.cleanup(cutoff_timestamp)
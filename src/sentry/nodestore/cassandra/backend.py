@@ -12,6 +12,11 @@ import casscache
 
 from sentry.nodestore.base import NodeStorage
 from sentry.utils.cache import memoize
+from sentry.utils.concurrent import get_thread_pool
+
+# The number of threads shared by all CassandraNodeStorages of a process to
+# read the nodes of a multi-get concurrently.
+POOL_SIZE = 16
 
 
 class CassandraNodeStorage(NodeStorage):
@@ -23,12 +28,16 @@ class CassandraNodeStorage(NodeStorage):
     ...     keyspace='sentry',
     ...     columnfamily='nodestore',
     ... )
+
+    Multi-gets are split into up to ``multiget_concurrency`` batches which
+    are read concurrently over the same connection.
     """
     def __init__(self, servers, keyspace='sentry',
-                 columnfamily='nodestore', **kwargs):
+                 columnfamily='nodestore', multiget_concurrency=8, **kwargs):
         self.servers = servers
         self.keyspace = keyspace
         self.columnfamily = columnfamily
+        self.multiget_concurrency = multiget_concurrency
         self.options = kwargs
         super(CassandraNodeStorage, self).__init__()
 
@@ -48,7 +57,18 @@ class CassandraNodeStorage(NodeStorage):
         return self.connection.get(id)
 
     def get_multi(self, id_list):
-        return self.connection.get_multi(id_list)
+        concurrency = min(len(id_list), self.multiget_concurrency)
+        if concurrency <= 1:
+            return self.connection.get_multi(id_list)
+
+        # the connection is thread safe, but memoized per thread
+        connection = self.connection
+        batches = [id_list[i::concurrency] for i in range(concurrency)]
+        rv = {}
+        for result in get_thread_pool('nodestore.cassandra', POOL_SIZE).map(
+                connection.get_multi, batches):
+            rv.update(result)
+        return rv
 
     def set(self, id, data):
         self.connection.set(id, data)
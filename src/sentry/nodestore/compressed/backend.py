@@ -0,0 +1,187 @@
+"""
+sentry.nodestore.compressed.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import six
+import zlib
+
+from base64 import b64decode, b64encode
+from collections import defaultdict
+
+from sentry.nodestore.base import NodeStorage
+from sentry.utils import json
+from sentry.utils.imports import import_string
+
+
+# The key which marks a stored value as compressed, its value is the id of
+# the dictionary it was compressed with.
+COMPRESSED_KEY = '__compressed__'
+
+# Deflate only looks back this far, so larger dictionaries don't help.
+MAX_DICTIONARY_SIZE = 32768
+
+
+def train_dictionary(samples, size=MAX_DICTIONARY_SIZE):
+    """
+    Builds a compression dictionary out of the json fragments which occur
+    most often in the given sample nodes.
+    """
+    counts = defaultdict(int)
+
+    def visit(value):
+        if isinstance(value, dict):
+            for k, v in six.iteritems(value):
+                if isinstance(v, (dict, list)):
+                    # the key including its separator, i.e. '"frames":'
+                    counts[json.dumps({k: None})[1:-5]] += 1
+                    visit(v)
+                else:
+                    counts[json.dumps({k: v})[1:-1]] += 1
+        elif isinstance(value, list):
+            for v in value:
+                visit(v)
+
+    for sample in samples:
+        visit(sample)
+
+    fragments = sorted(
+        (f for f, c in six.iteritems(counts) if c > 1),
+        key=lambda f: counts[f] * len(f),
+        reverse=True,
+    )
+
+    rv = []
+    total = 0
+    for fragment in fragments:
+        fragment = fragment.encode('utf-8')
+        if total + len(fragment) > size:
+            continue
+        rv.append(fragment)
+        total += len(fragment)
+
+    # the most valuable fragments go last, closest to the compressed data
+    return b''.join(reversed(rv))
+
+
+class Compressor(object):
+    """
+    Deflate with a preset dictionary.
+
+    The compressor and decompressor are primed with the dictionary once and
+    copied for every value, which works the same on all zlib versions.
+    """
+    def __init__(self, dictionary=b'', level=6):
+        self.id = '%08x' % (zlib.crc32(dictionary) & 0xffffffff)
+
+        self._compressor = zlib.compressobj(level)
+        prefix = self._compressor.compress(dictionary) + \
+            self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        self._decompressor = zlib.decompressobj()
+        self._decompressor.decompress(prefix)
+
+    def compress(self, value):
+        compressor = self._compressor.copy()
+        return compressor.compress(value) + compressor.flush()
+
+    def decompress(self, value):
+        return self._decompressor.copy().decompress(value)
+
+
+class CompressedNodeStorage(NodeStorage):
+    """
+    A wrapper which compresses nodes before handing them to another backend.
+
+    New nodes are compressed with the first of the given dictionaries, the
+    others are only used to read nodes written before it was replaced. The
+    nodestore doesn't know which project a node belongs to, so dictionaries
+    are shared by all projects. Nodes written without this wrapper are
+    returned unchanged.
+
+    Compressed values are stored as bytes if the backend supports it and
+    base64 encoded otherwise.
+
+    >>> CompressedNodeStorage(
+    >>>     backend='sentry.nodestore.riak.backend.RiakNodeStorage',
+    >>>     backend_options={'nodes': [{'host': '127.0.0.1', 'http_port': 8098}]},
+    >>>     dictionaries=[open('/etc/sentry/nodestore.dict', 'rb').read()],
+    >>> )
+    """
+    def __init__(self, backend, backend_options=None, dictionaries=(),
+                 level=6, **kwargs):
+        if isinstance(backend, six.string_types):
+            backend = import_string(backend)
+        self.backend = backend(**(backend_options or {}))
+        self.compressors = [
+            Compressor(dictionary, level) for dictionary in dictionaries
+        ] or [Compressor(b'', level)]
+        self._compressors_by_id = dict(
+            (c.id, c) for c in self.compressors
+        )
+        super(CompressedNodeStorage, self).__init__(**kwargs)
+
+    def encode(self, data):
+        compressor = self.compressors[0]
+        value = compressor.compress(json.dumps(data).encode('utf-8'))
+        if self.backend.supports_bytes:
+            return {
+                COMPRESSED_KEY: compressor.id,
+                'raw': value,
+            }
+        return {
+            COMPRESSED_KEY: compressor.id,
+            'data': b64encode(value),
+        }
+
+    def decode(self, value):
+        if not isinstance(value, dict) or COMPRESSED_KEY not in value:
+            return value
+        try:
+            compressor = self._compressors_by_id[value[COMPRESSED_KEY]]
+        except KeyError:
+            raise ValueError('Unknown compression dictionary: %r' % (
+                value[COMPRESSED_KEY],))
+        if 'raw' in value:
+            data = value['raw']
+        else:
+            data = b64decode(value['data'])
+        return json.loads(compressor.decompress(data))
+
+    def validate(self):
+        self.backend.validate()
+
+    def generate_id(self):
+        return self.backend.generate_id()
+
+    def get(self, id):
+        return self.decode(self.backend.get(id))
+
+    def get_multi(self, id_list):
+        return dict(
+            (id, self.decode(value))
+            for id, value in six.iteritems(self.backend.get_multi(id_list))
+        )
+
+    def set(self, id, data):
+        self.backend.set(id, self.encode(data))
+
+    def set_multi(self, values):
+        self.backend.set_multi(dict(
+            (id, self.encode(data))
+            for id, data in six.iteritems(values)
+        ))
+
+    def delete(self, id):
+        self.backend.delete(id)
+
+    def delete_multi(self, id_list):
+        self.backend.delete_multi(id_list)
+
+    def cleanup(self, cutoff_timestamp):
+        self.backend.cleanup(cutoff_timestamp)
@@ -20,6 +20,9 @@ from .models import Node
 
 
 class DjangoNodeStorage(NodeStorage):
+    # node data is pickled
+    supports_bytes = True
+
     def delete(self, id):
         Node.objects.filter(id=id).delete()
 
@@ -0,0 +1,126 @@
+"""
+sentry.nodestore.filesystem.backend
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+
+from __future__ import absolute_import
+
+import calendar
+import errno
+import hashlib
+import os
+import shutil
+import time
+import zlib
+
+from uuid import uuid4
+
+from django.utils.encoding import force_bytes
+
+from sentry.nodestore.base import NodeStorage
+from sentry.utils import json
+
+
+# Nodes whose id was not generated by this backend (i.e. when dual writing
+# through MultiNodeStorage) can not be routed to a segment and are kept here.
+UNSEGMENTED = 'unsegmented'
+
+
+class FilesystemNodeStorage(NodeStorage):
+    """
+    A backend which stores nodes as zlib compressed json files on a local (or
+    shared) filesystem.
+
+    Node ids start with the number of the time segment they were created in,
+    and every segment is a directory of its own. Reads go straight to the
+    file of a node, and cleanup removes whole segments which are older than
+    the cutoff rather than deleting nodes one by one.
+
+    >>> FilesystemNodeStorage(path='/var/lib/sentry/nodes',
+    >>>                       segment_size=86400)
+    """
+    def __init__(self, path, segment_size=86400):
+        self.path = path
+        self.segment_size = int(segment_size)
+
+    def validate(self):
+        from sentry.exceptions import InvalidConfiguration
+
+        if not os.path.isdir(self.path):
+            raise InvalidConfiguration('%r is not a directory' % (self.path,))
+
+    def generate_id(self):
+        return '%d-%s' % (self.get_segment(time.time()), uuid4().hex)
+
+    def get_segment(self, timestamp):
+        return int(timestamp // self.segment_size)
+
+    def get_node_path(self, id):
+        segment, sep, key = id.partition('-')
+        if not (sep and segment.isdigit() and key):
+            segment = UNSEGMENTED
+            key = hashlib.md5(force_bytes(id)).hexdigest()
+        return os.path.join(self.path, segment, key[:2], key)
+
+    def delete(self, id):
+        try:
+            os.unlink(self.get_node_path(id))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+    def get(self, id):
+        try:
+            with open(self.get_node_path(id), 'rb') as f:
+                value = f.read()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+        return json.loads(zlib.decompress(value).decode('utf-8'))
+
+    def set(self, id, data):
+        path = self.get_node_path(id)
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        # write to a temporary file first so readers never see partial data
+        tmp_path = '%s.%s.tmp' % (path, uuid4().hex)
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(json.dumps(data).encode('utf-8')))
+        os.rename(tmp_path, path)
+
+    def cleanup(self, cutoff_timestamp):
+        cutoff = calendar.timegm(cutoff_timestamp.utctimetuple())
+
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if name.endswith('.deleted'):
+                # left behind by an earlier cleanup which failed to remove it
+                shutil.rmtree(path, ignore_errors=True)
+                continue
+            if not name.isdigit():
+                continue
+            if (int(name) + 1) * self.segment_size > cutoff:
+                continue
+            # move the segment out of the way first so that it disappears
+            # for readers at once
+            trash_path = '%s.%s.deleted' % (path, uuid4().hex)
+            os.rename(path, trash_path)
+            shutil.rmtree(trash_path, ignore_errors=True)
+
+        for dirpath, _, filenames in os.walk(os.path.join(self.path, UNSEGMENTED)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.unlink(path)
+                except OSError as e:
+                    if e.errno != errno.ENOENT:
+                        raise
@@ -9,12 +9,22 @@ sentry.nodestore.multi.backend
 from __future__ import absolute_import
 
 import random
+import sys
 
 import six
 
+from multiprocessing import TimeoutError
+from six.moves.queue import Empty, Queue
+
 from sentry.nodestore.base import NodeStorage
+from sentry.utils import metrics
+from sentry.utils.concurrent import get_thread_pool
 from sentry.utils.imports import import_string
 
+# The number of threads per backend shared by all MultiNodeStorages of a
+# process for concurrent writes and hedged reads.
+POOL_SIZE = 16
+
 
 class MultiNodeStorage(NodeStorage):
     """
@@ -24,12 +34,26 @@ class MultiNodeStorage(NodeStorage):
     This is not intended for consistency, but is instead designed to allow you
     to dual-write for purposes of migrations.
 
+    With ``concurrent_writes`` set, writes go to the first backend in the
+    calling thread and to all others concurrently. If ``hedge_timeout`` is
+    given, reads which take longer than that many seconds are also sent to
+    another backend and the first answer wins. Every backend has a thread
+    pool of its own, so a slow backend can't hold up the others, and work on
+    a pool which takes longer than ``timeout`` seconds raises a
+    ``TimeoutError``.
+
+    Work on the pools is not part of the caller's database transaction, so
+    backends using the database can't be read from with hedging and can
+    only be written to concurrently as the first backend.
+
     >>> MultiNodeStorage(backends=[
     >>>     ('sentry.nodestore.django.backend.DjangoNodeStorage', {}),
     >>>     ('sentry.nodestore.riak.backend.RiakNodeStorage', {}),
     >>> ], read_selector=lambda backends: backends[0])
     """
-    def __init__(self, backends, read_selector=random.choice, **kwargs):
+    def __init__(self, backends, read_selector=random.choice,
+                 concurrent_writes=False, hedge_timeout=None, timeout=30,
+                 **kwargs):
         assert backends, "you should provide at least one backend"
 
         self.backends = []
@@ -37,50 +61,112 @@ class MultiNodeStorage(NodeStorage):
             if isinstance(backend, six.string_types):
                 backend = import_string(backend)
             self.backends.append(backend(**backend_options))
+
+        from sentry.nodestore.django.backend import DjangoNodeStorage
+
+        def uses_database(backends):
+            return any(isinstance(b, DjangoNodeStorage) for b in backends)
+
+        if hedge_timeout is not None and uses_database(self.backends):
+            raise ValueError('Hedged reads are not supported for database backends')
+        if concurrent_writes and uses_database(self.backends[1:]):
+            raise ValueError('Concurrent writes are not supported for database backends')
+
         self.read_selector = read_selector
+        self.concurrent_writes = concurrent_writes
+        self.hedge_timeout = hedge_timeout
+        self.timeout = timeout
         super(MultiNodeStorage, self).__init__(**kwargs)
 
-    def get(self, id):
+    def _get_pool(self, backend):
+        return get_thread_pool(
+            'nodestore.multi.%d' % self.backends.index(backend), POOL_SIZE)
+
+    def _read(self, method, *args):
         # just fetch it from a random backend, we're not aiming for consistency
         backend = self.read_selector(self.backends)
-        return backend.get(id)
+        if self.hedge_timeout is None or len(self.backends) == 1:
+            return getattr(backend, method)(*args)
 
-    def get_multi(self, id_list):
-        backend = self.read_selector(self.backends)
-        return backend.get_multi(id_list=id_list)
+        results = Queue()
 
-    def set(self, id, data):
-        should_raise = False
-        for backend in self.backends:
+        def read(backend):
             try:
-                backend.set(id, data)
+                results.put((True, getattr(backend, method)(*args)))
             except Exception:
-                should_raise = True
+                results.put((False, sys.exc_info()))
 
-        if should_raise:
-            raise
+        def get_result(timeout):
+            try:
+                return results.get(timeout=timeout)
+            except Empty:
+                raise TimeoutError('nodestore read timed out')
+
+        self._get_pool(backend).apply_async(read, (backend,))
+        reads = 1
+        try:
+            ok, result = results.get(timeout=self.hedge_timeout)
+        except Empty:
+            metrics.incr('nodestore.multi.hedged_read')
+            other = self.read_selector(
+                [b for b in self.backends if b is not backend])
+            self._get_pool(other).apply_async(read, (other,))
+            reads = 2
+            ok, result = get_result(self.timeout)
+
+        # if the first read to finish failed, wait for the other one
+        if not ok and reads == 2:
+            ok, result = get_result(self.timeout)
+        if not ok:
+            six.reraise(*result)
+        return result
+
+    def _write(self, method, *args):
+        if self.concurrent_writes:
+            futures = [
+                self._get_pool(backend).apply_async(getattr(backend, method), args)
+                for backend in self.backends[1:]
+            ]
+            backends = self.backends[:1]
+        else:
+            futures = []
+            backends = self.backends
+
+        exc_info = None
+        for backend in backends:
+            try:
+                getattr(backend, method)(*args)
+            except Exception:
+                if exc_info is None:
+                    exc_info = sys.exc_info()
 
-    def set_multi(self, values):
-        should_raise = False
-        for backend in self.backends:
+        for future in futures:
             try:
-                backend.set_multi(values)
+                future.get(self.timeout)
             except Exception:
-                should_raise = True
+                if exc_info is None:
+                    exc_info = sys.exc_info()
 
-        if should_raise:
-            raise
+        if exc_info is not None:
+            six.reraise(*exc_info)
+
+    def get(self, id):
+        return self._read('get', id)
+
+    def get_multi(self, id_list):
+        return self._read('get_multi', id_list)
+
+    def set(self, id, data):
+        self._write('set', id, data)
+
+    def set_multi(self, values):
+        self._write('set_multi', values)
 
     def delete(self, id):
-        should_raise = False
-        for backend in self.backends:
-            try:
-                backend.delete(id)
-            except Exception:
-                should_raise = True
+        self._write('delete', id)
 
-        if should_raise:
-            raise
+    def delete_multi(self, id_list):
+        self._write('delete_multi', id_list)
 
     def cleanup(self, cutoff_timestamp):
         should_raise = False
@@ -15,7 +15,7 @@ from .manager import (  # NOQA
 )
 
 __all__ = (
-    'get', 'set', 'delete', 'register', 'isset', 'lookup_key', 'UnknownOption',
+    'get', 'get_many', 'set', 'delete', 'register', 'isset', 'lookup_key', 'UnknownOption',
 )
 
 # See notes in ``runner.initializer`` regarding lazy cache configuration.
@@ -26,6 +26,7 @@ default_manager = OptionsManager(store=default_store)
 
 # expose public API
 get = default_manager.get
+get_many = default_manager.get_many
 set = default_manager.set
 delete = default_manager.delete
 register = default_manager.register
@@ -12,7 +12,7 @@ from sentry.options import (
     FLAG_IMMUTABLE, FLAG_NOSTORE, FLAG_PRIORITIZE_DISK, FLAG_REQUIRED, FLAG_ALLOW_EMPTY,
     register,
 )
-from sentry.utils.types import Dict, String, Sequence
+from sentry.utils.types import Dict, Int, String, Sequence
 
 # Cache
 # register('cache.backend', flags=FLAG_NOSTORE)
@@ -51,6 +51,7 @@ register('redis.options', type=Dict, flags=FLAG_NOSTORE)
 
 # symbolizer specifics
 register('dsym.cache-path', type=String, default='/tmp/sentry-dsym-cache')
+register('dsym.cache-max-size', type=Int, default=10 * 1024 * 1024 * 1024)
 
 # Mail
 register('mail.backend', default='smtp', flags=FLAG_NOSTORE)
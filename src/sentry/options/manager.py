@@ -135,28 +135,67 @@ class OptionsManager(object):
         # values change. This case is unlikely, but good to cover our bases.
         opt = self.lookup_key(key)
 
-        # First check if the option should exist on disk, and if it actually
-        # has a value set, let's use that one instead without even attempting
-        # to fetch from network storage.
-        if opt.flags & FLAG_PRIORITIZE_DISK:
-            try:
-                result = settings.SENTRY_OPTIONS[key]
-            except KeyError:
-                pass
-            else:
-                if result:
-                    return result
+        result = self._get_from_disk(opt)
+        if result:
+            return result
 
         if not (opt.flags & FLAG_NOSTORE):
             result = self.store.get(opt, silent=silent)
             if result is not None:
-                # HACK(mattrobenolt): SENTRY_URL_PREFIX must be kept in sync
-                # when reading values from the database. This should
-                # be replaced by a signal.
-                if key == 'system.url-prefix':
-                    settings.SENTRY_URL_PREFIX = result
-                return result
+                return self._from_store(opt, result)
+
+        return self._get_default(opt)
+
+    def get_many(self, keys, silent=False):
+        """
+        Get the values of many options, looking up the ones which aren't
+        configured on disk in the store at once.
+
+        Returns a mapping of keys to values which follows the same rules as
+        ``get``.
+
+        >>> from sentry import options
+        >>> options.get_many(['option', 'other-option'])
+        """
+        opts = [self.lookup_key(key) for key in keys]
+
+        rv = {}
+        stored = []
+        for opt in opts:
+            result = self._get_from_disk(opt)
+            if result:
+                rv[opt.name] = result
+            elif not (opt.flags & FLAG_NOSTORE):
+                stored.append(opt)
+
+        results = self.store.get_many(stored, silent=silent) if stored else {}
+        for opt in opts:
+            if opt.name in rv:
+                continue
+            result = results.get(opt.name)
+            if result is not None:
+                rv[opt.name] = self._from_store(opt, result)
+            else:
+                rv[opt.name] = self._get_default(opt)
+        return rv
 
+    def _get_from_disk(self, opt):
+        # First check if the option should exist on disk, and if it actually
+        # has a value set, let's use that one instead without even attempting
+        # to fetch from network storage.
+        if opt.flags & FLAG_PRIORITIZE_DISK:
+            return settings.SENTRY_OPTIONS.get(opt.name)
+        return None
+
+    def _from_store(self, opt, result):
+        # HACK(mattrobenolt): SENTRY_URL_PREFIX must be kept in sync
+        # when reading values from the database. This should
+        # be replaced by a signal.
+        if opt.name == 'system.url-prefix':
+            settings.SENTRY_URL_PREFIX = result
+        return result
+
+    def _get_default(self, opt):
         # Some values we don't want to allow them to be configured through
         # config files and should only exist in the datastore
         if opt.flags & FLAG_STOREONLY:
@@ -164,10 +203,10 @@ class OptionsManager(object):
 
         try:
             # default to the hardcoded local configuration for this key
-            return settings.SENTRY_OPTIONS[key]
+            return settings.SENTRY_OPTIONS[opt.name]
         except KeyError:
             try:
-                return settings.SENTRY_DEFAULT_OPTIONS[key]
+                return settings.SENTRY_DEFAULT_OPTIONS[opt.name]
             except KeyError:
                 return opt.default()
 
@@ -82,6 +82,59 @@ class OptionsStore(object):
         # in local cache that's possibly stale
         return self.get_local_cache(key, force_grace=True)
 
+    def get_many(self, keys, silent=False):
+        """
+        Fetches the values of many keys from the options store, returning a
+        mapping of option names to the values which were found.
+
+        This follows the same steps as ``get``, but each step only handles
+        the keys which are still missing, so the network cache and the
+        database are queried at most once each.
+        """
+        rv = {}
+        for key in keys:
+            value = self.get_local_cache(key)
+            if value is not None:
+                rv[key.name] = value
+
+        missing = [key for key in keys if key.name not in rv]
+        if missing and self.cache is not None:
+            rv.update(self.get_cache_many(missing, silent=silent))
+            missing = [key for key in missing if key.name not in rv]
+
+        if missing:
+            rv.update(self.get_store_many(missing, silent=silent))
+
+        # As a last ditch effort, use stale values of the local cache
+        for key in missing:
+            if key.name not in rv:
+                value = self.get_local_cache(key, force_grace=True)
+                if value is not None:
+                    rv[key.name] = value
+        return rv
+
+    def get_cache_many(self, keys, silent=False):
+        """
+        Fetches the values of many keys from the network cache at once, see
+        ``get_cache``.
+        """
+        keys = dict((key.cache_key, key) for key in keys)
+        try:
+            values = self.cache.get_many(list(keys))
+        except Exception:
+            if not silent:
+                logger.warn(CACHE_FETCH_ERR, ', '.join(
+                    key.name for key in six.itervalues(keys)), exc_info=True)
+            return {}
+
+        rv = {}
+        for cache_key, value in six.iteritems(values):
+            key = keys[cache_key]
+            if key.ttl > 0:
+                self._local_cache[cache_key] = _make_cache_value(key, value)
+            rv[key.name] = value
+        return rv
+
     def get_cache(self, key, silent=False):
         """
         First check agaist our local in-process cache, falling
@@ -183,6 +236,30 @@ class OptionsStore(object):
                     logger.warn(CACHE_UPDATE_ERR, key.name, exc_info=True)
         return value
 
+    def get_store_many(self, keys, silent=False):
+        """
+        Attempt to fetch the values of many keys from the database with one
+        query, see ``get_store``.
+        """
+        keys = dict((key.name, key) for key in keys)
+        try:
+            values = dict(
+                (option.key, option.value)
+                for option in self.model.objects.filter(key__in=list(keys))
+            )
+        except Exception as e:
+            if not silent:
+                logger.exception(six.text_type(e))
+            return {}
+
+        for name, value in six.iteritems(values):
+            try:
+                self.set_cache(keys[name], value)
+            except Exception:
+                if not silent:
+                    logger.warn(CACHE_UPDATE_ERR, name, exc_info=True)
+        return values
+
     def set(self, key, value):
         """
         Store a value in the option store. Value must get persisted to database first,
@@ -1,9 +1,9 @@
 from __future__ import absolute_import, print_function
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 
 from sentry.app import locks
-from sentry.models import Release, TagValue
+from sentry.models import File, Release, ReleaseFile, TagValue
 from sentry.tasks.clear_expired_resolutions import clear_expired_resolutions
 from sentry.utils.retries import TimedRetryPolicy
 
@@ -46,6 +46,20 @@ def ensure_release_exists(instance, created, **kwargs):
         release.add_project(instance.project)
 
 
+def clear_release_file_ids(instance, **kwargs):
+    ReleaseFile.clear_ids(instance.release_id, [instance.ident])
+
+
+def delete_sourcemap_index(instance, **kwargs):
+    # the index is only referenced by its release file
+    if instance.sourcemap_index_id is None:
+        return
+    try:
+        File.objects.get(id=instance.sourcemap_index_id).delete()
+    except File.DoesNotExist:
+        pass
+
+
 def resolve_group_resolutions(instance, created, **kwargs):
     if not created:
         return
@@ -67,3 +81,27 @@ post_save.connect(
     dispatch_uid="ensure_release_exists",
     weak=False
 )
+
+
+post_save.connect(
+    clear_release_file_ids,
+    sender=ReleaseFile,
+    dispatch_uid="clear_release_file_ids",
+    weak=False
+)
+
+
+post_delete.connect(
+    clear_release_file_ids,
+    sender=ReleaseFile,
+    dispatch_uid="clear_release_file_ids",
+    weak=False
+)
+
+
+post_delete.connect(
+    delete_sourcemap_index,
+    sender=ReleaseFile,
+    dispatch_uid="delete_sourcemap_index",
+    weak=False
+)
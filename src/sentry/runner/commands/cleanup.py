@@ -8,6 +8,7 @@ sentry.runner.commands.cleanup
 from __future__ import absolute_import, print_function
 
 import click
+import time
 
 from datetime import timedelta
 from django.utils import timezone
@@ -32,6 +33,123 @@ def get_project(value):
         return None
 
 
+# The number of ids per range deleted as one task, for models which are
+# deleted with a single query and for those deleted row by row.
+BULK_DELETE_RANGE_SIZE = 10000
+GENERIC_DELETE_RANGE_SIZE = 1000
+
+_STOP_WORKER = None
+
+
+def get_model_path(model):
+    return '%s.%s' % (model.__module__, model.__name__)
+
+
+def delete_range(model, dtfield, days, project_id, generic, start, stop):
+    from sentry.db.deletion import BulkDeleteQuery
+    from sentry.utils.imports import import_string
+
+    return BulkDeleteQuery(
+        model=import_string(model),
+        dtfield=dtfield,
+        days=days,
+        project_id=project_id,
+    ).execute_range(start, stop, generic=generic)
+
+
+def multiprocess_worker(task_queue, result_queue):
+    import logging
+    logger = logging.getLogger('sentry.cleanup')
+
+    while True:
+        task = task_queue.get()
+        if task is _STOP_WORKER:
+            return
+        count = 0
+        try:
+            count = delete_range(*task)
+        except Exception:
+            logger.exception('Failed to delete range of %s', task[0])
+        finally:
+            result_queue.put(count)
+
+
+class DeletePool(object):
+    """
+    Runs range deletes in ``concurrency`` worker processes, or inline if
+    the concurrency is one.
+    """
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.workers = []
+        if concurrency <= 1:
+            return
+
+        from multiprocessing import Process, Queue
+        from django.db import connections
+
+        # the workers must not share our database connections
+        for conn in connections.all():
+            conn.close()
+
+        self.task_queue = Queue(concurrency * 2)
+        self.result_queue = Queue()
+        for _ in range(concurrency):
+            p = Process(
+                target=multiprocess_worker,
+                args=(self.task_queue, self.result_queue),
+            )
+            p.daemon = True
+            p.start()
+            self.workers.append(p)
+
+    def run(self, tasks, callback=None):
+        """
+        Runs the given tasks and returns the number of deleted rows.
+
+        ``callback`` is called with the number of rows deleted by each task
+        as it finishes.
+        """
+        if callback is None:
+            callback = lambda count: None
+
+        if not self.workers:
+            total = 0
+            for task in tasks:
+                count = delete_range(*task)
+                callback(count)
+                total += count
+            return total
+
+        from six.moves.queue import Empty
+
+        pending = 0
+        total = 0
+        for task in tasks:
+            self.task_queue.put(task)
+            pending += 1
+            while True:
+                try:
+                    count = self.result_queue.get_nowait()
+                except Empty:
+                    break
+                pending -= 1
+                callback(count)
+                total += count
+
+        for _ in range(pending):
+            count = self.result_queue.get()
+            callback(count)
+            total += count
+        return total
+
+    def close(self):
+        for _ in self.workers:
+            self.task_queue.put(_STOP_WORKER)
+        for p in self.workers:
+            p.join()
+
+
 @click.command()
 @click.option('--days', default=30, show_default=True, help='Numbers of days to truncate on.')
 @click.option('--project', help='Limit truncation to only entries from project.')
@@ -51,8 +169,8 @@ def cleanup(days, project, concurrency, silent, model):
     from sentry.app import nodestore
     from sentry.db.deletion import BulkDeleteQuery
     from sentry.models import (
-        Event, EventMapping, Group, GroupRuleStatus, GroupTagValue,
-        LostPasswordHash, TagValue, GroupEmailThread,
+        Event, EventMapping, Group, GroupEventHour, GroupRuleStatus,
+        GroupTagValue, LostPasswordHash, TagValue, GroupEmailThread,
     )
 
     models = {m.lower() for m in model}
@@ -68,6 +186,7 @@ def cleanup(days, project, concurrency, silent, model):
         (GroupTagValue, 'last_seen'),
         (TagValue, 'last_seen'),
         (GroupEmailThread, 'date'),
+        (GroupEventHour, 'hour'),
     )
 
     GENERIC_DELETES = (
@@ -106,6 +225,38 @@ def cleanup(days, project, concurrency, silent, model):
             except NotImplementedError:
                 click.echo("NodeStore backend does not support cleanup operation", err=True)
 
+    pool = DeletePool(concurrency)
+
+    def delete(model, dtfield, days, generic=False):
+        query = BulkDeleteQuery(
+            model=model,
+            dtfield=dtfield,
+            days=days,
+            project_id=project_id,
+        )
+        ranges = list(query.iter_id_ranges(
+            GENERIC_DELETE_RANGE_SIZE if generic else BULK_DELETE_RANGE_SIZE
+        ))
+        tasks = (
+            (get_model_path(model), dtfield, days, project_id, generic, start, stop)
+            for start, stop in ranges
+        )
+
+        started = time.time()
+        if silent:
+            count = pool.run(tasks)
+        else:
+            # ranges are reported as they finish rather than when queued
+            with click.progressbar(length=len(ranges), label=model.__name__) as bar:
+                count = pool.run(tasks, callback=lambda _: bar.update(1))
+            duration = time.time() - started
+            click.echo('>> Removed {count} {model} in {duration:.1f}s ({rate:.1f}/s)'.format(
+                count=count,
+                model=model.__name__,
+                duration=duration,
+                rate=count / duration if duration else 0,
+            ))
+
     for model, dtfield in BULK_DELETES:
         if not silent:
             click.echo("Removing {model} for days={days} project={project}".format(
@@ -117,12 +268,7 @@ def cleanup(days, project, concurrency, silent, model):
             if not silent:
                 click.echo('>> Skipping %s' % model.__name__)
         else:
-            BulkDeleteQuery(
-                model=model,
-                dtfield=dtfield,
-                days=days,
-                project_id=project_id,
-            ).execute()
+            delete(model, dtfield, days)
 
     # EventMapping is fairly expensive and is special cased as it's likely you
     # won't need a reference to an event for nearly as long
@@ -132,12 +278,7 @@ def cleanup(days, project, concurrency, silent, model):
         if not silent:
             click.echo('>> Skipping EventMapping')
     else:
-        BulkDeleteQuery(
-            model=EventMapping,
-            dtfield='date_added',
-            days=min(days, 7),
-            project_id=project_id,
-        ).execute()
+        delete(EventMapping, 'date_added', min(days, 7))
 
     # Clean up FileBlob instances which are no longer used and aren't super
     # recent (as there could be a race between blob creation and reference)
@@ -160,12 +301,93 @@ def cleanup(days, project, concurrency, silent, model):
             if not silent:
                 click.echo('>> Skipping %s' % model.__name__)
         else:
-            BulkDeleteQuery(
-                model=model,
-                dtfield=dtfield,
-                days=days,
-                project_id=project_id,
-            ).execute_generic()
+            delete(model, dtfield, days, generic=True)
+
+    pool.close()
+
+
+# The id range of FileBlobs checked per query, the number of FileBlobs
+# deleted per query (which stays below SQLite's limit of 999 parameters) and
+# the number of files removed from the storage at the same time.
+FILE_BLOB_BATCH_SIZE = 10000
+FILE_BLOB_DELETE_SIZE = 500
+FILE_DELETE_CONCURRENCY = 8
+
+UNUSED_BLOB_CONDITION = """
+    not exists (
+        select 1 from sentry_fileblobindex i
+         where i.blob_id = sentry_fileblob.id
+    ) and
+    not exists (
+        select 1 from sentry_file f
+         where f.blob_id = sentry_fileblob.id
+    )
+"""
+
+
+def find_unused_blobs(cursor, start, stop, cutoff):
+    """
+    Returns (id, path, size) of the FileBlobs with ids in the given range
+    which are not referenced by any File.
+    """
+    cursor.execute("""
+        select id, path, size
+          from sentry_fileblob
+         where id >= %s and
+               id < %s and
+               timestamp <= %s and
+               {condition}
+    """.format(condition=UNUSED_BLOB_CONDITION), [start, stop, cutoff])
+    return cursor.fetchall()
+
+
+def delete_unused_blobs(cursor, blobs, cutoff):
+    """
+    Deletes the given FileBlob rows, unless they were referenced or touched
+    by an upload in the meantime, and returns the ones actually deleted.
+    """
+    from sentry.models import FileBlob
+
+    rv = []
+    for offset in range(0, len(blobs), FILE_BLOB_DELETE_SIZE):
+        chunk = blobs[offset:offset + FILE_BLOB_DELETE_SIZE]
+        ids = [b[0] for b in chunk]
+        # uploads touch the blobs they reuse while referencing them, so the
+        # timestamp is checked again within the delete
+        cursor.execute("""
+            delete from sentry_fileblob
+             where id in ({ids}) and
+                   timestamp <= %s and
+                   {condition}
+        """.format(
+            ids=', '.join(['%s'] * len(ids)),
+            condition=UNUSED_BLOB_CONDITION,
+        ), ids + [cutoff])
+        remaining = set(FileBlob.objects.filter(
+            id__in=ids,
+        ).values_list('id', flat=True))
+        rv.extend(b for b in chunk if b[0] not in remaining)
+    return rv
+
+
+def delete_orphaned_sourcemap_indexes(cutoff):
+    """
+    Deletes the sourcemap index Files which no ReleaseFile references, as
+    release files deleted in bulk leave theirs behind.
+    """
+    from sentry.models import File, ReleaseFile
+    from sentry.utils.query import bulk_delete_queryset
+
+    queryset = File.objects.filter(
+        type='release.sourcemap-index',
+        timestamp__lte=cutoff,
+    ).exclude(
+        id__in=ReleaseFile.objects.filter(
+            sourcemap_index__isnull=False,
+        ).values('sourcemap_index'),
+    )
+    while bulk_delete_queryset(queryset, limit=FILE_BLOB_DELETE_SIZE):
+        pass
 
 
 def cleanup_unused_files(quiet=False):
@@ -173,24 +395,65 @@ def cleanup_unused_files(quiet=False):
     Remove FileBlob's (and thus the actual files) if they are no longer
     referenced by any File.
 
+    Orphaned sourcemap indexes are deleted first, so their blobs are
+    removed in the same run.
+
     We set a minimum-age on the query to ensure that we don't try to remove
     any blobs which are brand new and potentially in the process of being
     referenced.
+
+    Unused blobs are found with an anti-join per id range, their rows are
+    deleted in bulk and the files are then removed from the storage
+    concurrently.
     """
-    from sentry.models import File, FileBlob, FileBlobIndex
-    if quiet:
-        from sentry.utils.query import RangeQuerySetWrapper
-    else:
-        from sentry.utils.query import RangeQuerySetWrapperWithProgressBar as RangeQuerySetWrapper
+    from multiprocessing.pool import ThreadPool
+
+    from django.db import connections, router
+    from django.db.models import Max, Min
+    from django.template.defaultfilters import filesizeformat
+
+    from sentry.models import FileBlob
+    from sentry.models.file import get_storage
 
     cutoff = timezone.now() - timedelta(days=1)
-    queryset = FileBlob.objects.filter(
+    delete_orphaned_sourcemap_indexes(cutoff)
+
+    bounds = FileBlob.objects.filter(
         timestamp__lte=cutoff,
-    )
+    ).aggregate(Min('id'), Max('id'))
+    if bounds['id__min'] is None:
+        return
+
+    ranges = range(bounds['id__min'], bounds['id__max'] + 1, FILE_BLOB_BATCH_SIZE)
+
+    def delete_file(path):
+        if path:
+            get_storage().delete(path)
+
+    cursor = connections[router.db_for_write(FileBlob)].cursor()
+    pool = ThreadPool(FILE_DELETE_CONCURRENCY)
+    deleted = []
+
+    def cleanup_range(start):
+        blobs = find_unused_blobs(
+            cursor, start, start + FILE_BLOB_BATCH_SIZE, cutoff)
+        if blobs:
+            blobs = delete_unused_blobs(cursor, blobs, cutoff)
+            pool.map(delete_file, [path for _, path, _ in blobs])
+            deleted.extend(size or 0 for _, _, size in blobs)
+
+    try:
+        if quiet:
+            for start in ranges:
+                cleanup_range(start)
+        else:
+            with click.progressbar(ranges, label='FileBlob') as bar:
+                for start in bar:
+                    cleanup_range(start)
+    finally:
+        pool.close()
+        cursor.close()
 
-    for blob in RangeQuerySetWrapper(queryset):
-        if FileBlobIndex.objects.filter(blob=blob).exists():
-            continue
-        if File.objects.filter(blob=blob).exists():
-            continue
-        blob.delete()
+    if not quiet:
+        click.echo('Removed %d unused FileBlobs (%s)' % (
+            len(deleted), filesizeformat(sum(deleted))))
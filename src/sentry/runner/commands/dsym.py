@@ -157,6 +157,43 @@ def import_system_symbols(bundles, threads, trim_symbols, no_demangle):
                                 demangle=not no_demangle)
 
 
+@dsym.command(name='export-system-symbols',
+              short_help='Export system symbols into local symbol tables.')
+@click.option('--sdk', help='Only export the given SDK instead of all.')
+@click.option('--version', help='Optionally a version filter.  For instance '
+              '9 exports all versions 9.*, 9.1 exports 9.1.* etc.')
+@click.option('--force', is_flag=True,
+              help='Export objects even if they already have a symbol table.')
+@configuration
+def export_system_symbols(sdk, version, force):
+    """Exports the system symbols from the database into memory mapped
+    symbol tables in the dsym cache path.  Symbolication looks up the symbols
+    of exported objects in these tables rather than in the database, so this
+    needs to run on every machine that processes events after system symbols
+    were imported.
+    """
+    import os
+    from sentry.models import DSymObject
+    from sentry.lang.native.systemsymbols import get_symbol_table_path, \
+        export_symbol_table
+
+    objects = DSymObject.objects.all()
+    if sdk is not None:
+        objects = objects.filter(dsymbundle__sdk__sdk_name=sdk)
+    if version is not None:
+        for part, number in zip(('major', 'minor', 'patchlevel'),
+                                version.split('.')):
+            objects = objects.filter(**{
+                'dsymbundle__sdk__version_%s' % part: int(number),
+            })
+    object_ids = sorted(set(objects.values_list('id', flat=True)))
+
+    with click.progressbar(object_ids, label='Exporting') as bar:
+        for object_id in bar:
+            if force or not os.path.isfile(get_symbol_table_path(object_id)):
+                export_symbol_table(object_id)
+
+
 @dsym.command(name='sdks', short_help='List SDKs')
 @click.option('--sdk', help='Only include the given SDK instead of all.')
 @click.option('--version', help='Optionally a version filter.  For instance '
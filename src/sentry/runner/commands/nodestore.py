@@ -0,0 +1,41 @@
+from __future__ import absolute_import
+
+import click
+from sentry.runner.decorators import configuration
+
+
+@click.group()
+def nodestore():
+    "Manage the node storage."
+
+
+@nodestore.command('train-dictionary')
+@click.argument('output', type=click.File('wb'))
+@click.option('--samples', default=1000, show_default=True,
+              help='The number of recent events to sample.')
+@click.option('--size', default=32768, show_default=True,
+              help='The maximum size of the dictionary in bytes.')
+@configuration
+def train_dictionary(output, samples, size):
+    "Build a compression dictionary from recent events."
+    from sentry.models import Event
+    from sentry.nodestore.compressed.backend import (
+        MAX_DICTIONARY_SIZE, train_dictionary
+    )
+
+    if size > MAX_DICTIONARY_SIZE:
+        raise click.BadParameter(
+            'must not be larger than %d' % MAX_DICTIONARY_SIZE,
+            param_hint='--size',
+        )
+
+    events = list(Event.objects.order_by('-id')[:samples])
+    Event.objects.bind_nodes(events, 'data')
+    dictionary = train_dictionary(
+        [dict(event.data) for event in events], size=size)
+    if not dictionary:
+        raise click.ClickException('Not enough events to build a dictionary.')
+
+    output.write(dictionary)
+    click.echo('Wrote a dictionary of %d bytes from %d events.' % (
+        len(dictionary), len(events)), err=True)
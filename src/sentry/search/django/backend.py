@@ -9,19 +9,50 @@ sentry.search.django.backend
 from __future__ import absolute_import
 
 import six
+from datetime import timedelta
+from functools import reduce
+from operator import or_
 from django.db import router
 from django.db.models import Q
 
 from sentry.api.paginator import DateTimePaginator, Paginator
 from sentry.search.base import ANY, EMPTY, SearchBackend
+from sentry.search.django.cache import SORT_COLUMNS, SearchResultCache
 from sentry.search.django.constants import (
     MSSQL_ENGINES, MSSQL_SORT_CLAUSES, MYSQL_SORT_CLAUSES, ORACLE_SORT_CLAUSES,
     SORT_CLAUSES, SQLITE_SORT_CLAUSES
 )
-from sentry.utils.db import get_db_engine
+from sentry.utils.cursors import build_cursor
+from sentry.utils.db import get_db_engine, is_postgres
+
+ONE_HOUR = timedelta(hours=1)
 
 
 class DjangoSearchBackend(SearchBackend):
+    def __init__(self, result_cache_ttl=0, result_cache_max_age=60,
+                 use_event_hours=False, **options):
+        # answer date range filters from GroupEventHour instead of scanning
+        # events; only enable this once the index covers your retention
+        # window, as hours before it was introduced are not recorded
+        self.use_event_hours = use_event_hours
+
+        # the result cache is only used when a ttl is configured, i.e.
+        # SENTRY_SEARCH_OPTIONS = {'result_cache_ttl': 5}
+        if result_cache_ttl:
+            self.result_cache = SearchResultCache(
+                ttl=result_cache_ttl,
+                max_age=max(result_cache_ttl, result_cache_max_age),
+            )
+        else:
+            self.result_cache = None
+        super(DjangoSearchBackend, self).__init__(**options)
+
+    def _filter_by_query(self, queryset, query):
+        return queryset.filter(
+            Q(message__icontains=query) |
+            Q(culprit__icontains=query)
+        )
+
     def _tags_to_filter(self, project, tags):
         # Django doesnt support union, so we limit results and try to find
         # reasonable matches
@@ -64,6 +95,79 @@ class DjangoSearchBackend(SearchBackend):
                 return None
         return matches
 
+    def _filter_by_event_hours(self, queryset, project, query=None,
+                               date_from=None, date_from_inclusive=True,
+                               date_to=None, date_to_inclusive=True):
+        """
+        Restricts the queryset to groups which received an event within the
+        given range.
+
+        Hours which lie entirely within the range are answered from
+        ``GroupEventHour``, so only the partial hours at either end of the
+        range have to look at individual events. The events of those are
+        filtered by ``query`` like without the index, but the full hours
+        only know about groups, so there a group whose own message matches
+        counts even if none of its events in the range do.
+        """
+        from sentry.models import Event, Group, GroupEventHour
+        from sentry.models.groupeventhour import floor_hour
+
+        hour_params = {}
+        edges = []
+
+        if date_from:
+            start = floor_hour(date_from)
+            if start != date_from or not date_from_inclusive:
+                start += ONE_HOUR
+                edges.append({
+                    ('datetime__gte' if date_from_inclusive else 'datetime__gt'): date_from,
+                    'datetime__lt': start,
+                })
+            hour_params['hour__gte'] = start
+
+        if date_to:
+            end = floor_hour(date_to)
+            if end != date_to or date_to_inclusive:
+                edges.append({
+                    'datetime__gte': end,
+                    ('datetime__lte' if date_to_inclusive else 'datetime__lt'): date_to,
+                })
+            hour_params['hour__lt'] = end
+
+        if date_from and date_to and hour_params['hour__gte'] >= hour_params['hour__lt']:
+            # the range doesn't cover a single full hour
+            hour_params = None
+            edges = [{
+                ('datetime__gte' if date_from_inclusive else 'datetime__gt'): date_from,
+                ('datetime__lte' if date_to_inclusive else 'datetime__lt'): date_to,
+            }]
+
+        matches = []
+        if hour_params is not None:
+            matches.append(Q(id__in=GroupEventHour.objects.filter(
+                project_id=project.id,
+                **hour_params
+            ).values('group_id')))
+
+        for edge in edges:
+            event_queryset = Event.objects.filter(
+                project_id=project.id,
+                **edge
+            )
+            if query:
+                event_queryset = event_queryset.filter(message__icontains=query)
+
+            group_ids = event_queryset.distinct().values_list('group_id', flat=True)
+
+            # if Event is not on the primary database remove Django's
+            # implicit subquery by coercing to a list
+            if router.db_for_read(Group) != router.db_for_read(Event):
+                group_ids = list(group_ids)
+
+            matches.append(Q(id__in=group_ids))
+
+        return queryset.filter(reduce(or_, matches))
+
     def _build_queryset(self, project, query=None, status=None, tags=None,
                         bookmarked_by=None, assigned_to=None, first_release=None,
                         sort_by='date', unassigned=None, subscribed_by=None,
@@ -83,14 +187,7 @@ class DjangoSearchBackend(SearchBackend):
         queryset = Group.objects.filter(project=project)
 
         if query:
-            # TODO(dcramer): if we want to continue to support search on SQL
-            # we should at least optimize this in Postgres so that it does
-            # the query filter **after** the index filters, and restricts the
-            # result set
-            queryset = queryset.filter(
-                Q(message__icontains=query) |
-                Q(culprit__icontains=query)
-            )
+            queryset = self._filter_by_query(queryset, query)
 
         if status is None:
             status_in = (
@@ -186,42 +283,52 @@ class DjangoSearchBackend(SearchBackend):
             queryset = queryset.filter(**params)
 
         if date_from or date_to:
-            params = {
-                'project_id': project.id,
-            }
-            if date_from:
-                if date_from_inclusive:
-                    params['datetime__gte'] = date_from
-                else:
-                    params['datetime__gt'] = date_from
-            if date_to:
-                if date_to_inclusive:
-                    params['datetime__lte'] = date_to
-                else:
-                    params['datetime__lt'] = date_to
-
-            event_queryset = Event.objects.filter(**params)
-
-            if query:
-                event_queryset = event_queryset.filter(message__icontains=query)
-
-            # limit to the first 1000 results
-            group_ids = event_queryset.distinct().values_list(
-                'group_id',
-                flat=True
-            )[:1000]
-
-            # if Event is not on the primary database remove Django's
-            # implicit subquery by coercing to a list
-            base = router.db_for_read(Group)
-            using = router.db_for_read(Event)
-            # MySQL also cannot do a LIMIT inside of a subquery
-            if base != using or engine.startswith('mysql'):
-                group_ids = list(group_ids)
-
-            queryset = queryset.filter(
-                id__in=group_ids,
-            )
+            if self.use_event_hours:
+                queryset = self._filter_by_event_hours(
+                    queryset, project,
+                    query=query,
+                    date_from=date_from,
+                    date_from_inclusive=date_from_inclusive,
+                    date_to=date_to,
+                    date_to_inclusive=date_to_inclusive,
+                )
+            else:
+                params = {
+                    'project_id': project.id,
+                }
+                if date_from:
+                    if date_from_inclusive:
+                        params['datetime__gte'] = date_from
+                    else:
+                        params['datetime__gt'] = date_from
+                if date_to:
+                    if date_to_inclusive:
+                        params['datetime__lte'] = date_to
+                    else:
+                        params['datetime__lt'] = date_to
+
+                event_queryset = Event.objects.filter(**params)
+
+                if query:
+                    event_queryset = event_queryset.filter(message__icontains=query)
+
+                # limit to the first 1000 results
+                group_ids = event_queryset.distinct().values_list(
+                    'group_id',
+                    flat=True
+                )[:1000]
+
+                # if Event is not on the primary database remove Django's
+                # implicit subquery by coercing to a list
+                base = router.db_for_read(Group)
+                using = router.db_for_read(Event)
+                # MySQL also cannot do a LIMIT inside of a subquery
+                if base != using or engine.startswith('mysql'):
+                    group_ids = list(group_ids)
+
+                queryset = queryset.filter(
+                    id__in=group_ids,
+                )
 
         if engine.startswith('sqlite'):
             score_clause = SQLITE_SORT_CLAUSES[sort_by]
@@ -263,7 +370,55 @@ class DjangoSearchBackend(SearchBackend):
             paginator_cls = Paginator
             sort_clause = '-sort_value'
 
-        queryset = queryset.order_by(sort_clause)
+        paginator = paginator_cls(queryset.order_by(sort_clause), sort_clause)
+
+        # polling the first page is by far the most common request, so it's
+        # the only one served from the result cache
+        if self.result_cache is not None and cursor is None and sort_by in SORT_COLUMNS:
+            group_ids = self.result_cache.get_ids(
+                project, kwargs, queryset, sort_by,
+            )[:limit + 1]
+            group_map = queryset.in_bulk(group_ids)
+            if len(group_map) == len(group_ids):
+                return build_cursor(
+                    results=[group_map[g_id] for g_id in group_ids],
+                    key=paginator.get_item_key,
+                    limit=limit,
+                )
+            # some of the cached groups no longer match the search (e.g.
+            # they were resolved), so the cached list can't be trusted
+            self.result_cache.invalidate(project, kwargs)
 
-        paginator = paginator_cls(queryset, sort_clause)
         return paginator.get_result(limit, cursor)
+
+
+def escape_like(value):
+    """
+    Escapes the wildcard characters of a ``LIKE`` pattern.
+    """
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class PostgresSearchBackend(DjangoSearchBackend):
+    """
+    Answers free-text queries with ``ILIKE`` on ``message`` and ``culprit``,
+    which Postgres can serve from the ``pg_trgm`` GIN indexes instead of
+    scanning every group in the project.
+
+    On any other engine this behaves exactly like ``DjangoSearchBackend``.
+    """
+    def _filter_by_query(self, queryset, query):
+        from sentry.models import Group
+
+        if not is_postgres(router.db_for_read(Group)):
+            return super(PostgresSearchBackend, self)._filter_by_query(
+                queryset, query)
+
+        pattern = u'%%%s%%' % (escape_like(query),)
+        return queryset.extra(
+            where=[
+                '(sentry_groupedmessage.message ILIKE %s OR '
+                'sentry_groupedmessage.culprit ILIKE %s)'
+            ],
+            params=[pattern, pattern],
+        )
@@ -0,0 +1,135 @@
+"""
+sentry.search.django.cache
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import six
+
+from datetime import datetime
+from django.core.cache import cache
+from django.db.models import Model
+from django.utils import timezone
+from time import time
+
+from sentry.search.base import ANY, EMPTY
+from sentry.utils import metrics
+from sentry.utils.hashlib import md5_text
+
+# parameters which select a page of the result set rather than the result
+# set itself
+PAGINATION_PARAMS = frozenset(['cursor', 'limit'])
+
+# the Group column each (cacheable) sort option orders by
+SORT_COLUMNS = {
+    'date': 'last_seen',
+    'priority': 'score',
+    'new': 'first_seen',
+    'freq': 'times_seen',
+}
+
+
+def normalize_value(value):
+    if value is ANY:
+        return '<any>'
+    if value is EMPTY:
+        return '<empty>'
+    if isinstance(value, Model):
+        return '%s:%s' % (value._meta.db_table, value.pk)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return sorted(
+            (k, normalize_value(v)) for k, v in six.iteritems(value)
+        )
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(v) for v in value]
+    return value
+
+
+def get_cache_key(project, params):
+    params = dict(params)
+    params.setdefault('sort_by', 'date')
+
+    normalized = sorted(
+        (k, normalize_value(v)) for k, v in six.iteritems(params)
+        if k not in PAGINATION_PARAMS and v is not None
+    )
+    return 'search:results:%s:%s' % (
+        project.id, md5_text(repr(normalized)).hexdigest(),
+    )
+
+
+class SearchResultCache(object):
+    """
+    Caches the ordered list of ``(group_id, sort_value)`` pairs matching a
+    search so that the many clients polling the same query (such as the
+    default ``is:unresolved`` stream) share a single evaluation.
+
+    Entries are considered fresh for ``ttl`` seconds. Once stale, searches
+    sorted by ``last_seen`` only fetch the groups seen since the previous
+    refresh (minus ``skew`` seconds to account for late events) and merge
+    them into the cached list. Every entry is rebuilt from scratch after
+    ``max_age`` seconds, which bounds how long changes that do not touch
+    ``last_seen`` (e.g. a group being resolved) can go unnoticed.
+    """
+    def __init__(self, ttl=5, max_age=60, max_results=1000, skew=30):
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_results = max_results
+        self.skew = skew
+
+    def get_ids(self, project, params, queryset, sort_by):
+        key = get_cache_key(project, params)
+        column = SORT_COLUMNS[sort_by]
+        now = time()
+
+        entry = cache.get(key)
+        if entry is not None and now - entry['refreshed'] < self.ttl:
+            metrics.incr('search.result-cache.hit')
+            return [i for i, _ in entry['results']]
+
+        if entry is not None and sort_by == 'date' and now - entry['built'] < self.max_age:
+            metrics.incr('search.result-cache.refresh')
+            results = self._refresh(queryset, column, entry)
+            built = entry['built']
+        else:
+            metrics.incr('search.result-cache.miss')
+            results = self._fetch(queryset, column)
+            built = now
+
+        cache.set(key, {
+            'results': results,
+            'built': built,
+            'refreshed': now,
+        }, self.max_age)
+
+        return [i for i, _ in results]
+
+    def invalidate(self, project, params):
+        cache.delete(get_cache_key(project, params))
+
+    def _fetch(self, queryset, column):
+        return list(queryset.order_by('-%s' % column).values_list(
+            'id', column,
+        )[:self.max_results])
+
+    def _refresh(self, queryset, column, entry):
+        since = datetime.utcfromtimestamp(
+            entry['refreshed'] - self.skew,
+        ).replace(tzinfo=timezone.utc)
+
+        changed = self._fetch(
+            queryset.filter(**{'%s__gte' % column: since}),
+            column,
+        )
+        changed_ids = set(i for i, _ in changed)
+
+        results = changed + [
+            r for r in entry['results'] if r[0] not in changed_ids
+        ]
+        results.sort(key=lambda r: r[1], reverse=True)
+        return results[:self.max_results]
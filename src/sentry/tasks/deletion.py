@@ -16,10 +16,16 @@ from sentry.constants import ObjectStatus
 from sentry.exceptions import DeleteAborted
 from sentry.signals import pending_delete
 from sentry.tasks.base import instrumented_task, retry
-from sentry.utils.query import bulk_delete_objects
+from sentry.utils import json, redis
+from sentry.utils.hashlib import md5_text
+from sentry.utils.query import bulk_delete_objects, bulk_delete_queryset
 
 logger = logging.getLogger('sentry.deletions.async')
 
+# How long a ``bulk_delete_model`` task is considered in flight without
+# making progress, after which ``delete_models`` queues it again.
+BULK_DELETE_TIMEOUT = 60 * 60
+
 
 @instrumented_task(name='sentry.tasks.deletion.delete_organization', queue='cleanup',
                    default_retry_delay=60 * 5, max_retries=None)
@@ -128,7 +134,7 @@ def delete_project(object_id, transaction_id=None, continuous=True, **kwargs):
         GroupRuleStatus, GroupSeen, GroupSubscription, GroupSnooze, GroupTagKey,
         GroupTagValue, Project, ProjectBookmark, ProjectKey, ProjectStatus,
         ReleaseEnvironment, ReleaseProject, SavedSearchUserDefault, SavedSearch,
-        TagKey, TagValue, UserReport, Environment
+        TagKey, TagValue, UserReport, Environment, GroupEventHour
     )
 
     try:
@@ -155,27 +161,19 @@ def delete_project(object_id, transaction_id=None, continuous=True, **kwargs):
 
     model_list = (
         Activity, EventMapping, EventUser, GroupAssignee, GroupBookmark,
-        GroupEmailThread, GroupHash, GroupRelease, GroupRuleStatus, GroupSeen,
-        GroupSubscription, GroupTagKey, GroupTagValue, ProjectBookmark,
-        ProjectKey, TagKey, TagValue, SavedSearchUserDefault, SavedSearch,
-        UserReport, ReleaseEnvironment, Environment
+        GroupEmailThread, GroupEventHour, GroupHash, GroupRelease,
+        GroupRuleStatus, GroupSeen, GroupSubscription, GroupTagKey,
+        GroupTagValue, ProjectBookmark, ProjectKey, TagKey, TagValue,
+        SavedSearchUserDefault, SavedSearch, UserReport, ReleaseEnvironment,
+        Environment
     )
-    for model in model_list:
-        has_more = bulk_delete_objects(model, project_id=p.id, transaction_id=transaction_id, logger=logger)
-        if has_more:
-            if continuous:
-                delete_project.apply_async(
-                    kwargs={'object_id': object_id, 'transaction_id': transaction_id},
-                    countdown=15,
-                )
-            return
+    has_more = delete_models(model_list, {'project_id': p.id},
+                             transaction_id=transaction_id)
 
-    # TODO(dcramer): no project relation so we cant easily bulk
-    # delete today
-    has_more = delete_objects([GroupMeta, GroupResolution, GroupSnooze],
-                              relation={'group__project': p},
-                              transaction_id=transaction_id,
-                              logger=logger)
+    # no project relation, so these are deleted through their group
+    model_list = (GroupMeta, GroupResolution, GroupSnooze)
+    has_more = delete_models(model_list, {'group__project_id': p.id},
+                             transaction_id=transaction_id) or has_more
     if has_more:
         if continuous:
             delete_project.apply_async(
@@ -194,16 +192,15 @@ def delete_project(object_id, transaction_id=None, continuous=True, **kwargs):
 
     # Release needs to handle deletes after Group is cleaned up as the foreign
     # key is protected
-    model_list = (Group, ReleaseProject)
-    for model in model_list:
-        has_more = bulk_delete_objects(model, project_id=p.id, transaction_id=transaction_id, logger=logger)
-        if has_more:
-            if continuous:
-                delete_project.apply_async(
-                    kwargs={'object_id': object_id, 'transaction_id': transaction_id},
-                    countdown=15,
-                )
-            return
+    has_more = delete_models((Group, ReleaseProject), {'project_id': p.id},
+                             transaction_id=transaction_id)
+    if has_more:
+        if continuous:
+            delete_project.apply_async(
+                kwargs={'object_id': object_id, 'transaction_id': transaction_id},
+                countdown=15,
+            )
+        return
 
     p_id = p.id
     p.delete()
@@ -222,7 +219,7 @@ def delete_group(object_id, transaction_id=None, continuous=True, **kwargs):
         EventMapping, Group, GroupAssignee, GroupBookmark, GroupHash, GroupMeta,
         GroupRelease, GroupResolution, GroupRuleStatus, GroupSnooze,
         GroupSubscription, GroupStatus, GroupTagKey, GroupTagValue,
-        GroupEmailThread, GroupRedirect, UserReport
+        GroupEmailThread, GroupRedirect, UserReport, GroupEventHour
     )
 
     try:
@@ -233,22 +230,27 @@ def delete_group(object_id, transaction_id=None, continuous=True, **kwargs):
     if group.status != GroupStatus.DELETION_IN_PROGRESS:
         group.update(status=GroupStatus.DELETION_IN_PROGRESS)
 
+    # GroupHash goes first, so that new events stop being attached to the
+    # group before the rest is deleted in parallel
+    while bulk_delete_queryset(GroupHash.objects.filter(group_id=object_id),
+                               transaction_id=transaction_id, logger=logger):
+        pass
+
     bulk_model_list = (
-        # prioritize GroupHash
-        GroupHash, GroupAssignee, GroupBookmark, GroupMeta, GroupRelease,
+        GroupAssignee, GroupBookmark, GroupMeta, GroupRelease,
         GroupResolution, GroupRuleStatus, GroupSnooze, GroupTagValue,
         GroupTagKey, EventMapping, GroupEmailThread, UserReport, GroupRedirect,
-        GroupSubscription,
+        GroupSubscription, GroupEventHour,
     )
-    for model in bulk_model_list:
-        has_more = bulk_delete_objects(model, group_id=object_id, logger=logger)
-        if has_more:
-            if continuous:
-                delete_group.apply_async(
-                    kwargs={'object_id': object_id, 'transaction_id': transaction_id},
-                    countdown=15,
-                )
-            return
+    has_more = delete_models(bulk_model_list, {'group_id': object_id},
+                             transaction_id=transaction_id)
+    if has_more:
+        if continuous:
+            delete_group.apply_async(
+                kwargs={'object_id': object_id, 'transaction_id': transaction_id},
+                countdown=15,
+            )
+        return
 
     has_more = delete_events(relation={'group_id': object_id}, logger=logger)
     if has_more:
@@ -351,6 +353,83 @@ def generic_delete(app_label, model_name, object_id, transaction_id=None,
     })
 
 
+def _get_bulk_delete_key(app_label, model_name, filters):
+    return 'deletion:bulk:%s.%s:%s' % (
+        app_label,
+        model_name,
+        md5_text(json.dumps(filters, sort_keys=True)).hexdigest(),
+    )
+
+
+def _get_bulk_delete_client(key):
+    return redis.clusters.get('default').get_local_client_for_key(key)
+
+
+@instrumented_task(name='sentry.tasks.deletion.bulk_delete_model', queue='cleanup',
+                   default_retry_delay=60 * 5, max_retries=None)
+@retry(exclude=(DeleteAborted,))
+def bulk_delete_model(app_label, model_name, filters, transaction_id=None,
+                      limit=10000, max_chunks=5, **kwargs):
+    """
+    Deletes up to ``max_chunks`` chunks of ``limit`` rows of a model which
+    match ``filters``, along with the rows referencing them, and queues
+    itself again until there are none left.
+    """
+    model = get_model(app_label, model_name)
+    queryset = model.objects.filter(**filters)
+    key = _get_bulk_delete_key(app_label, model_name, filters)
+
+    for _ in range(max_chunks):
+        has_more = bulk_delete_queryset(queryset, limit=limit,
+                                        transaction_id=transaction_id,
+                                        logger=logger)
+        if not has_more:
+            _get_bulk_delete_client(key).delete(key)
+            return
+
+    # still in flight, see ``delete_models``
+    _get_bulk_delete_client(key).set(key, 1, ex=BULK_DELETE_TIMEOUT)
+    bulk_delete_model.delay(
+        app_label=app_label,
+        model_name=model_name,
+        filters=filters,
+        transaction_id=transaction_id,
+        limit=limit,
+        max_chunks=max_chunks,
+    )
+
+
+def delete_models(models, filters, transaction_id=None):
+    """
+    Queues a ``bulk_delete_model`` task for each of the models which has
+    rows matching ``filters``, so that they are deleted in parallel, and
+    returns whether there were any.
+
+    Only one task per model and filters is in flight at a time, and it keeps
+    going until the model is empty, so the caller is expected to check
+    again later rather than queue more work.
+    """
+    has_more = False
+    for model in models:
+        if not model.objects.filter(**filters).exists():
+            continue
+        has_more = True
+
+        app_label = model._meta.app_label
+        model_name = model._meta.object_name
+        key = _get_bulk_delete_key(app_label, model_name, filters)
+        client = _get_bulk_delete_client(key)
+        if not client.set(key, 1, ex=BULK_DELETE_TIMEOUT, nx=True):
+            continue
+        bulk_delete_model.delay(
+            app_label=app_label,
+            model_name=model_name,
+            filters=filters,
+            transaction_id=transaction_id,
+        )
+    return has_more
+
+
 def delete_events(relation, transaction_id=None, limit=10000, chunk_limit=100, logger=None):
     from sentry.app import nodestore
     from sentry.models import Event, EventTag
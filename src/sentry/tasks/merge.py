@@ -10,11 +10,12 @@ from __future__ import absolute_import
 
 import logging
 
-from django.db import DataError, IntegrityError, router, transaction
-from django.db.models import F
+from django.db import DataError, IntegrityError, connections, router, transaction
+from django.db.models import F, ForeignKey
 
 from sentry.tasks.base import instrumented_task, retry
 from sentry.tasks.deletion import delete_group
+from sentry.utils import db
 
 logger = logging.getLogger('sentry.merge')
 delete_logger = logging.getLogger('sentry.deletions.async')
@@ -27,9 +28,9 @@ def merge_group(from_object_id=None, to_object_id=None, transaction_id=None,
                 recursed=False, **kwargs):
     # TODO(mattrobenolt): Write tests for all of this
     from sentry.models import (
-        Activity, Group, GroupAssignee, GroupHash, GroupRuleStatus,
-        GroupSubscription, GroupTagKey, GroupTagValue, EventMapping, Event,
-        UserReport, GroupRedirect, GroupMeta,
+        Activity, Group, GroupAssignee, GroupEventHour, GroupHash,
+        GroupRuleStatus, GroupSubscription, GroupTagKey, GroupTagValue,
+        EventMapping, Event, UserReport, GroupRedirect, GroupMeta,
     )
 
     if not (from_object_id and to_object_id):
@@ -71,10 +72,10 @@ def merge_group(from_object_id=None, to_object_id=None, transaction_id=None,
     model_list = (
         Activity, GroupAssignee, GroupHash, GroupRuleStatus, GroupSubscription,
         GroupTagValue, GroupTagKey, EventMapping, Event, UserReport,
-        GroupRedirect, GroupMeta,
+        GroupRedirect, GroupMeta, GroupEventHour,
     )
 
-    has_more = merge_objects(
+    has_more = bulk_merge_objects(
         model_list,
         group,
         new_group,
@@ -264,3 +265,202 @@ def merge_objects(models, group, new_group, limit=1000,
         if has_more:
             return True
     return has_more
+
+
+# How the columns of rows which exist in both groups are combined when the
+# rows are merged, rather than keeping the values of the new group.
+MERGE_AGGREGATES = {
+    ('sentry', 'GroupTagValue'): {
+        'times_seen': 'sum',
+        'first_seen': 'min',
+        'last_seen': 'max',
+    },
+}
+
+AGGREGATE_EXPRESSIONS = {
+    'sum': '{table}.{column} + o.{column}',
+    'min': 'CASE WHEN o.{column} < {table}.{column} THEN o.{column} ELSE {table}.{column} END',
+    'max': 'CASE WHEN o.{column} > {table}.{column} THEN o.{column} ELSE {table}.{column} END',
+}
+
+
+def get_group_unique_constraints(model, group_field):
+    """
+    Returns the other fields of each unique constraint of ``model`` which
+    includes its group field.
+    """
+    rv = []
+    if group_field.unique:
+        rv.append(())
+    for fields in model._meta.unique_together:
+        if group_field.name in fields:
+            rv.append(tuple(
+                model._meta.get_field(f) for f in fields
+                if f != group_field.name
+            ))
+    return rv
+
+
+def bulk_merge_model(model, group, new_group, limit=1000):
+    """
+    Moves the rows of ``model`` from ``group`` to ``new_group`` with a few
+    statements, and returns the number of rows which already existed in
+    ``new_group`` and were merged into those, and whether rows are left to
+    move.
+
+    Rows which would violate a unique constraint have their counters merged
+    into the existing row of ``new_group`` (see ``MERGE_AGGREGATES``) and are
+    deleted, all others are updated at once. Models without such a
+    constraint (i.e. events) can have many more rows, so only the ``limit``
+    rows with the lowest ids are moved per call.
+    """
+    using = router.db_for_write(model)
+    quote_name = connections[using].ops.quote_name
+
+    all_fields = model._meta.get_all_field_names()
+    group_field = model._meta.get_field(
+        'group' if 'group' in all_fields else 'group_id')
+
+    table = quote_name(model._meta.db_table)
+    group_column = quote_name(group_field.column)
+    aggregates = MERGE_AGGREGATES.get(
+        (model._meta.app_label, model._meta.object_name), {})
+
+    constraints = get_group_unique_constraints(model, group_field)
+
+    merged = 0
+    cursor = connections[using].cursor()
+    for fields in constraints:
+        match = ''.join(
+            ' AND o.{column} = {table}.{column}'.format(
+                table=table,
+                column=quote_name(f.column),
+            ) for f in fields
+        )
+        conflicts = """
+            SELECT {{select}} FROM {table} o
+            WHERE o.{group} = %s{match}
+        """.format(table=table, group=group_column, match=match)
+
+        if aggregates:
+            assignments = []
+            params = []
+            for name, aggregate in sorted(aggregates.items()):
+                column = quote_name(model._meta.get_field(name).column)
+                assignments.append('{column} = ({subquery})'.format(
+                    column=column,
+                    subquery=conflicts.format(
+                        select=AGGREGATE_EXPRESSIONS[aggregate].format(
+                            table=table,
+                            column=column,
+                        ),
+                    ),
+                ))
+                params.append(group.id)
+            try:
+                with transaction.atomic(using=using):
+                    cursor.execute("""
+                        UPDATE {table} SET {assignments}
+                        WHERE {group} = %s AND EXISTS ({conflicts})
+                    """.format(
+                        table=table,
+                        assignments=', '.join(assignments),
+                        group=group_column,
+                        conflicts=conflicts.format(select='1'),
+                    ), params + [new_group.id, group.id])
+            except DataError:
+                # it's possible to hit an out of range value for counters
+                pass
+
+        # the rows of the old group are the outer table here, so match them
+        # against the new group
+        cursor.execute("""
+            DELETE FROM {table}
+            WHERE {group} = %s AND EXISTS ({conflicts})
+        """.format(
+            table=table,
+            group=group_column,
+            conflicts=conflicts.format(select='1'),
+        ), [group.id, new_group.id])
+        merged += max(cursor.rowcount, 0)
+
+    if isinstance(group_field, ForeignKey):
+        queryset = model.objects.filter(group=group)
+        values = {'group': new_group}
+    else:
+        queryset = model.objects.filter(group_id=group.id)
+        values = {'group_id': new_group.id}
+
+    has_more = False
+    if not constraints:
+        stop = list(queryset.order_by('id').values_list(
+            'id', flat=True)[limit:limit + 1])
+        if stop:
+            queryset = queryset.filter(id__lt=stop[0])
+            has_more = True
+    queryset.update(**values)
+
+    return merged, has_more
+
+
+def update_values_seen(new_group):
+    from sentry.models import GroupTagKey, GroupTagValue
+
+    using = router.db_for_write(GroupTagKey)
+    quote_name = connections[using].ops.quote_name
+    cursor = connections[using].cursor()
+    cursor.execute("""
+        UPDATE {gtk} SET values_seen = (
+            SELECT COUNT(*) FROM {gtv}
+            WHERE {gtv}.group_id = {gtk}.group_id AND {gtv}.{key} = {gtk}.{key}
+        )
+        WHERE group_id = %s
+    """.format(
+        gtk=quote_name(GroupTagKey._meta.db_table),
+        gtv=quote_name(GroupTagValue._meta.db_table),
+        key=quote_name('key'),
+    ), [new_group.id])
+
+
+def bulk_merge_objects(models, group, new_group, limit=1000, logger=None,
+                       transaction_id=None):
+    """
+    Moves the related rows of ``models`` from ``group`` to ``new_group``
+    with set based queries, see ``bulk_merge_model``, and returns whether
+    rows are left to move.
+
+    MySQL can't select from the table it updates, so it (and any model
+    whose rows changed concurrently) falls back to ``merge_objects``.
+    """
+    from sentry.models import GroupTagKey
+
+    if db.is_mysql():
+        return merge_objects(models, group, new_group, limit=limit,
+                             logger=logger, transaction_id=transaction_id)
+
+    for model in models:
+        try:
+            with transaction.atomic(using=router.db_for_write(model)):
+                merged, has_more = bulk_merge_model(
+                    model, group, new_group, limit=limit)
+        except IntegrityError:
+            has_more = merge_objects([model], group, new_group, limit=limit,
+                                     logger=logger, transaction_id=transaction_id)
+            if has_more:
+                return True
+            continue
+
+        if model is GroupTagKey:
+            update_values_seen(new_group)
+
+        if merged and logger is not None:
+            delete_logger.info('object.delete.bulk_executed', extra={
+                'group_id': group.id,
+                'count': merged,
+                'transaction_id': transaction_id,
+                'model': model.__name__,
+            })
+
+        if has_more:
+            return True
+    return False
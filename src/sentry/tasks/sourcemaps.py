@@ -0,0 +1,29 @@
+"""
+sentry.tasks.sourcemaps
+~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+from sentry.models import ReleaseFile
+from sentry.tasks.base import instrumented_task
+
+
+@instrumented_task(name='sentry.tasks.sourcemaps.build_sourcemap_index')
+def build_sourcemap_index(releasefile_id, **kwargs):
+    """
+    Compiles the index of a sourcemap after it was uploaded. Until the index
+    exists processing parses the sourcemap itself.
+    """
+    from sentry.lang.javascript.processor import build_sourcemap_index
+
+    try:
+        releasefile = ReleaseFile.objects.select_related('file').get(
+            id=releasefile_id,
+        )
+    except ReleaseFile.DoesNotExist:
+        return
+
+    build_sourcemap_index(releasefile)
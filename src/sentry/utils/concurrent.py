@@ -0,0 +1,97 @@
+"""
+sentry.utils.concurrent
+~~~~~~~~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import os
+import sys
+import threading
+
+import six
+
+# The number of threads shared by all calls to ``execute`` of a process.
+EXECUTE_POOL_SIZE = 16
+
+
+class TimeoutError(Exception):
+    pass
+
+
+class Future(object):
+    """
+    The result of a call running in another thread.
+    """
+    def __init__(self):
+        self.__event = threading.Event()
+        self.__result = None
+        self.__exc_info = None
+
+    def set_result(self, result):
+        self.__result = result
+        self.__event.set()
+
+    def set_exception_info(self, exc_info):
+        self.__exc_info = exc_info
+        self.__event.set()
+
+    def done(self):
+        return self.__event.is_set()
+
+    def result(self, timeout=None):
+        """
+        Waits for the call to complete and returns its return value, or
+        re-raises the exception it raised.
+        """
+        if not self.__event.wait(timeout):
+            raise TimeoutError()
+        if self.__exc_info is not None:
+            six.reraise(*self.__exc_info)
+        return self.__result
+
+
+def execute(function, *args, **kwargs):
+    """
+    Runs ``function`` on a process wide thread pool and returns a ``Future``
+    for its result. Calls queue up once all threads of the pool are busy, so
+    callers should wait for the result with a timeout.
+
+    The function must not touch the database, as it would run outside of the
+    caller's connection (and transaction).
+    """
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(function(*args, **kwargs))
+        except Exception:
+            future.set_exception_info(sys.exc_info())
+
+    get_thread_pool('concurrent.execute', EXECUTE_POOL_SIZE).apply_async(run)
+    return future
+
+
+_thread_pools = {}
+_thread_pools_lock = threading.Lock()
+
+
+def get_thread_pool(name, size):
+    """
+    Returns the process wide ``ThreadPool`` registered under ``name``,
+    starting it with ``size`` threads on first use.
+
+    The threads are long lived, so thread local state (such as the clients
+    of a nodestore backend) is only set up once per thread. Callers which
+    wait for tasks of a pool must not be tasks of the same pool.
+    """
+    from multiprocessing.pool import ThreadPool
+
+    pid = os.getpid()
+    with _thread_pools_lock:
+        # pools started before a fork have no threads in the child
+        if _thread_pools.get(name, (None, None))[0] != pid:
+            _thread_pools[name] = (pid, ThreadPool(size))
+        return _thread_pools[name][1]
@@ -44,10 +44,11 @@ class Cursor(object):
 
 
 class CursorResult(Sequence):
-    def __init__(self, results, next, prev):
+    def __init__(self, results, next, prev, hits=None):
         self.results = results
         self.next = next
         self.prev = prev
+        self.hits = hits
 
     def __len__(self):
         return len(self.results)
@@ -0,0 +1,89 @@
+"""
+sentry.utils.lru
+~~~~~~~~~~~~~~~~
+
+:copyright: (c) 2010-2016 by the Sentry Team, see AUTHORS for more details.
+:license: BSD, see LICENSE for more details.
+"""
+from __future__ import absolute_import
+
+import threading
+
+from collections import OrderedDict
+
+from sentry.utils import metrics
+
+
+class LRUCache(object):
+    """
+    A process-local, thread safe least recently used cache bounded by the
+    total size of its values rather than by the number of entries.
+
+    The size of each value is given explicitly to ``set`` (values which are
+    larger than the whole cache are never stored). If ``name`` is given,
+    ``<name>.hit``, ``<name>.miss`` and ``<name>.evict`` metrics are
+    recorded.
+    """
+    def __init__(self, max_size, name=None):
+        self.max_size = max_size
+        self.name = name
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def _incr(self, event, amount=1):
+        if self.name is not None:
+            metrics.incr('%s.%s' % (self.name, event), amount)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, size = self._data.pop(key)
+            except KeyError:
+                hit = False
+            else:
+                self._data[key] = (value, size)
+                hit = True
+
+        if not hit:
+            self._incr('miss')
+            return default
+        self._incr('hit')
+        return value
+
+    def set(self, key, value, size):
+        if size > self.max_size:
+            self.delete(key)
+            return
+
+        evicted = 0
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._data[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self.size -= evicted_size
+                evicted += 1
+
+        if evicted:
+            self._incr('evict', evicted)
+
+    def delete(self, key):
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
@@ -157,6 +157,12 @@ def pytest_runtest_teardown(item):
     from sentry.app import tsdb
     tsdb.flush()
 
+    # rolled back rows don't invalidate the local model caches
+    from sentry.db.models.manager import local_cache
+    from sentry.models.projectoption import snapshot_cache
+    local_cache.clear()
+    snapshot_cache.clear()
+
     from sentry.utils.redis import clusters
 
     with clusters.get('default').all() as client:
@@ -321,3 +321,105 @@ def bulk_delete_objects(model, limit=10000, transaction_id=None, logger=None, **
         ]))
 
     return has_more
+
+
+# The number of ids bound to a single ``IN`` clause, which stays below
+# SQLite's limit of 999 parameters per query.
+IN_QUERY_CHUNK_SIZE = 500
+
+
+def bulk_delete_queryset(queryset, limit=10000, transaction_id=None, logger=None):
+    """
+    Deletes up to ``limit`` rows of ``queryset`` with set based queries and
+    returns whether there were any.
+
+    Rows of other models which reference the deleted rows by a foreign key
+    are deleted (or detached) first, chunk by chunk, following the
+    ``on_delete`` of the key. Unlike ``QuerySet.delete`` no instances are
+    loaded and no signals are sent, but the node data of ``NodeField`` values
+    is deleted in bulk.
+    """
+    from django.db.models.sql import DeleteQuery
+
+    model = queryset.model
+    using = router.db_for_write(model)
+
+    if not (db.is_postgres() or db.is_mysql()):
+        if logger is not None:
+            logger.warning('Using slow deletion strategy due to unknown database')
+        has_more = False
+        for obj in queryset[:limit]:
+            obj.delete()
+            has_more = True
+        return has_more
+
+    ids = list(queryset.values_list('pk', flat=True)[:limit])
+    if not ids:
+        return False
+
+    for offset in range(0, len(ids), IN_QUERY_CHUNK_SIZE):
+        chunk = ids[offset:offset + IN_QUERY_CHUNK_SIZE]
+        _delete_related(model, chunk, using, limit, transaction_id, logger)
+        _delete_nodes(model, chunk, using)
+        DeleteQuery(model).delete_batch(chunk, using)
+
+    if logger is not None:
+        logger.info('object.delete.bulk_executed', extra={
+            'model': model.__name__,
+            'count': len(ids),
+            'transaction_id': transaction_id,
+        })
+
+    return True
+
+
+def _delete_related(model, ids, using, limit, transaction_id, logger):
+    from django.db.models import DO_NOTHING, PROTECT, SET_NULL
+    from django.db.models.deletion import ProtectedError
+
+    for related in model._meta.get_all_related_objects(include_hidden=True):
+        field = related.field
+        on_delete = field.rel.on_delete
+        if on_delete is DO_NOTHING:
+            continue
+
+        related_qs = related.model._base_manager.using(using).filter(
+            **{'%s__in' % field.name: ids}
+        )
+        if related.model is model:
+            related_qs = related_qs.exclude(pk__in=ids)
+
+        if on_delete is SET_NULL:
+            related_qs.update(**{field.name: None})
+        elif on_delete is PROTECT:
+            if related_qs.exists():
+                raise ProtectedError(
+                    'Cannot delete %s as they are referenced by %s.%s' % (
+                        model.__name__, related.model.__name__, field.name),
+                    list(related_qs[:1]),
+                )
+        else:
+            while bulk_delete_queryset(related_qs, limit, transaction_id, logger):
+                pass
+
+
+def _delete_nodes(model, ids, using):
+    from sentry.app import nodestore
+    from sentry.db.models.fields.node import NodeField
+
+    fields = [f for f in model._meta.fields if isinstance(f, NodeField)]
+    if not fields:
+        return
+
+    node_ids = []
+    values_list = model._base_manager.using(using).filter(
+        pk__in=ids,
+    ).values_list(*[f.attname for f in fields])
+    for values in values_list:
+        for field, value in zip(fields, values):
+            node_id = field.to_python(value).id
+            if node_id:
+                node_ids.append(node_id)
+
+    if node_ids:
+        nodestore.delete_multi(node_ids)
@@ -22,7 +22,7 @@ from sentry.coreapi import (
     APIError, APIForbidden, APIRateLimited, ClientApiHelper, CspApiHelper,
     LazyData
 )
-from sentry.models import Project, OrganizationOption, Organization
+from sentry.models import Project, ProjectOption, Organization
 from sentry.signals import (
     event_accepted, event_dropped, event_filtered, event_received
 )
@@ -317,6 +317,10 @@ class StoreView(APIView):
         if not data:
             raise APIError('No JSON data was found')
 
+        # Loads the project and organization options used below at once,
+        # which also serves ``project.get_option`` in the filters
+        option_snapshot = ProjectOption.objects.get_snapshot(project)
+
         remote_addr = request.META['REMOTE_ADDR']
 
         data = LazyData(
@@ -380,12 +384,10 @@ class StoreView(APIView):
                 (app.tsdb.models.organization_total_received, project.organization_id),
             ])
 
-        org_options = OrganizationOption.objects.get_all_values(project.organization_id)
-
-        if org_options.get('sentry:require_scrub_ip_address', False):
+        if option_snapshot.get_organization_option('sentry:require_scrub_ip_address', False):
             scrub_ip_address = True
         else:
-            scrub_ip_address = project.get_option('sentry:scrub_ip_address', False)
+            scrub_ip_address = option_snapshot.get_project_option('sentry:scrub_ip_address', False)
 
         event_id = data['event_id']
 
@@ -396,29 +398,29 @@ class StoreView(APIView):
         if cache.get(cache_key) is not None:
             raise APIForbidden('An event with the same ID already exists (%s)' % (event_id,))
 
-        if org_options.get('sentry:require_scrub_data', False):
+        if option_snapshot.get_organization_option('sentry:require_scrub_data', False):
             scrub_data = True
         else:
-            scrub_data = project.get_option('sentry:scrub_data', True)
+            scrub_data = option_snapshot.get_project_option('sentry:scrub_data', True)
 
         if scrub_data:
             # We filter data immediately before it ever gets into the queue
             sensitive_fields_key = 'sentry:sensitive_fields'
             sensitive_fields = (
-                org_options.get(sensitive_fields_key, []) +
-                project.get_option(sensitive_fields_key, [])
+                option_snapshot.get_organization_option(sensitive_fields_key, []) +
+                option_snapshot.get_project_option(sensitive_fields_key, [])
             )
 
             exclude_fields_key = 'sentry:safe_fields'
             exclude_fields = (
-                org_options.get(exclude_fields_key, []) +
-                project.get_option(exclude_fields_key, [])
+                option_snapshot.get_organization_option(exclude_fields_key, []) +
+                option_snapshot.get_project_option(exclude_fields_key, [])
             )
 
-            if org_options.get('sentry:require_scrub_defaults', False):
+            if option_snapshot.get_organization_option('sentry:require_scrub_defaults', False):
                 scrub_defaults = True
             else:
-                scrub_defaults = project.get_option('sentry:scrub_defaults', True)
+                scrub_defaults = option_snapshot.get_project_option('sentry:scrub_defaults', True)
 
             inst = SensitiveDataFilter(
                 fields=sensitive_fields,
@@ -23,6 +23,8 @@ class GroupEventsTest(APITestCase):
             six.text_type(event_1.id),
             six.text_type(event_2.id),
         ])
+        # an estimate on Postgres
+        assert int(response['X-Hits']) >= 0
 
     def test_tags(self):
         self.login_as(user=self.user)
@@ -165,3 +165,41 @@ class ReleaseFileDeleteTest(APITestCase):
 
         assert not ReleaseFile.objects.filter(id=releasefile.id).exists()
         assert not File.objects.filter(id=releasefile.file.id).exists()
+
+    def test_sourcemap_index(self):
+        self.login_as(user=self.user)
+
+        project = self.create_project(name='foo')
+
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='1',
+        )
+        release.add_project(project)
+
+        releasefile = ReleaseFile.objects.create(
+            organization_id=project.organization_id,
+            release=release,
+            file=File.objects.create(
+                name='application.js.map',
+                type='release.file',
+            ),
+            sourcemap_index=File.objects.create(
+                name='application.js.map',
+                type='release.sourcemap-index',
+            ),
+            name='http://example.com/application.js.map'
+        )
+
+        url = reverse('sentry-api-0-release-file-details', kwargs={
+            'organization_slug': project.organization.slug,
+            'project_slug': project.slug,
+            'version': release.version,
+            'file_id': releasefile.id,
+        })
+
+        response = self.client.delete(url)
+
+        assert response.status_code == 204, response.content
+
+        assert not File.objects.filter(id=releasefile.sourcemap_index.id).exists()
@@ -4,9 +4,11 @@ import six
 
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.urlresolvers import reverse
+from mock import patch
 
 from sentry.models import File, Release, ReleaseFile
 from sentry.testutils import APITestCase
+from sentry.utils.cache import cache
 
 
 class ReleaseFilesListTest(APITestCase):
@@ -79,6 +81,89 @@ class ReleaseFileCreateTest(APITestCase):
             'X-SourceMap': 'http://example.com',
         }
 
+    def test_sourcemap_index(self):
+        project = self.create_project(name='foo')
+
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='1',
+        )
+        release.add_project(project)
+
+        url = reverse('sentry-api-0-release-files', kwargs={
+            'organization_slug': project.organization.slug,
+            'project_slug': project.slug,
+            'version': release.version,
+        })
+
+        self.login_as(user=self.user)
+
+        with self.tasks():
+            response = self.client.post(url, {
+                'name': 'http://example.com/application.js.map',
+                'file': SimpleUploadedFile(
+                    'application.js.map',
+                    b'{"version":3,"file":"application.js","sources":["/test.js"],"names":[],"mappings":";AAAA"}',
+                    content_type='application/json',
+                ),
+            }, format='multipart')
+
+        assert response.status_code == 201, response.content
+
+        releasefile = ReleaseFile.objects.get(release=release)
+        assert releasefile.sourcemap_index.type == 'release.sourcemap-index'
+
+        with self.tasks():
+            response = self.client.post(url, {
+                'name': 'http://example.com/application.js',
+                'file': SimpleUploadedFile('application.js', b'function() { }',
+                                           content_type='application/javascript'),
+            }, format='multipart')
+
+        assert response.status_code == 201, response.content
+
+        releasefile = ReleaseFile.objects.get(id=response.data['id'])
+        assert releasefile.sourcemap_index is None
+
+    def test_clears_cached_ids_after_commit(self):
+        project = self.create_project(name='foo')
+
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='1',
+        )
+        release.add_project(project)
+
+        url = reverse('sentry-api-0-release-files', kwargs={
+            'organization_slug': project.organization.slug,
+            'project_slug': project.slug,
+            'version': release.version,
+        })
+
+        self.login_as(user=self.user)
+
+        create = ReleaseFile.objects.create
+
+        def create_and_cache(**kwargs):
+            rv = create(**kwargs)
+            # a concurrent lookup caching the file as missing before the commit
+            cache.set(ReleaseFile.get_ident_cache_key(release.id, rv.ident), 0, 600)
+            return rv
+
+        with patch.object(ReleaseFile.objects, 'create', side_effect=create_and_cache):
+            response = self.client.post(url, {
+                'name': 'http://example.com/application.js',
+                'file': SimpleUploadedFile('application.js', b'function() { }',
+                                           content_type='application/javascript'),
+            }, format='multipart')
+
+        assert response.status_code == 201, response.content
+
+        releasefile = ReleaseFile.objects.get(release=release)
+        assert ReleaseFile.get_ids(release, [releasefile.ident]) == {
+            releasefile.ident: releasefile.id,
+        }
+
     def test_no_file(self):
         project = self.create_project(name='foo')
 
@@ -3,10 +3,14 @@
 from __future__ import absolute_import
 
 from datetime import timedelta
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from mock import patch
 
 from sentry.api.serializers import serialize
+from sentry.api.serializers.models.group import StreamGroupSerializer
 from sentry.models import (
     GroupResolution, GroupResolutionStatus, GroupSnooze, GroupSubscription,
     GroupStatus, Release, UserOption, UserOptionValue
@@ -168,3 +172,23 @@ class GroupSerializerTest(TestCase):
 
         result = serialize(group)
         assert not result['isSubscribed']
+
+
+class StreamGroupSerializerTest(TestCase):
+    def test_query_count_does_not_depend_on_page_size(self):
+        user = self.create_user()
+        project = self.create_project()
+
+        def count_queries(groups):
+            # the user count cache is populated by the first page
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                serialize(groups, user, StreamGroupSerializer(stats_period='24h'))
+            return len(queries)
+
+        groups = [self.create_group(project=project) for _ in range(100)]
+
+        # warm up per-process caches (e.g. project options)
+        count_queries(groups[:1])
+
+        assert count_queries(groups[:1]) == count_queries(groups)
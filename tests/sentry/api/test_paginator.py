@@ -2,11 +2,17 @@ from __future__ import absolute_import
 
 import pytest
 
+from datetime import datetime
+from django.utils import timezone
+from mock import patch
+
 from sentry.api.paginator import (
-    DateTimePaginator, OffsetPaginator
+    DateTimeKeysetPaginator, DateTimePaginator, KeysetPaginator,
+    OffsetPaginator, estimate_count
 )
 from sentry.models import User
 from sentry.testutils import TestCase
+from sentry.utils.db import is_postgres
 
 
 class OffsetPaginatorTest(TestCase):
@@ -78,3 +84,84 @@ class DateTimePaginatorTest(TestCase):
         assert result3[0] == res1
         assert result3.next
         assert not result3.prev
+
+
+class KeysetPaginatorTest(TestCase):
+    def test_ties(self):
+        # every row shares the same key, so only the id can tell them apart
+        res1 = self.create_user('foo@example.com', is_staff=False)
+        res2 = self.create_user('bar@example.com', is_staff=False)
+        res3 = self.create_user('baz@example.com', is_staff=False)
+
+        queryset = User.objects.all()
+
+        paginator = KeysetPaginator(queryset, '-is_staff')
+        result1 = paginator.get_result(limit=2, cursor=None)
+        assert list(result1) == [res3, res2]
+        assert result1.next
+        assert not result1.prev
+
+        result2 = paginator.get_result(limit=2, cursor=result1.next)
+        assert list(result2) == [res1]
+        assert not result2.next
+        assert result2.prev
+
+        result3 = paginator.get_result(limit=2, cursor=result2.prev)
+        assert list(result3) == [res3, res2]
+        assert result3.next
+        assert not result3.prev
+
+    def test_count_hits(self):
+        self.create_user('foo@example.com')
+        self.create_user('bar@example.com')
+
+        queryset = User.objects.all()
+
+        paginator = KeysetPaginator(queryset, 'id')
+        assert paginator.get_result(limit=1).hits is None
+
+        paginator = KeysetPaginator(queryset, 'id', count_hits=True)
+        with patch('sentry.api.paginator.estimate_count', return_value=2) as estimate:
+            assert paginator.get_result(limit=1).hits == 2
+        estimate.assert_called_once_with(queryset)
+
+
+class DateTimeKeysetPaginatorTest(TestCase):
+    def test_simple(self):
+        date = datetime(2016, 11, 2, 14, 37, 12, 123456, tzinfo=timezone.utc)
+        res1 = self.create_user('foo@example.com', date_joined=date)
+        res2 = self.create_user('bar@example.com', date_joined=date)
+        res3 = self.create_user(
+            'baz@example.com',
+            date_joined=date.replace(microsecond=123457),
+        )
+
+        queryset = User.objects.all()
+
+        paginator = DateTimeKeysetPaginator(queryset, 'date_joined')
+        result1 = paginator.get_result(limit=1, cursor=None)
+        assert list(result1) == [res1]
+        assert result1.next
+        assert not result1.prev
+
+        result2 = paginator.get_result(limit=2, cursor=result1.next)
+        assert list(result2) == [res2, res3]
+        assert not result2.next
+        assert result2.prev
+
+        result3 = paginator.get_result(limit=2, cursor=result2.prev)
+        assert list(result3) == [res1]
+        assert result3.next
+        assert not result3.prev
+
+
+class EstimateCountTest(TestCase):
+    def test_simple(self):
+        self.create_user('foo@example.com')
+        self.create_user('bar@example.com')
+
+        if is_postgres():
+            # the planner's estimate for a table which wasn't analyzed yet
+            assert estimate_count(User.objects.all()) >= 0
+        else:
+            assert estimate_count(User.objects.all()) == 2
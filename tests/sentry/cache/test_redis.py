@@ -2,7 +2,7 @@
 
 from __future__ import absolute_import
 
-from sentry.cache.redis import RedisCache, ValueTooLarge
+from sentry.cache.redis import COMPRESSED_PREFIX, RedisCache, ValueTooLarge
 from sentry.testutils import TestCase
 
 
@@ -23,3 +23,32 @@ class RedisCacheTest(TestCase):
 
         with self.assertRaises(ValueTooLarge):
             self.backend.set('foo', 'x' * (RedisCache.max_size + 1), 0)
+
+    def test_many(self):
+        self.backend.set_many({'foo': {'foo': 'bar'}, 'bar': 1}, 50)
+
+        result = self.backend.get_many(['foo', 'bar', 'baz'])
+        assert result == {'foo': {'foo': 'bar'}, 'bar': 1}
+
+        self.backend.delete_many(['foo', 'bar'])
+
+        result = self.backend.get_many(['foo', 'bar'])
+        assert result == {}
+
+        with self.assertRaises(ValueTooLarge):
+            self.backend.set_many({
+                'foo': 1,
+                'bar': 'x' * (RedisCache.max_size + 1),
+            }, 0)
+        assert self.backend.get('foo') is None
+
+    def test_compression(self):
+        value = {'foo': 'x' * (RedisCache.compress_threshold + 1)}
+        self.backend.set('foo', value, 50)
+
+        raw = self.backend.client.get(self.backend.make_key('foo'))
+        assert raw.startswith(COMPRESSED_PREFIX)
+        assert len(raw) < RedisCache.compress_threshold
+
+        assert self.backend.get('foo') == value
+        assert self.backend.get_many(['foo']) == {'foo': value}
@@ -0,0 +1,81 @@
+from __future__ import absolute_import
+
+from mock import patch
+
+from sentry.db.models.manager import local_cache
+from sentry.models import Project
+from sentry.testutils import TestCase
+from sentry.utils.cache import cache
+
+
+class GetFromCacheTest(TestCase):
+    def test_local_cache(self):
+        project = self.create_project()
+        project = Project.objects.get_from_cache(id=project.id)
+
+        with patch.object(cache, 'get_many') as get_many:
+            result = Project.objects.get_from_cache(id=project.id)
+            assert result == project
+            assert result is not project
+            assert Project.objects.get_from_cache(slug=project.slug) == project
+        assert not get_many.called
+
+        # callers can't modify the cached instance
+        result.name = 'foo'
+        assert Project.objects.get_from_cache(id=project.id).name == project.name
+
+    def test_local_cache_invalidation(self):
+        project = self.create_project(slug='foo')
+        Project.objects.get_from_cache(slug='foo')
+
+        project.update(slug='bar')
+        assert Project.objects.get_from_cache(id=project.id).slug == 'bar'
+        with self.assertRaises(Project.DoesNotExist):
+            Project.objects.get_from_cache(slug='foo')
+
+        project.delete()
+        with self.assertRaises(Project.DoesNotExist):
+            Project.objects.get_from_cache(id=project.id)
+
+    def test_local_cache_expiry(self):
+        project = self.create_project()
+        Project.objects.get_from_cache(id=project.id)
+        local_cache.clear()
+
+        with patch('sentry.db.models.manager.time.time', return_value=0):
+            Project.objects.get_from_cache(id=project.id)
+        with patch.object(cache, 'get_many', return_value={}) as get_many:
+            assert Project.objects.get_from_cache(id=project.id) == project
+        assert get_many.called
+
+
+class GetManyFromCacheTest(TestCase):
+    def test_by_id(self):
+        projects = [self.create_project() for _ in range(3)]
+        Project.objects.get_from_cache(id=projects[0].id)
+
+        result = Project.objects.get_many_from_cache(
+            [p.id for p in projects] + [0])
+        assert sorted(result, key=lambda p: p.id) == projects
+
+        local_cache.clear()
+        with self.assertNumQueries(0):
+            result = Project.objects.get_many_from_cache(projects)
+        assert sorted(result, key=lambda p: p.id) == projects
+
+    def test_by_cache_field(self):
+        projects = [self.create_project() for _ in range(2)]
+
+        result = Project.objects.get_many_from_cache(
+            [p.slug for p in projects], key='slug')
+        assert sorted(result, key=lambda p: p.id) == projects
+
+        with self.assertNumQueries(0):
+            result = Project.objects.get_many_from_cache(
+                [p.slug for p in projects], key='slug')
+        assert sorted(result, key=lambda p: p.id) == projects
+
+    def test_uncached_field(self):
+        project = self.create_project()
+        assert Project.objects.get_many_from_cache(
+            [project.name], key='name') == [project]
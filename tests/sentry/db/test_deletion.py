@@ -2,9 +2,10 @@ from __future__ import absolute_import
 
 from datetime import timedelta
 from django.utils import timezone
+from mock import patch
 
 from sentry.db.deletion import BulkDeleteQuery
-from sentry.models import Group, Project
+from sentry.models import Event, Group, Project
 from sentry.testutils import TestCase
 
 
@@ -41,3 +42,32 @@ class BulkDeleteQueryTest(TestCase):
         assert not Group.objects.filter(id=group1_1.id).exists()
         assert not Group.objects.filter(id=group1_2.id).exists()
         assert Group.objects.filter(id=group1_3.id).exists()
+
+    def test_execute_range(self):
+        project1 = self.create_project()
+        group1 = self.create_group(project1)
+        group2 = self.create_group(project1)
+        group3 = self.create_group(project1)
+        query = BulkDeleteQuery(model=Group, project_id=project1.id)
+
+        ranges = list(query.iter_id_ranges(2))
+        assert ranges[0] == (group1.id, group1.id + 2)
+        with self.assertNumQueries(1):
+            assert query.execute_range(group1.id, group3.id) == 2
+        assert list(Group.objects.values_list('id', flat=True)) == [group3.id]
+        assert query.execute_range(group1.id, group3.id + 1, generic=True) == 1
+        assert not Group.objects.filter(id=group2.id).exists()
+        assert not Group.objects.exists()
+
+    def test_execute_range_deletes_nodes_in_bulk(self):
+        group = self.create_group()
+        events = [self.create_event(event_id=c * 32, group=group) for c in 'ab']
+        node_ids = sorted(e.data.id for e in events)
+        query = BulkDeleteQuery(model=Event)
+
+        with patch('sentry.app.nodestore.delete_multi') as delete_multi, \
+                patch('sentry.app.nodestore.delete') as delete:
+            assert query.execute_range(events[0].id, events[1].id + 1, generic=True) == 2
+        assert sorted(delete_multi.call_args[0][0]) == node_ids
+        assert not delete.called
+        assert not Event.objects.exists()
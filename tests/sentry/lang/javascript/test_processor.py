@@ -2,6 +2,7 @@
 
 from __future__ import absolute_import
 
+import base64
 import pytest
 import responses
 import six
@@ -13,13 +14,15 @@ from requests.exceptions import RequestException
 from sentry.lang.javascript.processor import (
     BadSource, discover_sourcemap, fetch_sourcemap, fetch_file, generate_module,
     trim_line, UrlResult, fetch_release_file, CannotFetchSource,
-    UnparseableSourcemap,
+    UnparseableSourcemap, release_artifact_cache, build_sourcemap_index,
+    fetch_files, get_fetch_auth,
 )
 from sentry.lang.javascript.errormapping import (
     rewrite_exception, REACT_MAPPING_URL
 )
 from sentry.models import File, Release, ReleaseFile, EventError
 from sentry.testutils import TestCase
+from sentry.utils import json
 from sentry.utils.strings import truncatechars
 
 base64_sourcemap = 'data:application/json;base64,eyJ2ZXJzaW9uIjozLCJmaWxlIjoiZ2VuZXJhdGVkLmpzIiwic291cmNlcyI6WyIvdGVzdC5qcyJdLCJuYW1lcyI6W10sIm1hcHBpbmdzIjoiO0FBQUEiLCJzb3VyY2VzQ29udGVudCI6WyJjb25zb2xlLmxvZyhcImhlbGxvLCBXb3JsZCFcIikiXX0='
@@ -31,6 +34,9 @@ unicode_body = u"""function add(a, b) {
 
 
 class FetchReleaseFileTest(TestCase):
+    def setUp(self):
+        release_artifact_cache.clear()
+
     def test_unicode(self):
         project = self.project
         release = Release.objects.create(
@@ -63,6 +69,7 @@ class FetchReleaseFileTest(TestCase):
             binary_body,
             200,
             'utf-8',
+            file.checksum,
         )
 
         # test with cache hit, which should be compressed
@@ -70,6 +77,151 @@ class FetchReleaseFileTest(TestCase):
 
         assert result == new_result
 
+    def test_missing_file(self):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        assert fetch_release_file('file.min.js', release) is None
+
+        # files which are missing are cached as such
+        with self.assertNumQueries(0):
+            assert fetch_release_file('file.min.js', release) is None
+
+    @patch('sentry.lang.javascript.processor.zlib.decompress')
+    def test_local_cache(self, mock_decompress):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        file = File.objects.create(
+            name='file.min.js',
+            type='release.file',
+            headers={'Content-Type': 'application/javascript'},
+        )
+        file.putfile(six.BytesIO(b'console.log(1)'))
+
+        ReleaseFile.objects.create(
+            name='file.min.js',
+            release=release,
+            organization_id=project.organization_id,
+            file=file,
+        )
+
+        result = fetch_release_file('file.min.js', release)
+        assert result[1] == b'console.log(1)'
+
+        # the shared cache hit is served without decompressing the body again
+        assert fetch_release_file('file.min.js', release) == result
+        assert not mock_decompress.called
+
+        release_artifact_cache.clear()
+        mock_decompress.return_value = b'console.log(1)'
+        assert fetch_release_file('file.min.js', release) == result
+        assert mock_decompress.call_count == 1
+
+
+class FetchFilesTest(TestCase):
+    def setUp(self):
+        release_artifact_cache.clear()
+
+    @patch('sentry.lang.javascript.processor._fetch_file')
+    def test_simple(self, mock_fetch_file):
+        def fetch_file(url, result, **kwargs):
+            if url == 'http://example.com/bad.js':
+                raise CannotFetchSource({'url': url})
+            return UrlResult(url, {}, url, None)
+        mock_fetch_file.side_effect = fetch_file
+
+        results = fetch_files([
+            'http://example.com/foo.js',
+            'http://example.com/bar.js',
+            'http://example.com/bad.js',
+            'http://example.com/truncated...',
+        ], project=self.project)
+
+        assert sorted(results) == [
+            'http://example.com/bad.js',
+            'http://example.com/bar.js',
+            'http://example.com/foo.js',
+        ]
+        assert results['http://example.com/foo.js'].body == 'http://example.com/foo.js'
+        assert results['http://example.com/bar.js'].body == 'http://example.com/bar.js'
+        assert isinstance(results['http://example.com/bad.js'], CannotFetchSource)
+
+    @responses.activate
+    def test_project_options(self):
+        responses.add(responses.GET, 'http://example.com/foo.js', body='foo')
+        responses.add(responses.GET, 'http://example.com/bar.js', body='bar')
+
+        self.project.update_option('sentry:token', 'foobar')
+        self.project.update_option('sentry:origins', ['http://example.com'])
+
+        # the options are resolved before fetching, not by the pool's threads
+        with patch('sentry.lang.javascript.processor.get_fetch_auth',
+                   wraps=get_fetch_auth) as mock_get_fetch_auth:
+            results = fetch_files([
+                'http://example.com/foo.js',
+                'http://example.com/bar.js',
+            ], project=self.project)
+        mock_get_fetch_auth.assert_called_once_with(self.project)
+
+        assert results['http://example.com/foo.js'].body == 'foo'
+        assert results['http://example.com/bar.js'].body == 'bar'
+        assert len(responses.calls) == 2
+        for call in responses.calls:
+            assert call.request.headers['X-Sentry-Token'] == 'foobar'
+
+    @responses.activate
+    def test_release_files(self):
+        responses.add(responses.GET, 'http://example.com/other.js', body='other')
+
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        for name in ('http://example.com/foo.js', '~/bar.js'):
+            file = File.objects.create(
+                name=name.rsplit('/', 1)[-1],
+                type='release.file',
+                headers={},
+            )
+            file.putfile(six.BytesIO(name))
+            ReleaseFile.objects.create(
+                name=name,
+                release=release,
+                organization_id=project.organization_id,
+                file=file,
+            )
+
+        urls = [
+            'http://example.com/foo.js',
+            'http://example.com/bar.js',
+            'http://example.com/other.js',
+        ]
+        results = fetch_files(urls, project=project, release=release)
+
+        assert results['http://example.com/foo.js'].body == 'http://example.com/foo.js'
+        assert results['http://example.com/bar.js'].body == '~/bar.js'
+        assert results['http://example.com/other.js'].body == 'other'
+
+        # the artifact which isn't part of the release is scraped instead
+        assert len(responses.calls) == 1
+        assert responses.calls[0].request.url == 'http://example.com/other.js'
+
+        # all lookups are now cached
+        with self.assertNumQueries(0):
+            assert fetch_files(urls, project=project, release=release) == results
+
 
 class FetchFileTest(TestCase):
     @responses.activate
@@ -290,6 +442,108 @@ class FetchSourcemapTest(TestCase):
         with pytest.raises(UnparseableSourcemap):
             fetch_sourcemap('http://example.com')
 
+    @patch('sentry.lang.javascript.processor.fetch_file')
+    def test_release_artifact_is_parsed_once(self, mock_fetch_file):
+        release_artifact_cache.clear()
+        release = Release.objects.create(
+            version='abc',
+            organization_id=self.project.organization_id,
+        )
+        body = base64.b64decode(base64_sourcemap[len('data:application/json;base64,'):])
+        mock_fetch_file.return_value = UrlResult(
+            'http://example.com/test.map.js', {}, body, None, 'a' * 40,
+        )
+
+        smap_view = fetch_sourcemap('http://example.com/test.map.js', release=release)
+        assert fetch_sourcemap('http://example.com/test.map.js', release=release) is smap_view
+        assert mock_fetch_file.call_count == 2
+
+        # the same map outside of a release is never cached
+        mock_fetch_file.return_value = UrlResult(
+            'http://example.com/test.map.js', {}, body, None,
+        )
+        assert fetch_sourcemap('http://example.com/test.map.js') is not smap_view
+
+
+class SourcemapIndexTest(TestCase):
+    def setUp(self):
+        release_artifact_cache.clear()
+        self.release = Release.objects.create(
+            organization_id=self.project.organization_id,
+            version='abc',
+        )
+        self.release.add_project(self.project)
+
+    def create_release_file(self, name, body):
+        file = File.objects.create(
+            name=name.rsplit('/', 1)[-1],
+            type='release.file',
+            headers={},
+        )
+        file.putfile(six.BytesIO(body))
+        return ReleaseFile.objects.create(
+            name=name,
+            release=self.release,
+            organization_id=self.project.organization_id,
+            file=file,
+        )
+
+    @patch('sentry.lang.javascript.processor.fetch_file')
+    def test_lookup_without_parsing(self, mock_fetch_file):
+        body = base64.b64decode(base64_sourcemap[len('data:application/json;base64,'):])
+        releasefile = self.create_release_file('http://example.com/test.map.js', body)
+
+        index = build_sourcemap_index(releasefile)
+        assert index is not None
+        assert ReleaseFile.objects.get(id=releasefile.id).sourcemap_index == index
+
+        smap_view = fetch_sourcemap('http://example.com/test.map.js', release=self.release)
+        assert not mock_fetch_file.called
+
+        assert list(smap_view) == [Token(1, 0, '/test.js', 0, 0, 0, None)]
+        assert smap_view.lookup_token(1, 0).src == '/test.js'
+        assert smap_view.get_source_contents(0) == 'console.log("hello, World!")'
+
+    @patch('sentry.lang.javascript.processor.fetch_file')
+    def test_large_sourcemap(self, mock_fetch_file):
+        source = 'console.log("%s")' % ('x' * 10000)
+        body = json.dumps({
+            'version': 3,
+            'file': 'generated.js',
+            'sources': ['/test.js'],
+            'names': [],
+            'mappings': ';AAAA',
+            'sourcesContent': [source],
+        })
+        assert len(body) > 4096
+        releasefile = self.create_release_file('http://example.com/test.map.js', body)
+
+        index = build_sourcemap_index(releasefile)
+        assert index is not None
+        assert index.size > 4096
+
+        smap_view = fetch_sourcemap('http://example.com/test.map.js', release=self.release)
+        assert not mock_fetch_file.called
+        assert smap_view.get_source_contents(0) == source
+
+    def test_delete_release_file(self):
+        body = base64.b64decode(base64_sourcemap[len('data:application/json;base64,'):])
+        releasefile = self.create_release_file('http://example.com/test.map.js', body)
+        index = build_sourcemap_index(releasefile)
+
+        ReleaseFile.objects.get(id=releasefile.id).delete()
+        assert not File.objects.filter(id=index.id).exists()
+
+    def test_not_a_sourcemap(self):
+        releasefile = self.create_release_file('http://example.com/test.js', b'function() {}')
+
+        assert build_sourcemap_index(releasefile) is None
+        assert ReleaseFile.objects.get(id=releasefile.id).sourcemap_index is None
+
+        releasefile = self.create_release_file('http://example.com/test.map.js', b'{"version": 3,')
+
+        assert build_sourcemap_index(releasefile) is None
+
 
 class TrimLineTest(TestCase):
     long_line = 'The public is more familiar with bad design than good design. It is, in effect, conditioned to prefer bad design, because that is what it lives with. The new becomes threatening, the old reassuring.'
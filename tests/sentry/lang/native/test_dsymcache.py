@@ -0,0 +1,142 @@
+from __future__ import absolute_import
+
+import os
+import time
+import shutil
+import tempfile
+
+from mock import patch
+
+from sentry.lang.native.dsymcache import DSymCache
+from sentry.models import File, ProjectDSymFile
+from sentry.testutils import TestCase
+
+UUID = '0b3d6e0e-3a2e-3c3b-9d0a-1b8a2e9f0001'
+
+
+class DSymCacheTest(TestCase):
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_path)
+        options = self.options({
+            'dsym.cache-path': self.cache_path,
+            'dsym.cache-max-size': 100,
+        })
+        options.__enter__()
+        self.addCleanup(options.__exit__, None, None, None)
+        self.cache = DSymCache()
+
+    def create_dsym_file(self, uuid=UUID, contents='x' * 10):
+        f = File.objects.create(
+            name='dSYM',
+            type='project.dsym',
+            headers={'Content-Type': 'application/x-mach-binary'},
+        )
+        with tempfile.TemporaryFile() as fileobj:
+            fileobj.write(contents)
+            fileobj.seek(0)
+            f.putfile(fileobj)
+        return ProjectDSymFile.objects.create(
+            file=f,
+            object_name='dSYM',
+            cpu_name='arm64',
+            project=self.project,
+            uuid=uuid,
+        )
+
+    def add_cached_file(self, name, size, mtime):
+        base = self.cache.get_project_path(self.project)
+        if not os.path.isdir(base):
+            os.makedirs(base)
+        path = os.path.join(base, name)
+        with open(path, 'w') as f:
+            f.write('x' * size)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    @patch('sentry.lang.native.dsymcache.metrics')
+    def test_fetch(self, metrics):
+        self.create_dsym_file()
+        base = self.cache.fetch_dsym(self.project, UUID.upper())
+        assert base == self.cache.get_project_path(self.project)
+        with open(os.path.join(base, UUID)) as f:
+            assert f.read() == 'x' * 10
+        metrics.incr.assert_any_call('dsym.cache.miss')
+        metrics.incr.assert_any_call('dsym.cache.bytes_fetched', 10)
+
+        with self.assertNumQueries(0):
+            assert self.cache.fetch_dsym(self.project, UUID) == base
+        metrics.incr.assert_called_with('dsym.cache.hit')
+
+        assert self.cache.fetch_dsym(self.project, UUID.replace('0', '1')) \
+            is None
+
+    def test_fetch_coalesced(self):
+        base = self.cache.get_project_path(self.project)
+        with patch.object(self.cache, 'find_cached_dsym',
+                          side_effect=[None, base]), \
+                patch.object(self.cache, 'download_dsym') as download:
+            assert self.cache.fetch_dsym(self.project, UUID) == base
+        assert not download.called
+
+    @patch('sentry.lang.native.dsymcache.metrics')
+    def test_evict_to_size(self, metrics):
+        now = int(time.time())
+        oldest = self.add_cached_file('a', 40, now - 300)
+        older = self.add_cached_file('b', 40, now - 200)
+        newer = self.add_cached_file('c', 40, now - 100)
+
+        self.cache.evict_to_size()
+        assert not os.path.exists(oldest)
+        assert os.path.exists(older)
+        assert os.path.exists(newer)
+        metrics.incr.assert_called_once_with('dsym.cache.evict', 1)
+
+    def test_fetch_bumps_timestamp(self):
+        old = int(time.time()) - 3600
+        path = self.add_cached_file(UUID, 10, old)
+        self.cache.fetch_dsym(self.project, UUID)
+        assert os.path.getmtime(path) > old
+
+    def test_clear_old_entries(self):
+        now = int(time.time())
+        cutoff = now - 3 * 24 * 3600
+        old = self.add_cached_file('a', 10, cutoff)
+        new = self.add_cached_file('b', 10, now)
+
+        system = os.path.join(self.cache_path, 'system')
+        os.makedirs(system)
+        table = os.path.join(system, '1.symbols')
+        with open(table, 'w') as f:
+            f.write('x' * 1000)
+        os.utime(table, (cutoff, cutoff))
+
+        self.cache.clear_old_entries()
+        assert not os.path.exists(old)
+        assert os.path.exists(new)
+        assert os.path.exists(table)
+
+    def test_lock_bumps_timestamp(self):
+        path = self.cache.get_lock_path(UUID)
+        with self.cache.lock(UUID):
+            pass
+        old = int(time.time()) - 3600
+        os.utime(path, (old, old))
+
+        with self.cache.lock(UUID):
+            assert os.path.getmtime(path) > old
+
+    def test_clear_old_locks(self):
+        cutoff = int(time.time()) - 3 * 24 * 3600
+        held = self.cache.get_lock_path(UUID)
+        stale = self.cache.get_lock_path(UUID.replace('0', '1'))
+
+        with self.cache.lock(UUID):
+            for path in (held, stale):
+                with open(path, 'a'):
+                    pass
+                os.utime(path, (cutoff, cutoff))
+
+            self.cache.clear_old_entries()
+            assert os.path.exists(held)
+            assert not os.path.exists(stale)
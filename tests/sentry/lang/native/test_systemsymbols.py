@@ -0,0 +1,97 @@
+from __future__ import absolute_import
+
+import shutil
+import tempfile
+
+from io import BytesIO
+
+from sentry.lang.native.systemsymbols import SymbolTable, export_symbol_table, \
+    find_symbols, get_symbol_table_path, symbol_tables, write_symbol_table
+from sentry.models import DSymObject, DSymSymbol
+from sentry.testutils import TestCase
+
+
+class SystemSymbolsTest(TestCase):
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_path)
+        options = self.options({'dsym.cache-path': self.cache_path})
+        options.__enter__()
+        self.addCleanup(options.__exit__, None, None, None)
+        self.addCleanup(symbol_tables.clear)
+
+        self.object = DSymObject.objects.create(
+            cpu_name='arm64',
+            object_path='/usr/lib/system/libdyld.dylib',
+            uuid='0b3d6e0e-3a2e-3c3b-9d0a-1b8a2e9f0001',
+            vmaddr=0x1000,
+            vmsize=0x1000,
+        )
+        for address, symbol in ((0x1800, u'_dyld_exit'),
+                                (0x1000, u'_start'),
+                                (0x1100, u'_dyld_m\xe4in')):
+            DSymSymbol.objects.create(
+                object=self.object,
+                address=address,
+                symbol=symbol,
+            )
+
+    def test_write_and_lookup(self):
+        f = BytesIO()
+        write_symbol_table(f, [(0x20, u'b'), (0x10, u'a'), (0x30, u'\xe4')])
+        path = tempfile.mktemp(dir=self.cache_path)
+        with open(path, 'wb') as out:
+            out.write(f.getvalue())
+
+        table = SymbolTable(path)
+        assert len(table) == 3
+        assert table.lookup(0x0f, 0) is None
+        assert table.lookup(0x10, 0) == (0x10, u'a')
+        assert table.lookup(0x2f, 0) == (0x20, u'b')
+        assert table.lookup(0x2f, 0x21) is None
+        assert table.lookup(0x1000, 0) == (0x30, u'\xe4')
+        table.close()
+
+    def test_export(self):
+        path = export_symbol_table(self.object.id)
+        assert path == get_symbol_table_path(self.object.id)
+
+        obj = self.object.id
+        ranges = [(obj, 0x1000, 0), (obj, 0x17ff, 0x1000),
+                  (obj, 0x900, 0), (obj + 1, 0x1000, 0)]
+        with self.assertNumQueries(0):
+            rv, missing = find_symbols(ranges)
+        assert rv == {
+            (obj, 0x1000, 0): (0x1000, u'_start'),
+            (obj, 0x17ff, 0x1000): (0x1100, u'_dyld_m\xe4in'),
+        }
+        assert missing == [(obj + 1, 0x1000, 0)]
+
+    def test_reexport(self):
+        export_symbol_table(self.object.id)
+        rv, _ = find_symbols([(self.object.id, 0x2000, 0)])
+        assert rv.values() == [(0x1800, u'_dyld_exit')]
+
+        DSymSymbol.objects.create(
+            object=self.object,
+            address=0x1900,
+            symbol=u'_dyld_abort',
+        )
+        export_symbol_table(self.object.id)
+        rv, _ = find_symbols([(self.object.id, 0x2000, 0)])
+        assert rv.values() == [(0x1900, u'_dyld_abort')]
+
+    def test_lookup_symbols_uses_exported_tables(self):
+        export_symbol_table(self.object.id)
+        lookup = {
+            'instruction_addr': '0x20110',
+            'image_addr': '0x20000',
+            'image_vmaddr': None,
+            'uuid': self.object.uuid,
+            'cpu_name': 'arm64',
+            'object_path': '/usr/lib/system/libdyld.dylib',
+        }
+        # only the object is looked up in the database
+        with self.assertNumQueries(1):
+            assert DSymSymbol.objects.lookup_symbols([lookup]) == \
+                [u'_dyld_m\xe4in']
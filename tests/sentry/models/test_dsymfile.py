@@ -0,0 +1,106 @@
+from __future__ import absolute_import
+
+import shutil
+import tempfile
+
+from sentry.models import DSymBundle, DSymObject, DSymSDK, DSymSymbol
+from sentry.testutils import TestCase
+
+
+SDK_INFO = {
+    'dsym_type': 'macho',
+    'sdk_name': 'iOS',
+    'version_major': 9,
+    'version_minor': 3,
+    'version_patchlevel': 0,
+}
+
+
+class DSymSymbolLookupTest(TestCase):
+    def setUp(self):
+        sdk = DSymSDK.objects.create(
+            dsym_type='macho',
+            sdk_name='iOS',
+            version_major=9,
+            version_minor=3,
+            version_patchlevel=0,
+            version_build='13E230',
+        )
+        self.object = DSymObject.objects.create(
+            cpu_name='arm64',
+            object_path='/usr/lib/system/libdyld.dylib',
+            uuid='0b3d6e0e-3a2e-3c3b-9d0a-1b8a2e9f0001',
+            vmaddr=0x1000,
+            vmsize=0x1000,
+        )
+        DSymBundle.objects.create(sdk=sdk, object=self.object)
+        for address, symbol in ((0x1000, '_start'),
+                                (0x1100, '_dyld_main'),
+                                (0x1800, '_dyld_exit')):
+            DSymSymbol.objects.create(
+                object=self.object,
+                address=address,
+                symbol=symbol,
+            )
+
+    def lookup(self, instruction_addr, **kwargs):
+        lookup = {
+            'instruction_addr': instruction_addr,
+            'image_addr': '0x20000',
+            'image_vmaddr': None,
+            'uuid': 'ffffffff-3a2e-3c3b-9d0a-1b8a2e9f0001',
+            'cpu_name': 'arm64',
+            'object_path': '/usr/lib/system/libdyld.dylib',
+        }
+        lookup.update(kwargs)
+        return lookup
+
+    def test_lookup_by_uuid(self):
+        uuid = self.object.uuid.upper()
+        assert DSymSymbol.objects.lookup_symbols([
+            self.lookup('0x20010', uuid=uuid),
+            self.lookup('0x20110', uuid=uuid),
+            self.lookup('0x20900', uuid=uuid),
+            # outside of the image's symbols
+            self.lookup('0x1ff00', uuid=uuid),
+        ]) == ['_start', '_dyld_main', '_dyld_exit', None]
+
+    def test_lookup_by_path(self):
+        lookups = [
+            self.lookup('0x20110'),
+            self.lookup('0x20110', cpu_name='armv7'),
+        ]
+        assert DSymSymbol.objects.lookup_symbols(lookups) == [None, None]
+        assert DSymSymbol.objects.lookup_symbols(lookups, sdk_info=SDK_INFO) == [
+            '_dyld_main', None,
+        ]
+        assert DSymSymbol.objects.lookup_symbols(
+            lookups, sdk_info=dict(SDK_INFO, dsym_type='none')) == [None, None]
+
+    def test_lookup_by_absolute_address(self):
+        assert DSymSymbol.objects.lookup_symbols([
+            self.lookup('0x20110', uuid=self.object.uuid, image_vmaddr='0x1000'),
+        ]) == ['_dyld_main']
+
+        self.object.update(vmaddr=None)
+        assert DSymSymbol.objects.lookup_symbols([
+            self.lookup('0x20110', uuid=self.object.uuid),
+            self.lookup('0x20110', uuid=self.object.uuid, image_vmaddr='0x1000'),
+        ]) == [None, '_dyld_main']
+
+    def test_query_count(self):
+        lookups = [
+            self.lookup('0x%x' % (0x20000 + offset))
+            for offset in range(0, 0x1000, 0x10)
+        ]
+        # without exported symbol tables all symbols come from the database
+        cache_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_path)
+        with self.options({'dsym.cache-path': cache_path}), \
+                self.assertNumQueries(4):
+            symbols = DSymSymbol.objects.lookup_symbols(lookups, sdk_info=SDK_INFO)
+        assert symbols == [
+            DSymSymbol.objects.lookup_symbol(sdk_info=SDK_INFO, **lookup)
+            for lookup in lookups[:4]
+        ] + symbols[4:]
+        assert symbols[0x10] == '_dyld_main'
@@ -1,8 +1,11 @@
 from __future__ import absolute_import
 
 from django.core.files.base import ContentFile
+from hashlib import sha1
+from mock import patch
 
 from sentry.models import File, FileBlob
+from sentry.models.file import get_storage
 from sentry.testutils import TestCase
 
 
@@ -20,6 +23,14 @@ class FileBlobTest(TestCase):
         assert my_file1.checksum == my_file2.checksum
         assert my_file1.path == my_file2.path
 
+    def test_delete(self):
+        blob = FileBlob.from_file(ContentFile('foo bar'.encode('utf-8')))
+        path = blob.path
+
+        blob.delete()
+        assert not FileBlob.objects.filter(checksum=blob.checksum).exists()
+        assert not get_storage().exists(path)
+
 
 class FileTest(TestCase):
     def test_file_handling(self):
@@ -61,3 +72,93 @@ class FileTest(TestCase):
 
         with self.assertRaises(ValueError):
             fp.read()
+
+    def test_putfile_reuses_blobs(self):
+        FileBlob.from_file(ContentFile(b'foo'))
+        file1 = File.objects.create(
+            name='baz.js',
+            type='default',
+        )
+        with patch('sentry.models.file.UPLOAD_BATCH_SIZE', 2):
+            results = file1.putfile(ContentFile(b'foofoobarfoob'), 3)
+
+        assert [r.offset for r in results] == [0, 3, 6, 9, 12]
+        assert [r.blob.checksum for r in results] == [
+            sha1(c).hexdigest() for c in (b'foo', b'foo', b'bar', b'foo', b'b')
+        ]
+        assert FileBlob.objects.count() == 3
+        assert file1.size == 13
+        assert file1.checksum == sha1(b'foofoobarfoob').hexdigest()
+
+        with file1.getfile() as fp:
+            assert fp.read() == b'foofoobarfoob'
+
+    def test_putfile_blob_deleted(self):
+        blob = FileBlob.from_file(ContentFile(b'foo'))
+        blob_id = blob.id
+        file1 = File.objects.create(
+            name='baz.js',
+            type='default',
+        )
+
+        from_chunks = FileBlob.from_chunks
+
+        def from_chunks_and_delete(chunks):
+            rv = from_chunks(chunks)
+            # the blob is deleted before the index referencing it is created
+            if FileBlob.objects.filter(id=blob_id).exists():
+                blob.delete()
+            return rv
+
+        with patch.object(FileBlob, 'from_chunks', side_effect=from_chunks_and_delete):
+            results = file1.putfile(ContentFile(b'foo'), 3)
+
+        assert len(results) == 1
+        assert results[0].blob.id != blob_id
+        with file1.getfile() as fp:
+            assert fp.read() == b'foo'
+
+    def test_putfile_query_count(self):
+        file1 = File.objects.create(
+            name='baz.js',
+            type='default',
+        )
+        # looking up, inserting, reloading and touching the blobs, inserting
+        # the index, saving the file and loading the result
+        with self.assertNumQueries(11):
+            file1.putfile(ContentFile(b'abcdefghijklmno'), 3)
+
+    def test_seek_and_read_ahead(self):
+        file1 = File.objects.create(
+            name='baz.js',
+            type='default',
+        )
+        file1.putfile(ContentFile(b'abcdefghijklmno'), 3)
+
+        with file1.getfile() as fp:
+            wrapper = fp.file
+            assert list(wrapper._prefetched) == [1]
+            fp.seek(7)
+            assert fp.tell() == 7
+            assert list(wrapper._prefetched) == [3]
+            assert fp.read(5) == b'hijkl'
+            assert fp.read() == b'mno'
+
+    def test_read_range(self):
+        file1 = File.objects.create(
+            name='baz.js',
+            type='default',
+        )
+        file1.putfile(ContentFile(b'abcdefghijklmno'), 3)
+
+        with file1.getfile() as fp:
+            fp.seek(4)
+            wrapper = fp.file
+            assert wrapper.read_range(0, 15) == b'abcdefghijklmno'
+            assert wrapper.read_range(2, 8) == b'cdefghij'
+            assert wrapper.read_range(3, 3) == b'def'
+            assert wrapper.read_range(4, 1) == b'e'
+            assert wrapper.read_range(13, 10) == b'no'
+            assert wrapper.read_range(20, 10) == b''
+            assert wrapper.read_range(5, 0) == b''
+            assert fp.tell() == 4
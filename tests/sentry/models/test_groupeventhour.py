@@ -0,0 +1,38 @@
+from __future__ import absolute_import
+
+from datetime import datetime, timedelta
+from django.utils import timezone
+
+from sentry.models import GroupEventHour
+from sentry.testutils import TestCase
+
+
+class RecordTest(TestCase):
+    def test_simple(self):
+        project = self.create_project()
+        group = self.create_group(project=project)
+        date = datetime(2016, 11, 2, 14, 37, 12, tzinfo=timezone.utc)
+
+        GroupEventHour.record(group=group, datetime=date)
+        GroupEventHour.record(group=group, datetime=date + timedelta(minutes=5))
+        GroupEventHour.record(group=group, datetime=date + timedelta(hours=1))
+
+        assert list(GroupEventHour.objects.filter(
+            group_id=group.id,
+        ).order_by('hour').values_list('project_id', 'hour')) == [
+            (project.id, datetime(2016, 11, 2, 14, tzinfo=timezone.utc)),
+            (project.id, datetime(2016, 11, 2, 15, tzinfo=timezone.utc)),
+        ]
+
+    def test_existing_row(self):
+        group = self.create_group()
+        date = datetime(2016, 11, 2, 14, tzinfo=timezone.utc)
+
+        GroupEventHour.objects.create(
+            project_id=group.project_id,
+            group_id=group.id,
+            hour=date,
+        )
+        GroupEventHour.record(group=group, datetime=date)
+
+        assert GroupEventHour.objects.filter(group_id=group.id).count() == 1
@@ -2,7 +2,9 @@
 
 from __future__ import absolute_import
 
-from sentry.models import ProjectOption
+from mock import patch
+
+from sentry.models import OrganizationOption, ProjectOption
 from sentry.testutils import TestCase
 
 
@@ -37,3 +39,32 @@ class ProjectOptionManagerTest(TestCase):
             project=self.project, key='foo', value='bar')
         result = ProjectOption.objects.get_value_bulk([self.project], 'foo')
         assert result == {self.project: 'bar'}
+
+    def test_get_snapshot(self):
+        ProjectOption.objects.set_value(self.project, 'foo', 'bar')
+        OrganizationOption.objects.set_value(
+            self.project.organization, 'foo', 'baz')
+
+        snapshot = ProjectOption.objects.get_snapshot(self.project)
+        assert snapshot.get_project_option('foo') == 'bar'
+        assert snapshot.get_organization_option('foo') == 'baz'
+        assert snapshot.get_project_option('missing', 'default') == 'default'
+
+        ProjectOption.objects.clear_local_cache()
+        with patch('sentry.models.projectoption._load_values') as load_values:
+            assert ProjectOption.objects.get_snapshot(self.project) is snapshot
+        assert not load_values.called
+        assert self.project.get_option('foo') == 'bar'
+
+    def test_get_snapshot_invalidation(self):
+        snapshot = ProjectOption.objects.get_snapshot(self.project)
+        assert snapshot.get_project_option('foo') is None
+
+        ProjectOption.objects.set_value(self.project, 'foo', 'bar')
+        snapshot = ProjectOption.objects.get_snapshot(self.project)
+        assert snapshot.get_project_option('foo') == 'bar'
+
+        OrganizationOption.objects.set_value(
+            self.project.organization, 'foo', 'baz')
+        snapshot = ProjectOption.objects.get_snapshot(self.project)
+        assert snapshot.get_organization_option('foo') == 'baz'
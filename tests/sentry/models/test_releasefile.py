@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+
+from sentry.models import File, Release, ReleaseFile
+from sentry.testutils import TestCase
+
+
+class ReleaseFileGetIdsTest(TestCase):
+    def test_simple(self):
+        project = self.project
+        release = Release.objects.create(
+            organization_id=project.organization_id,
+            version='abc',
+        )
+        release.add_project(project)
+
+        ident = ReleaseFile.get_ident('http://example.com/app.js')
+        other_ident = ReleaseFile.get_ident('~/app.js')
+        idents = [ident, other_ident]
+
+        assert ReleaseFile.get_ids(release, idents) == {}
+        # misses are cached too
+        with self.assertNumQueries(0):
+            assert ReleaseFile.get_ids(release, idents) == {}
+
+        releasefile = ReleaseFile.objects.create(
+            name='http://example.com/app.js',
+            release=release,
+            organization_id=project.organization_id,
+            file=File.objects.create(name='app.js', type='release.file'),
+        )
+
+        # the cached ids are cleared when files change
+        with self.assertNumQueries(1):
+            assert ReleaseFile.get_ids(release, idents) == {
+                ident: releasefile.id,
+            }
+        with self.assertNumQueries(0):
+            ReleaseFile.get_ids(release, idents)
+
+        releasefile.update(name='~/app.js')
+        assert ReleaseFile.get_ids(release, idents) == {
+            other_ident: releasefile.id,
+        }
+
+        releasefile.delete()
+        assert ReleaseFile.get_ids(release, idents) == {}
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import time
+
+from mock import patch
+
+from sentry.cache import default_cache
+from sentry.nodestore.cached.backend import CachedNodeStorage
+from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.nodestore.django.models import Node
+from sentry.testutils import TestCase
+
+
+class CachedNodeStorageTest(TestCase):
+    def setUp(self):
+        self.ns = CachedNodeStorage(backend=DjangoNodeStorage)
+
+    def test_get_multi(self):
+        Node.objects.create(
+            id='d2502ebbd7df41ceba8d3275595cac33',
+            data={'foo': 'bar'},
+        )
+        ids = [
+            'd2502ebbd7df41ceba8d3275595cac33',
+            '5394aa025b8e401ca6bc3ddee3130edc',
+        ]
+        assert self.ns.get_multi(ids) == {
+            'd2502ebbd7df41ceba8d3275595cac33': {'foo': 'bar'},
+        }
+
+        with patch.object(self.ns.backend, 'get_multi', return_value={}) as get_multi:
+            result = self.ns.get_multi(ids)
+        assert result == {'d2502ebbd7df41ceba8d3275595cac33': {'foo': 'bar'}}
+        get_multi.assert_called_once_with(['5394aa025b8e401ca6bc3ddee3130edc'])
+
+        # callers can't modify the cached node
+        result['d2502ebbd7df41ceba8d3275595cac33']['foo'] = 'baz'
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'bar'}
+
+    def test_write_through(self):
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+        with patch.object(self.ns.backend, 'get_multi') as get_multi:
+            assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'bar'}
+        assert not get_multi.called
+
+        self.ns.delete('d2502ebbd7df41ceba8d3275595cac33')
+        assert 'd2502ebbd7df41ceba8d3275595cac33' not in self.ns.local_cache
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') is None
+
+    def test_local_cache_ttl(self):
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+        # another process deletes the node
+        Node.objects.filter(id='d2502ebbd7df41ceba8d3275595cac33').delete()
+        assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'bar'}
+
+        with patch('sentry.nodestore.cached.backend.time.time', return_value=time.time() + 6):
+            assert self.ns.get('d2502ebbd7df41ceba8d3275595cac33') is None
+
+        ns = CachedNodeStorage(backend=DjangoNodeStorage, local_cache_ttl=0)
+        ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+        assert 'd2502ebbd7df41ceba8d3275595cac33' not in ns.local_cache
+
+    def test_shared_cache(self):
+        ns = CachedNodeStorage(backend=DjangoNodeStorage, cache_timeout=60)
+        ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+        ns.local_cache.clear()
+
+        with patch.object(ns.backend, 'get_multi') as get_multi:
+            assert ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'bar'}
+        assert not get_multi.called
+        assert 'd2502ebbd7df41ceba8d3275595cac33' in ns.local_cache
+
+        ns.delete_multi(['d2502ebbd7df41ceba8d3275595cac33'])
+        assert default_cache.get('nodestore:d2502ebbd7df41ceba8d3275595cac33') is None
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from sentry.nodestore.compressed.backend import (
+    COMPRESSED_KEY, CompressedNodeStorage, Compressor, train_dictionary
+)
+from sentry.nodestore.django.backend import DjangoNodeStorage
+from sentry.nodestore.django.models import Node
+from sentry.testutils import TestCase
+
+
+class CompressorTest(TestCase):
+    def test_dictionary(self):
+        samples = [
+            {'platform': 'python', 'sentry.interfaces.Exception': {'values': []}},
+            {'platform': 'python', 'sentry.interfaces.Exception': {'values': []}},
+            {'platform': 'javascript'},
+        ]
+        dictionary = train_dictionary(samples, size=1024)
+        assert b'"platform":"python"' in dictionary
+        assert b'javascript' not in dictionary
+
+        value = b'{"platform":"python","sentry.interfaces.Exception":{}}'
+        compressed = Compressor(dictionary).compress(value)
+        assert len(compressed) < len(Compressor().compress(value))
+        assert Compressor(dictionary).decompress(compressed) == value
+
+
+class CompressedNodeStorageTest(TestCase):
+    def setUp(self):
+        self.ns = CompressedNodeStorage(
+            backend=DjangoNodeStorage,
+            dictionaries=[b'"foo": "bar"'],
+        )
+
+    def test_integration(self):
+        node_id = self.ns.create({'foo': 'bar'})
+        stored = Node.objects.get(id=node_id).data
+        assert stored[COMPRESSED_KEY] == self.ns.compressors[0].id
+        # the database stores bytes as they are
+        assert 'raw' in stored
+        assert self.ns.get(node_id) == {'foo': 'bar'}
+
+        self.ns.delete(node_id)
+        assert self.ns.get(node_id) is None
+
+    def test_get_multi(self):
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+        Node.objects.create(
+            id='5394aa025b8e401ca6bc3ddee3130edc',
+            data={'foo': 'baz'},
+        )
+        assert self.ns.get_multi([
+            'd2502ebbd7df41ceba8d3275595cac33',
+            '5394aa025b8e401ca6bc3ddee3130edc',
+        ]) == {
+            'd2502ebbd7df41ceba8d3275595cac33': {'foo': 'bar'},
+            '5394aa025b8e401ca6bc3ddee3130edc': {'foo': 'baz'},
+        }
+
+    def test_base64(self):
+        ns = CompressedNodeStorage(backend=DjangoNodeStorage)
+        ns.backend.supports_bytes = False
+        node_id = ns.create({'foo': 'bar'})
+        stored = Node.objects.get(id=node_id).data
+        assert 'data' in stored
+        assert ns.get(node_id) == {'foo': 'bar'}
+
+    def test_old_dictionary(self):
+        self.ns.set('d2502ebbd7df41ceba8d3275595cac33', {'foo': 'bar'})
+        ns = CompressedNodeStorage(
+            backend=DjangoNodeStorage,
+            dictionaries=[b'"foo": "baz"', b'"foo": "bar"'],
+        )
+        assert ns.get('d2502ebbd7df41ceba8d3275595cac33') == {'foo': 'bar'}
+
+        ns = CompressedNodeStorage(backend=DjangoNodeStorage)
+        with self.assertRaises(ValueError):
+            ns.get('d2502ebbd7df41ceba8d3275595cac33')
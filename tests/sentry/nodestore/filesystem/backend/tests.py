@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import time
+
+from datetime import datetime, timedelta
+from django.utils import timezone
+from mock import patch
+
+from sentry.nodestore.filesystem.backend import FilesystemNodeStorage
+from sentry.testutils import TestCase
+
+
+class FilesystemNodeStorageTest(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.ns = FilesystemNodeStorage(path=self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_generate_id(self):
+        with patch('time.time', return_value=86400 * 3 + 10):
+            node_id = self.ns.generate_id()
+        assert node_id.startswith('3-')
+        assert len(node_id) <= 40
+
+    def test_integration(self):
+        node_id = self.ns.create({
+            'foo': 'bar',
+        })
+        assert self.ns.get(node_id) == {'foo': 'bar'}
+
+        self.ns.set(node_id, {
+            'foo': 'baz',
+        })
+        assert self.ns.get(node_id) == {'foo': 'baz'}
+
+        self.ns.delete(node_id)
+        assert self.ns.get(node_id) is None
+        self.ns.delete(node_id)
+
+    def test_get_multi(self):
+        self.ns.set_multi({
+            '1-d2502ebbd7df41ceba8d3275595cac33': {'foo': 'bar'},
+            '2-5394aa025b8e401ca6bc3ddee3130edc': {'foo': 'baz'},
+        })
+        assert self.ns.get_multi([
+            '1-d2502ebbd7df41ceba8d3275595cac33',
+            '2-5394aa025b8e401ca6bc3ddee3130edc',
+            '2-00000000000000000000000000000000',
+        ]) == {
+            '1-d2502ebbd7df41ceba8d3275595cac33': {'foo': 'bar'},
+            '2-5394aa025b8e401ca6bc3ddee3130edc': {'foo': 'baz'},
+            '2-00000000000000000000000000000000': None,
+        }
+        assert sorted(os.listdir(self.path)) == ['1', '2']
+
+    def test_unsegmented_id(self):
+        self.ns.set('0ltjNBr/T+aFQyQ3tb3LVw==', {'foo': 'bar'})
+        assert self.ns.get('0ltjNBr/T+aFQyQ3tb3LVw==') == {'foo': 'bar'}
+        assert os.listdir(self.path) == ['unsegmented']
+
+    def test_cleanup(self):
+        now = timezone.now()
+        segment = self.ns.get_segment(time.time())
+        old_id = '%d-d2502ebbd7df41ceba8d3275595cac33' % (segment - 2)
+        new_id = '%d-5394aa025b8e401ca6bc3ddee3130edc' % segment
+        self.ns.set(old_id, {'foo': 'bar'})
+        self.ns.set(new_id, {'foo': 'baz'})
+        self.ns.set('0ltjNBr/T+aFQyQ3tb3LVw==', {'foo': 'bar'})
+
+        self.ns.cleanup(now - timedelta(days=1))
+
+        assert self.ns.get(old_id) is None
+        assert self.ns.get(new_id) == {'foo': 'baz'}
+        assert self.ns.get('0ltjNBr/T+aFQyQ3tb3LVw==') == {'foo': 'bar'}
+        assert sorted(os.listdir(self.path)) == [str(segment), 'unsegmented']
+
+        self.ns.cleanup(datetime(2100, 1, 1, tzinfo=timezone.utc))
+        assert self.ns.get(new_id) is None
+        assert self.ns.get('0ltjNBr/T+aFQyQ3tb3LVw==') is None
+
+    def test_cleanup_leftover_segments(self):
+        segment = self.ns.get_segment(time.time())
+        old_id = '%d-d2502ebbd7df41ceba8d3275595cac33' % (segment - 2)
+        self.ns.set(old_id, {'foo': 'bar'})
+
+        with patch('shutil.rmtree'):
+            self.ns.cleanup(timezone.now() - timedelta(days=1))
+        assert self.ns.get(old_id) is None
+        assert len([n for n in os.listdir(self.path) if n.endswith('.deleted')]) == 1
+
+        self.ns.cleanup(timezone.now() - timedelta(days=1))
+        assert os.listdir(self.path) == []
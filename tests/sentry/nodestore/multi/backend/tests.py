@@ -2,14 +2,21 @@
 
 from __future__ import absolute_import
 
+import threading
+import time
+
+from multiprocessing import TimeoutError
+
 from sentry.nodestore.base import NodeStorage
+from sentry.nodestore.django.backend import DjangoNodeStorage
 from sentry.nodestore.multi.backend import MultiNodeStorage
 from sentry.testutils import TestCase
 
 
 class InMemoryBackend(NodeStorage):
-    def __init__(self):
-        self._data = {}
+    # the data is passed in so that all threads share it
+    def __init__(self, data):
+        self._data = data
 
     def set(self, id, data):
         self._data[id] = data
@@ -18,11 +25,39 @@ class InMemoryBackend(NodeStorage):
         return self._data.get(id)
 
 
+class BlockingBackend(InMemoryBackend):
+    def __init__(self, data, event):
+        super(BlockingBackend, self).__init__(data)
+        self._event = event
+
+    def get(self, id):
+        self._event.wait()
+        return super(BlockingBackend, self).get(id)
+
+
+class BarrierBackend(InMemoryBackend):
+    # only finishes writes once all of its instances are writing
+    def __init__(self, data, writers, count):
+        super(BarrierBackend, self).__init__(data)
+        self._writers = writers
+        self._count = count
+
+    def set(self, id, data):
+        self._writers.append(id)
+        for _ in range(100):
+            if len(self._writers) >= self._count:
+                break
+            time.sleep(0.01)
+        else:
+            raise AssertionError('writes are not concurrent')
+        super(BarrierBackend, self).set(id, data)
+
+
 class MultiNodeStorageTest(TestCase):
     def setUp(self):
         self.ns = MultiNodeStorage([
-            (InMemoryBackend, {}),
-            (InMemoryBackend, {}),
+            (InMemoryBackend, {'data': {}}),
+            (InMemoryBackend, {'data': {}}),
         ])
 
     def test_basic_integration(self):
@@ -80,3 +115,61 @@ class MultiNodeStorageTest(TestCase):
             assert backend.get(node_id2) == {
                 'foo': 'bir',
             }
+
+    def test_writes_concurrently(self):
+        writers = []
+        ns = MultiNodeStorage([
+            (BarrierBackend, {'data': {}, 'writers': writers, 'count': 3}),
+            (BarrierBackend, {'data': {}, 'writers': writers, 'count': 3}),
+            (BarrierBackend, {'data': {}, 'writers': writers, 'count': 3}),
+        ], concurrent_writes=True)
+
+        ns.set('key', {'foo': 'bar'})
+        for backend in ns.backends:
+            assert backend.get('key') == {'foo': 'bar'}
+
+    def test_hedged_read(self):
+        event = threading.Event()
+        ns = MultiNodeStorage([
+            (BlockingBackend, {'data': {'key': {'foo': 'bar'}}, 'event': event}),
+            (InMemoryBackend, {'data': {'key': {'foo': 'baz'}}}),
+        ], read_selector=lambda backends: backends[0], hedge_timeout=0.01)
+
+        assert ns.get('key') == {'foo': 'baz'}
+        event.set()
+
+    def test_pool_per_backend(self):
+        # the stuck reads of a slow backend can't hold up the hedges
+        assert self.ns._get_pool(self.ns.backends[0]) is not \
+            self.ns._get_pool(self.ns.backends[1])
+
+    def test_database_backends(self):
+        with self.assertRaises(ValueError):
+            MultiNodeStorage([
+                (DjangoNodeStorage, {}),
+                (InMemoryBackend, {'data': {}}),
+            ], hedge_timeout=0.01)
+
+        with self.assertRaises(ValueError):
+            MultiNodeStorage([
+                (InMemoryBackend, {'data': {}}),
+                (DjangoNodeStorage, {}),
+            ], concurrent_writes=True)
+
+        ns = MultiNodeStorage([
+            (DjangoNodeStorage, {}),
+            (InMemoryBackend, {'data': {}}),
+        ], concurrent_writes=True)
+        node_id = ns.create({'foo': 'bar'})
+        assert ns.backends[1].get(node_id) == {'foo': 'bar'}
+
+    def test_read_timeout(self):
+        event = threading.Event()
+        ns = MultiNodeStorage([
+            (BlockingBackend, {'data': {}, 'event': event}),
+            (BlockingBackend, {'data': {}, 'event': event}),
+        ], hedge_timeout=0.01, timeout=0.01)
+
+        with self.assertRaises(TimeoutError):
+            ns.get('key')
+        event.set()
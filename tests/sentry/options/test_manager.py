@@ -51,6 +51,21 @@ class OptionsManagerTest(TestCase):
 
         assert self.manager.get('foo') == ''
 
+    def test_get_many(self):
+        self.manager.register('bar', default='baz')
+        self.manager.register('nostore', default='qux', flags=FLAG_NOSTORE)
+        self.manager.set('foo', 'foo')
+
+        with self.settings(SENTRY_OPTIONS={'nostore': 'disk'}):
+            assert self.manager.get_many(['foo', 'bar', 'nostore']) == {
+                'foo': 'foo',
+                'bar': 'baz',
+                'nostore': 'disk',
+            }
+
+        self.manager.unregister('bar')
+        self.manager.unregister('nostore')
+
     def test_register(self):
         with self.assertRaises(UnknownOption):
             self.manager.get('does-not-exit')
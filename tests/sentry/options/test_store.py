@@ -40,6 +40,21 @@ class OptionsStoreTest(TestCase):
         assert store.get(key) == 'bar'
         assert store.delete(key)
 
+    def test_get_many(self):
+        store = self.store
+        keys = [self.make_key() for _ in range(3)]
+        store.set(keys[0], 'foo')
+        store.set(keys[1], 'bar')
+        store.flush_local_cache()
+        store.set_cache(keys[0], 'foo')
+
+        with self.assertNumQueries(1):
+            assert store.get_many(keys) == {
+                keys[0].name: 'foo',
+                keys[1].name: 'bar',
+            }
+        assert store.get_local_cache(keys[1]) == 'bar'
+
     def test_simple_without_cache(self):
         store = OptionsStore(cache=None)
         key = self.key
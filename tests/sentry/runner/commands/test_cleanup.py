@@ -2,9 +2,23 @@
 
 from __future__ import absolute_import
 
-from sentry.models import Event, Group, GroupTagValue, TagValue, TagKey
-from sentry.runner.commands.cleanup import cleanup
-from sentry.testutils import CliTestCase
+from datetime import timedelta
+from hashlib import sha1
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.utils import timezone
+from mock import patch
+
+from sentry.models import (
+    Event, File, FileBlob, FileBlobIndex, Group, GroupTagValue, Release,
+    ReleaseFile, TagValue, TagKey
+)
+from sentry.models.file import get_storage
+from sentry.runner.commands.cleanup import (
+    DeletePool, cleanup, cleanup_unused_files, delete_unused_blobs,
+    find_unused_blobs
+)
+from sentry.testutils import CliTestCase, TestCase, TransactionTestCase
 
 ALL_MODELS = (Event, Group, GroupTagValue, TagValue, TagKey)
 
@@ -36,3 +50,102 @@ class SentryCleanupTest(CliTestCase):
 
         for model in ALL_MODELS:
             assert model.objects.count() == 0
+
+
+class CleanupUnusedFilesTest(TestCase):
+    def create_blob(self, contents, days=2):
+        blob = FileBlob.from_file(ContentFile(contents))
+        blob.update(timestamp=timezone.now() - timedelta(days=days))
+        return blob
+
+    def test_unused_files(self):
+        unused = self.create_blob(b'unused')
+        recent = self.create_blob(b'recent', days=0)
+        indexed = self.create_blob(b'indexed')
+        legacy = self.create_blob(b'legacy')
+
+        f = File.objects.create(name='foo', type='default', blob=legacy)
+        FileBlobIndex.objects.create(file=f, blob=indexed, offset=0)
+        path = unused.path
+
+        with patch('sentry.runner.commands.cleanup.FILE_BLOB_BATCH_SIZE', 2):
+            cleanup_unused_files(quiet=True)
+
+        assert set(FileBlob.objects.values_list('id', flat=True)) == set([
+            recent.id, indexed.id, legacy.id,
+        ])
+        assert not get_storage().exists(path)
+        assert get_storage().exists(indexed.path)
+
+    def test_orphaned_sourcemap_indexes(self):
+        release = Release.objects.create(
+            organization_id=self.project.organization_id,
+            version='abc',
+        )
+        indexes = []
+        for name in ('used', 'orphaned'):
+            index = File.objects.create(name=name, type='release.sourcemap-index')
+            index.putfile(ContentFile(name.encode('utf-8')))
+            index.update(timestamp=timezone.now() - timedelta(days=2))
+            indexes.append(index)
+        used, orphaned = indexes
+        ReleaseFile.objects.create(
+            name='app.js.map',
+            release=release,
+            organization_id=self.project.organization_id,
+            file=File.objects.create(name='app.js.map', type='release.file'),
+            sourcemap_index=used,
+        )
+        FileBlob.objects.update(timestamp=timezone.now() - timedelta(days=2))
+
+        cleanup_unused_files(quiet=True)
+
+        assert File.objects.filter(id=used.id).exists()
+        assert not File.objects.filter(id=orphaned.id).exists()
+        assert list(FileBlob.objects.values_list('checksum', flat=True)) == [
+            sha1(b'used').hexdigest(),
+        ]
+
+    def test_touched_blobs(self):
+        unused = [self.create_blob(b'unused%d' % i) for i in range(3)]
+        touched = self.create_blob(b'touched')
+        cutoff = timezone.now() - timedelta(days=1)
+
+        cursor = connection.cursor()
+        blobs = find_unused_blobs(cursor, 0, touched.id + 1, cutoff)
+        assert len(blobs) == 4
+
+        # an upload reusing the blob after it was found
+        assert FileBlob.touch([touched])
+
+        with patch('sentry.runner.commands.cleanup.FILE_BLOB_DELETE_SIZE', 2):
+            deleted = delete_unused_blobs(cursor, blobs, cutoff)
+        assert sorted(b[0] for b in deleted) == sorted(b.id for b in unused)
+        assert list(FileBlob.objects.values_list('id', flat=True)) == [touched.id]
+
+
+def fake_delete_range(model, dtfield, days, project_id, generic, start, stop):
+    return stop - start
+
+
+# the pool closes the database connections before starting its workers,
+# which would throw away the transaction of a TestCase
+class DeletePoolTest(TransactionTestCase):
+    def test_inline(self):
+        pool = DeletePool(1)
+        assert pool.run([('sentry.models.Group', 'last_seen', 1, None, True, 0, 10)]) == 0
+        pool.close()
+
+    @patch('sentry.runner.commands.cleanup.delete_range', fake_delete_range)
+    def test_workers(self):
+        pool = DeletePool(3)
+        tasks = [
+            ('sentry.models.Group', 'last_seen', 1, None, True, start, start + 10)
+            for start in range(0, 100, 10)
+        ]
+        counts = []
+        assert pool.run(tasks, callback=counts.append) == 100
+        assert counts == [10] * 10
+        assert pool.run(tasks[:2]) == 20
+        pool.close()
+        assert not any(p.is_alive() for p in pool.workers)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+
+from sentry.runner.commands.nodestore import train_dictionary
+from sentry.testutils import CliTestCase
+
+
+class TrainDictionaryTest(CliTestCase):
+    command = train_dictionary
+
+    def test_simple(self):
+        self.create_event(event_id='a' * 32)
+        self.create_event(event_id='b' * 32)
+
+        with self.runner.isolated_filesystem():
+            rv = self.invoke('nodestore.dict')
+            assert rv.exit_code == 0, rv.output
+            with open('nodestore.dict', 'rb') as f:
+                dictionary = f.read()
+
+        assert 0 < len(dictionary) <= 32768
+        assert b'"user":"dcramer"' in dictionary
+
+    def test_no_events(self):
+        with self.runner.isolated_filesystem():
+            rv = self.invoke('nodestore.dict')
+        assert rv.exit_code != 0
+
+    def test_size(self):
+        with self.runner.isolated_filesystem():
+            rv = self.invoke('nodestore.dict', '--size=65536')
+        assert rv.exit_code != 0
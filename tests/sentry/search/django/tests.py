@@ -5,11 +5,15 @@ from __future__ import absolute_import
 from datetime import datetime, timedelta
 
 from sentry.models import (
-    GroupAssignee, GroupBookmark, GroupStatus, GroupSubscription, GroupTagValue
+    GroupAssignee, GroupBookmark, GroupEventHour, GroupStatus,
+    GroupSubscription, GroupTagValue
 )
 from sentry.search.base import ANY
-from sentry.search.django.backend import DjangoSearchBackend
+from sentry.search.django.backend import (
+    DjangoSearchBackend, PostgresSearchBackend, escape_like
+)
 from sentry.testutils import TestCase
+from sentry.utils.cursors import Cursor
 
 
 class DjangoSearchBackendTest(TestCase):
@@ -280,3 +284,124 @@ class DjangoSearchBackendTest(TestCase):
         )
         assert len(results) == 1
         assert results[0] == self.group1
+
+
+class PostgresSearchBackendTest(DjangoSearchBackendTest):
+    def create_backend(self):
+        return PostgresSearchBackend()
+
+    def test_query_wildcards_are_literal(self):
+        results = self.backend.query(self.project1, query='f%')
+        assert len(results) == 0
+
+        results = self.backend.query(self.project1, query='_oo')
+        assert len(results) == 0
+
+
+class DjangoSearchBackendResultCacheTest(DjangoSearchBackendTest):
+    def create_backend(self):
+        return DjangoSearchBackend(result_cache_ttl=60)
+
+    def test_cached_results(self):
+        results = self.backend.query(self.project1, status=GroupStatus.UNRESOLVED)
+        assert list(results) == [self.group1]
+
+        # a newly created group is not visible until the entry is refreshed
+        group3 = self.create_group(
+            project=self.project1,
+            checksum='c' * 32,
+            status=GroupStatus.UNRESOLVED,
+            last_seen=datetime(2013, 8, 14, 3, 8, 24, 880386),
+        )
+        results = self.backend.query(self.project1, status=GroupStatus.UNRESOLVED)
+        assert list(results) == [self.group1]
+
+        # only the first page is served from the cache
+        results = self.backend.query(
+            self.project1,
+            status=GroupStatus.UNRESOLVED,
+            cursor=Cursor(0, 0, 0),
+        )
+        assert list(results) == [group3, self.group1]
+
+    def test_cached_group_no_longer_matching(self):
+        results = self.backend.query(self.project1, status=GroupStatus.UNRESOLVED)
+        assert list(results) == [self.group1]
+
+        self.group1.update(status=GroupStatus.RESOLVED)
+
+        results = self.backend.query(self.project1, status=GroupStatus.UNRESOLVED)
+        assert list(results) == []
+
+
+class DjangoSearchBackendEventHourTest(DjangoSearchBackendTest):
+    def create_backend(self):
+        return DjangoSearchBackend(use_event_hours=True)
+
+    def setUp(self):
+        super(DjangoSearchBackendEventHourTest, self).setUp()
+
+        for event in (self.event1, self.event2, self.event3):
+            GroupEventHour.record(group=event.group, datetime=event.datetime)
+
+    def test_date_filter_full_hours(self):
+        # events which were sampled are only known to the index
+        group3 = self.create_group(
+            project=self.project1,
+            checksum='c' * 32,
+            last_seen=datetime(2013, 7, 20, 3, 8, 24, 880386),
+        )
+        GroupEventHour.record(
+            group=group3,
+            datetime=datetime(2013, 7, 20, 3, 8, 24, 880386),
+        )
+
+        results = self.backend.query(
+            self.project1,
+            date_from=datetime(2013, 7, 19, 23, 30),
+            date_to=datetime(2013, 7, 21, 0, 30),
+        )
+        assert list(results) == [group3]
+
+        results = self.backend.query(
+            self.project1,
+            date_from=datetime(2013, 7, 20, 3, 30),
+            date_to=datetime(2013, 7, 21, 0, 30),
+        )
+        assert list(results) == []
+
+    def test_date_filter_query_edges(self):
+        group3 = self.create_group(
+            project=self.project1,
+            checksum='c' * 32,
+            message='foo',
+            last_seen=datetime(2013, 7, 20, 3, 8, 24, 880386),
+        )
+        self.create_event(
+            event_id='d' * 32,
+            group=group3,
+            message='bar',
+            datetime=datetime(2013, 7, 20, 3, 8, 24, 880386),
+        )
+
+        # the range only covers part of an hour so events are looked at
+        results = self.backend.query(
+            self.project1,
+            date_from=datetime(2013, 7, 20, 3),
+            date_to=datetime(2013, 7, 20, 3, 30),
+        )
+        assert list(results) == [group3]
+
+        results = self.backend.query(
+            self.project1,
+            query='foo',
+            date_from=datetime(2013, 7, 20, 3),
+            date_to=datetime(2013, 7, 20, 3, 30),
+        )
+        assert list(results) == []
+
+
+def test_escape_like():
+    assert escape_like('foo') == 'foo'
+    assert escape_like('50%_off') == '50\\%\\_off'
+    assert escape_like('a\\b') == 'a\\\\b'
@@ -2,18 +2,21 @@ from __future__ import absolute_import
 
 import pytest
 
+from mock import patch
+
 from sentry.constants import ObjectStatus
 from sentry.exceptions import DeleteAborted
 from sentry.models import (
     Event, EventMapping, EventTag,
-    Group, GroupAssignee, GroupMeta, GroupResolution, GroupRedirect, GroupStatus, GroupTagKey,
+    Group, GroupAssignee, GroupHash, GroupMeta, GroupResolution, GroupRedirect, GroupStatus, GroupTagKey,
     GroupTagValue, Organization, OrganizationStatus, Project, ProjectStatus,
     Release, TagKey, TagValue, Team, TeamStatus, Commit, CommitAuthor,
     ReleaseCommit, Repository
 )
 from sentry.tasks.deletion import (
-    delete_group, delete_organization, delete_project, delete_tag_key,
-    delete_team, generic_delete
+    _get_bulk_delete_client, _get_bulk_delete_key, bulk_delete_model,
+    delete_group, delete_models, delete_organization, delete_project,
+    delete_tag_key, delete_team, generic_delete
 )
 from sentry.testutils import TestCase
 
@@ -245,6 +248,17 @@ class DeleteGroupTest(TestCase):
         assert not EventTag.objects.filter(event_id=event.id).exists()
         assert not GroupRedirect.objects.filter(group_id=group.id).exists()
 
+    def test_deletes_hashes_first(self):
+        group = self.create_group(status=GroupStatus.PENDING_DELETION)
+        GroupHash.objects.create(project=group.project, group=group, hash='a' * 32)
+        GroupMeta.objects.create(group=group, key='foo', value='bar')
+
+        with patch('sentry.tasks.deletion.bulk_delete_model.delay'):
+            delete_group(object_id=group.id, continuous=False)
+
+        assert not GroupHash.objects.filter(group=group).exists()
+        assert GroupMeta.objects.filter(group=group).exists()
+
 
 class GenericDeleteTest(TestCase):
     def test_does_not_delete_visible(self):
@@ -268,3 +282,47 @@ class GenericDeleteTest(TestCase):
             generic_delete('sentry', 'project', object_id=project.id)
 
         assert not Project.objects.filter(id=project.id).exists()
+
+
+class DeleteModelsTest(TestCase):
+    def test_queues_models_with_rows(self):
+        group = self.create_group()
+        GroupMeta.objects.create(group=group, key='foo', value='bar')
+
+        with patch('sentry.tasks.deletion.bulk_delete_model.delay') as delay:
+            assert delete_models((GroupMeta, GroupAssignee), {'group_id': group.id})
+            delay.assert_called_once_with(
+                app_label='sentry',
+                model_name='GroupMeta',
+                filters={'group_id': group.id},
+                transaction_id=None,
+            )
+
+            # the task is still in flight
+            delay.reset_mock()
+            assert delete_models((GroupMeta, GroupAssignee), {'group_id': group.id})
+            assert not delay.called
+
+        key = _get_bulk_delete_key('sentry', 'GroupMeta', {'group_id': group.id})
+        _get_bulk_delete_client(key).delete(key)
+        with self.tasks():
+            assert delete_models((GroupMeta, GroupAssignee), {'group_id': group.id})
+        assert not GroupMeta.objects.filter(group=group).exists()
+        assert not delete_models((GroupMeta, GroupAssignee), {'group_id': group.id})
+
+    def test_requeues_until_empty(self):
+        group = self.create_group()
+        for i in range(3):
+            GroupMeta.objects.create(group=group, key='foo%d' % i, value='bar')
+
+        with self.tasks():
+            bulk_delete_model(
+                app_label='sentry',
+                model_name='GroupMeta',
+                filters={'group_id': group.id},
+                limit=1,
+                max_chunks=1,
+            )
+        assert not GroupMeta.objects.filter(group=group).exists()
+        key = _get_bulk_delete_key('sentry', 'GroupMeta', {'group_id': group.id})
+        assert not _get_bulk_delete_client(key).exists(key)
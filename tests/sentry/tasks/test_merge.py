@@ -1,9 +1,13 @@
 from __future__ import absolute_import
 
 from collections import defaultdict
+from datetime import timedelta
+from django.utils import timezone
 
-from sentry.tasks.merge import merge_group, rehash_group_events
-from sentry.models import Event, Group, GroupMeta, GroupRedirect, GroupTagKey, GroupTagValue
+from sentry.tasks.merge import bulk_merge_objects, merge_group, rehash_group_events
+from sentry.models import (
+    Event, Group, GroupAssignee, GroupMeta, GroupRedirect, GroupTagKey, GroupTagValue
+)
 from sentry.testutils import TestCase
 
 
@@ -178,6 +182,52 @@ class MergeGroupTest(TestCase):
         assert GroupMeta.objects.get_value(group2, 'github:tid') == '134'
         assert GroupMeta.objects.get_value(group2, 'other:tid') == 'abc'
 
+    def test_merge_combines_conflicting_rows(self):
+        project = self.create_project()
+        target, other = [self.create_group(project) for _ in range(0, 2)]
+        now = timezone.now()
+
+        GroupTagValue.objects.create(
+            project=project, group=target, key='foo', value='bar',
+            times_seen=2, first_seen=now - timedelta(days=1), last_seen=now - timedelta(hours=1),
+        )
+        GroupTagValue.objects.create(
+            project=project, group=other, key='foo', value='bar',
+            times_seen=3, first_seen=now - timedelta(days=2), last_seen=now,
+        )
+        GroupTagValue.objects.create(
+            project=project, group=other, key='foo', value='baz', times_seen=1,
+        )
+        GroupAssignee.objects.create(group=target, project=project, user=self.user)
+        GroupAssignee.objects.create(
+            group=other, project=project, user=self.create_user('bar@example.com'))
+
+        with self.tasks():
+            merge_group(other.id, target.id)
+
+        tag_value = GroupTagValue.objects.get(group=target, key='foo', value='bar')
+        assert tag_value.times_seen == 5
+        assert tag_value.first_seen == now - timedelta(days=2)
+        assert tag_value.last_seen == now
+        assert GroupTagValue.objects.get(group=target, key='foo', value='baz').times_seen == 1
+        assert GroupAssignee.objects.get(group=target).user == self.user
+        assert not GroupAssignee.objects.filter(group_id=other.id).exists()
+
+    def test_bulk_merge_events_in_chunks(self):
+        project = self.create_project()
+        target, other = [self.create_group(project) for _ in range(0, 2)]
+        events = [
+            self.create_event(event_id, group=other)
+            for event_id in ('a' * 32, 'b' * 32, 'c' * 32)
+        ]
+
+        assert bulk_merge_objects([Event], other, target, limit=2)
+        assert sorted(Event.objects.filter(group_id=target.id).values_list(
+            'id', flat=True)) == [events[0].id, events[1].id]
+
+        assert not bulk_merge_objects([Event], other, target, limit=2)
+        assert Event.objects.filter(group_id=target.id).count() == 3
+
 
 class RehashGroupEventsTest(TestCase):
     def test_simple(self):
@@ -1,8 +1,11 @@
 from __future__ import absolute_import
 
-from sentry.models import User
+from django.db.models.deletion import ProtectedError
+from mock import patch
+
+from sentry.models import Event, Group, GroupMeta, Release, User
 from sentry.testutils import TestCase
-from sentry.utils.query import merge_into
+from sentry.utils.query import bulk_delete_queryset, merge_into
 
 
 class MergeIntoTest(TestCase):
@@ -14,3 +17,63 @@ class MergeIntoTest(TestCase):
 
         # make sure we didn't remove the instance
         assert User.objects.filter(id=user_1.id).exists()
+
+
+class BulkDeleteQuerysetTest(TestCase):
+    def setUp(self):
+        # the set based queries are portable, only unknown databases fall
+        # back to deleting row by row
+        patcher = patch('sentry.utils.query.db.is_postgres', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cascades(self):
+        project = self.create_project()
+        group1 = self.create_group(project=project)
+        self.create_group(project=project)
+        other_group = self.create_group()
+        GroupMeta.objects.create(group=group1, key='foo', value='bar')
+        GroupMeta.objects.create(group=other_group, key='foo', value='bar')
+
+        assert bulk_delete_queryset(Group.objects.filter(project=project), limit=1)
+        with patch('sentry.utils.query.IN_QUERY_CHUNK_SIZE', 1):
+            assert bulk_delete_queryset(Group.objects.filter(project=project))
+        assert not bulk_delete_queryset(Group.objects.filter(project=project))
+
+        assert not Group.objects.filter(project=project).exists()
+        assert not GroupMeta.objects.filter(group=group1).exists()
+        assert GroupMeta.objects.filter(group=other_group).exists()
+
+    def test_deletes_nodes(self):
+        group = self.create_group()
+        event = self.create_event(group=group)
+        other_event = self.create_event(group=self.create_group())
+
+        with patch('sentry.app.nodestore.delete_multi') as delete_multi:
+            assert bulk_delete_queryset(Event.objects.filter(group_id=group.id))
+        delete_multi.assert_called_once_with([event.data.id])
+
+        assert not Event.objects.filter(id=event.id).exists()
+        assert Event.objects.filter(id=other_event.id).exists()
+
+    def test_protected(self):
+        release = Release.objects.create(
+            organization_id=self.project.organization_id,
+            version='a' * 32,
+        )
+        group = self.create_group(first_release=release)
+
+        with self.assertRaises(ProtectedError):
+            bulk_delete_queryset(Release.objects.filter(id=release.id))
+        assert Group.objects.filter(id=group.id).exists()
+
+    def test_unknown_database(self):
+        group = self.create_group()
+        GroupMeta.objects.create(group=group, key='foo', value='bar')
+
+        with patch('sentry.utils.query.db.is_postgres', return_value=False), \
+                patch('sentry.utils.query.db.is_mysql', return_value=False):
+            assert bulk_delete_queryset(Group.objects.filter(id=group.id))
+            assert not bulk_delete_queryset(Group.objects.filter(id=group.id))
+
+        assert not GroupMeta.objects.filter(group=group).exists()
@@ -0,0 +1,46 @@
+from __future__ import absolute_import
+
+import pytest
+import threading
+
+from sentry.utils.concurrent import (
+    EXECUTE_POOL_SIZE, TimeoutError, execute, get_thread_pool
+)
+
+
+def test_execute():
+    assert execute(threading.current_thread).result() is not threading.current_thread()
+
+
+def test_execute_pool():
+    # calls reuse the threads of a pool rather than starting new ones
+    thread = execute(threading.current_thread).result(timeout=1)
+    assert thread in get_thread_pool('concurrent.execute', EXECUTE_POOL_SIZE)._pool
+
+
+def test_execute_exception():
+    def fail():
+        raise ValueError('boom')
+
+    future = execute(fail)
+    with pytest.raises(ValueError):
+        future.result()
+    assert future.done()
+
+
+def test_execute_timeout():
+    event = threading.Event()
+    future = execute(event.wait)
+
+    with pytest.raises(TimeoutError):
+        future.result(timeout=0.01)
+    assert not future.done()
+
+    event.set()
+    assert future.result(timeout=1)
+
+
+def test_get_thread_pool():
+    pool = get_thread_pool('test', 2)
+    assert get_thread_pool('test', 2) is pool
+    assert pool.apply(threading.current_thread) is not threading.current_thread()
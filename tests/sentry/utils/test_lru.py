@@ -0,0 +1,62 @@
+from __future__ import absolute_import
+
+from mock import patch
+
+from sentry.testutils import TestCase
+from sentry.utils.lru import LRUCache
+
+
+class LRUCacheTest(TestCase):
+    def test_get_set(self):
+        cache = LRUCache(10)
+        assert cache.get('a') is None
+        assert cache.get('a', 1) == 1
+
+        cache.set('a', 'foo', 3)
+        assert 'a' in cache
+        assert cache.get('a') == 'foo'
+        assert cache.size == 3
+
+        cache.set('a', 'bar', 5)
+        assert cache.get('a') == 'bar'
+        assert cache.size == 5
+        assert len(cache) == 1
+
+        cache.delete('a')
+        assert 'a' not in cache
+        assert cache.size == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(10)
+        cache.set('a', 1, 4)
+        cache.set('b', 2, 4)
+        cache.get('a')
+        cache.set('c', 3, 4)
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+        assert cache.size == 8
+
+    def test_value_larger_than_cache(self):
+        cache = LRUCache(10)
+        cache.set('a', 1, 4)
+        cache.set('b', 2, 11)
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert cache.size == 4
+
+    @patch('sentry.utils.lru.metrics.incr')
+    def test_metrics(self, mock_incr):
+        cache = LRUCache(4, name='test')
+        cache.get('a')
+        cache.set('a', 1, 2)
+        cache.get('a')
+        cache.set('b', 1, 3)
+
+        assert [c[0] for c in mock_incr.call_args_list] == [
+            ('test.miss', 1),
+            ('test.hit', 1),
+            ('test.evict', 1),
+        ]